@@ -0,0 +1,308 @@
+import argparse
+import importlib.util
+import json
+import platform
+import random
+import sys
+import time
+import tracemalloc
+from pathlib import Path
+from types import ModuleType
+from typing import Callable, Dict, List, Optional, Tuple
+
+# Scaled-up task settings per task type; every TASK_GENERATORS entry is covered.
+SCENARIOS: Dict[str, Dict] = {
+    "number_dictation/100_boxes": {"type": "number_dictation", "box_count": 100, "show_helper_numbers": True},
+    "compare_numbers/500_items": {
+        "type": "compare_numbers",
+        "item_count": 500,
+        "min_value": 0,
+        "max_value": 100,
+        "columns": 4,
+        "equal_probability": 0.05,
+    },
+    "pre_succ_table/500_rows": {
+        "type": "pre_succ_table",
+        "row_count": 500,
+        "min_value": 10,
+        "max_value": 100,
+        "given_field": "mixed",
+    },
+    "arithmetic_list/500_items": {
+        "type": "arithmetic_list",
+        "item_count": 500,
+        "operations": ["+", "-"],
+        "min_value": 0,
+        "max_value": 100,
+        "columns": 4,
+        "cross_ten_probability": 1.0,
+        "max_second_operand": 10,
+    },
+    "number_word_table/300_rows": {
+        "type": "number_word_table",
+        "first_row_example": True,
+        "example_number": 78,
+        "row_count": 300,
+        "min_value": 21,
+        "max_value": 99,
+        "given_columns": ["word"],
+    },
+    "ordering/40_numbers": {
+        "type": "ordering",
+        "set_size": 40,
+        "min_value": 10,
+        "max_value": 999,
+        "order": "increasing",
+        "show_comparison_symbols": True,
+    },
+    "operation_table/4_tables_5x5": {
+        "type": "operation_table",
+        "result_range": {"min": 0, "max": 100},
+        "tables": [
+            {"operation": "+", "row_count": 5, "col_count": 5, "given_cells": "random_3"},
+            {"operation": "-", "row_count": 5, "col_count": 5, "given_cells": "random_3"},
+            {"operation": "+", "row_count": 5, "col_count": 4, "given_cells": "diagonal"},
+            {"operation": "-", "row_count": 4, "col_count": 5, "given_cells": "diagonal"},
+        ],
+    },
+    "number_line/0_1000": {
+        "type": "number_line",
+        "start": 0,
+        "end": 1000,
+        "major_tick_interval": 100,
+        "value_count": 10,
+    },
+}
+
+
+def load_generator(path: Path) -> ModuleType:
+    # load generate_worksheets.py from any checkout so two trees can be compared
+    spec = importlib.util.spec_from_file_location("generate_worksheets_under_test", path)
+    if spec is None or spec.loader is None:
+        raise ValueError(f"Cannot load {path}")
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[spec.name] = module
+    spec.loader.exec_module(module)
+    return module
+
+
+def make_renderer(module: ModuleType, task_type: str) -> Callable[[Dict], None]:
+    renderer = module.TASK_RENDERERS[task_type]
+    if hasattr(module, "VariantWriter"):
+        return lambda data: renderer(data, module.VariantWriter())
+    # older checkouts render each variant separately
+    return lambda data: (renderer(data, False), renderer(data, True))
+
+
+def make_pdf_renderer(module: ModuleType, task_type: str) -> Optional[Callable[[Dict], object]]:
+    if not hasattr(module, "TASK_PDF_RENDERERS"):
+        return None
+    renderer = module.TASK_PDF_RENDERERS[task_type]
+
+    def render(data: Dict) -> object:
+        canvas = module.PdfCanvas()
+        renderer(data, canvas)
+        return canvas.finish()
+
+    return render
+
+
+def time_per_op(func: Callable[[int], object], repeat: int, rounds: int) -> float:
+    # the fastest round is the one least disturbed by other processes, so it varies
+    # far less between runs than the median
+    samples = []
+    for round_index in range(rounds):
+        start = time.perf_counter()
+        for i in range(repeat):
+            func(round_index * repeat + i)
+        samples.append((time.perf_counter() - start) / repeat)
+    return min(samples)
+
+
+def peak_allocation(func: Callable[[int], object]) -> Tuple[int, int]:
+    tracemalloc.start()
+    try:
+        before = tracemalloc.take_snapshot()
+        tracemalloc.reset_peak()
+        baseline, _ = tracemalloc.get_traced_memory()
+        result = func(0)
+        _, peak = tracemalloc.get_traced_memory()
+        after = tracemalloc.take_snapshot()
+        del result
+    finally:
+        tracemalloc.stop()
+    blocks = sum(stat.count_diff for stat in after.compare_to(before, "filename") if stat.count_diff > 0)
+    return peak - baseline, blocks
+
+
+def run_benchmarks(module: ModuleType, repeat: int, rounds: int, only: Optional[List[str]] = None) -> Dict:
+    results: Dict[str, Dict] = {}
+    for name, task in SCENARIOS.items():
+        task_type = task["type"]
+        if only and task_type not in only and name not in only:
+            continue
+        generator = module.TASK_GENERATORS[task_type]
+        render = make_renderer(module, task_type)
+        try:
+            # newer checkouts compile the settings once, like load_config does
+            plan = module.compile_task(dict(task)) if hasattr(module, "compile_task") else dict(task)
+            samples = [generator(plan, random.Random(seed)) for seed in range(repeat)]
+        except ValueError as exc:
+            # e.g. a checkout that cannot generate this scenario at all
+            results[name] = {"error": str(exc)}
+            continue
+
+        def generate(i: int, generator=generator, plan=plan) -> Dict:
+            return generator(plan, random.Random(i))
+
+        def render_sample(i: int, render=render, samples=samples) -> None:
+            return render(samples[i % len(samples)])
+
+        # (phase, function, tasks per call); time and allocations are reported per task
+        phases = [("generate", generate, 1)]
+        vector_generator = getattr(module, "VECTOR_GENERATORS", {}).get(task_type)
+        if vector_generator is not None and module.np is not None:
+            # newer checkouts draw a whole block of sheets per call
+            sheets = getattr(module, "VECTOR_BLOCK_SHEETS", None)
+            vector_args = () if sheets is None else (sheets,)
+
+            def generate_vector(i: int, vector_generator=vector_generator, plan=plan, vector_args=vector_args) -> Dict:
+                return vector_generator(plan, module.np.random.default_rng(i), *vector_args)
+
+            phases.append(("numpy", generate_vector, sheets or 1))
+        phases.append(("render", render_sample, 1))
+        render_pdf = make_pdf_renderer(module, task_type)
+        if render_pdf is not None:
+
+            def render_pdf_sample(i: int, render_pdf=render_pdf, samples=samples) -> object:
+                return render_pdf(samples[i % len(samples)])
+
+            phases.append(("pdf", render_pdf_sample, 1))
+
+        results[name] = {}
+        for phase, func, tasks_per_call in phases:
+            seconds = time_per_op(func, repeat, rounds) / tasks_per_call
+            peak_bytes, blocks = peak_allocation(func)
+            results[name][phase] = {
+                "seconds_per_op": seconds,
+                "peak_bytes": peak_bytes // tasks_per_call,
+                "allocated_blocks": blocks // tasks_per_call,
+            }
+    return results
+
+
+def print_results(results: Dict) -> None:
+    print(f"{'scenario':32} {'phase':9} {'time/op':>12} {'peak KiB':>10} {'blocks':>8}")
+    for name, phases in results.items():
+        if "error" in phases:
+            print(f"{name:32} failed: {phases['error']}")
+            continue
+        for phase, values in phases.items():
+            print(
+                f"{name:32} {phase:9} {values['seconds_per_op'] * 1e6:>10.1f}us "
+                f"{values['peak_bytes'] / 1024:>10.1f} {values['allocated_blocks']:>8}"
+            )
+
+
+# peaks below this are compared as if they were this large, so a few hundred bytes
+# more on a tiny baseline do not count as a memory regression
+MEMORY_FLOOR_BYTES = 4096
+
+
+def compare_results(base: Dict, new: Dict, threshold: float, memory_threshold: float) -> List[str]:
+    regressions = []
+    print(f"{'scenario':32} {'phase':9} {'base':>12} {'new':>12} {'change':>8} {'peak KiB':>10} {'change':>8}")
+    for name, phases in new["results"].items():
+        if "error" in phases:
+            print(f"{name:32} failed: {phases['error']}")
+            regressions.append(f"{name} (failed)")
+            continue
+        for phase, values in phases.items():
+            previous = base["results"].get(name, {}).get(phase)
+            if previous is None:
+                print(f"{name:32} {phase:9} {'-':>12} {values['seconds_per_op'] * 1e6:>10.1f}us {'new':>8}")
+                continue
+            change = values["seconds_per_op"] / previous["seconds_per_op"] - 1
+            memory_change = (values["peak_bytes"] - previous["peak_bytes"]) / max(
+                previous["peak_bytes"], MEMORY_FLOOR_BYTES
+            )
+            marker = ""
+            if change > threshold:
+                marker += "  REGRESSION"
+                regressions.append(f"{name} {phase}")
+            if memory_change > memory_threshold:
+                marker += "  MEMORY"
+                regressions.append(f"{name} {phase} (memory)")
+            print(
+                f"{name:32} {phase:9} {previous['seconds_per_op'] * 1e6:>10.1f}us "
+                f"{values['seconds_per_op'] * 1e6:>10.1f}us {change:>+8.1%} "
+                f"{values['peak_bytes'] / 1024:>10.1f} {memory_change:>+8.1%}{marker}"
+            )
+    return regressions
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Micro-benchmarks for every task generator and renderer")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    run = subparsers.add_parser("run", help="Run the benchmarks and optionally save them as JSON")
+    run.add_argument(
+        "--target",
+        type=Path,
+        default=Path(__file__).with_name("generate_worksheets.py"),
+        help="generate_worksheets.py of the checkout to measure",
+    )
+    run.add_argument("--output", "-o", type=Path, help="Write the results to this JSON file")
+    run.add_argument("--repeat", type=int, default=30, help="Calls per timing round")
+    run.add_argument("--rounds", type=int, default=9, help="Timing rounds; the fastest is reported")
+    run.add_argument("--only", nargs="+", help="Restrict to these task types or scenario names")
+
+    compare = subparsers.add_parser("compare", help="Compare two saved result files")
+    compare.add_argument("base", type=Path, help="Results of the reference checkout")
+    compare.add_argument("new", type=Path, help="Results of the checkout under test")
+    compare.add_argument(
+        "--threshold", type=float, default=0.10, help="Relative slowdown reported as regression (default: 0.10)"
+    )
+    compare.add_argument(
+        "--memory-threshold",
+        type=float,
+        default=0.10,
+        help="Relative growth of the peak allocation reported as regression (default: 0.10)",
+    )
+    return parser.parse_args()
+
+
+def main() -> None:
+    args = parse_args()
+    if args.command == "compare":
+        base = json.loads(args.base.read_text(encoding="utf-8"))
+        new = json.loads(args.new.read_text(encoding="utf-8"))
+        regressions = compare_results(base, new, args.threshold, args.memory_threshold)
+        if regressions:
+            print(
+                f"{len(regressions)} regression(s) above {args.threshold:.0%} time / "
+                f"{args.memory_threshold:.0%} memory: {', '.join(regressions)}"
+            )
+            sys.exit(1)
+        return
+
+    module = load_generator(args.target.resolve())
+    results = run_benchmarks(module, args.repeat, args.rounds, args.only)
+    print_results(results)
+    if args.output:
+        report = {
+            "meta": {
+                "target": str(args.target.resolve()),
+                "python": platform.python_version(),
+                "platform": platform.platform(),
+                "repeat": args.repeat,
+                "rounds": args.rounds,
+                "created": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+            },
+            "results": results,
+        }
+        args.output.write_text(json.dumps(report, indent=2), encoding="utf-8")
+
+
+if __name__ == "__main__":
+    main()
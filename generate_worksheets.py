@@ -1,15 +1,59 @@
 import argparse
+import hashlib
+import io
+import json
 import math
+import os
+import queue
 import random
-from dataclasses import dataclass
+import shutil
+import threading
+import time
+import zipfile
+import zlib
+from array import array
+from bisect import bisect_right
+from collections import OrderedDict, deque
+from concurrent.futures import Future, ProcessPoolExecutor
+from contextlib import nullcontext
+from dataclasses import dataclass, replace
+from functools import lru_cache, partial
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from itertools import chain, combinations, islice
 from pathlib import Path
-from typing import Dict, List, Optional, Sequence, Tuple
+from typing import (
+    BinaryIO,
+    Callable,
+    ClassVar,
+    Deque,
+    Dict,
+    FrozenSet,
+    Generic,
+    IO,
+    Iterable,
+    Iterator,
+    List,
+    Optional,
+    Sequence,
+    TextIO,
+    Tuple,
+    TypeVar,
+    Union,
+)
+from urllib.parse import parse_qs, urlsplit
 
 try:
     import yaml  # type: ignore
 except ImportError:  # pragma: no cover - fallback for offline environments
     yaml = None
 
+try:
+    import numpy as np  # type: ignore
+except ImportError:  # pragma: no cover - the random backend needs no extra packages
+    np = None
+
+T = TypeVar("T")
+
 
 def _parse_inline_value(value: str):
     value = value.strip()
@@ -92,17 +136,35 @@ def simple_yaml_load(text: str):  # pragma: no cover - used when PyYAML is unava
     return result
 
 
+STYLESHEET_MODES = ("inline", "external")
+OUTPUT_FORMATS = ("files", "zip")
+OUTPUT_BACKENDS = ("html", "pdf")
+
+
 @dataclass
 class OutputConfig:
     out_dir: Path
     file_prefix: str
+    stylesheet: str = "inline"
+    # "files" writes one HTML file per page, "zip" streams all pages into <file_prefix>.zip
+    format: str = "files"
+    # "html" pages styled by CSS, or "pdf" pages laid out by the built-in PDF writer
+    backend: str = "html"
 
 
 @dataclass
 class WorksheetConfig:
     header_left_label: str
     header_right_label: str
+    # raw task settings as written in the config, compiled into `plans` by load_config
     tasks: List[Dict]
+    plans: Tuple["TaskPlan", ...]
+    # per task: its `id`, or its position when it has none; names the task's random substream
+    stream_keys: Tuple[str, ...] = ()
+
+
+RANDOM_BACKENDS = ("random", "numpy")
+RANDOM_STREAMS = ("sheet", "task")
 
 
 @dataclass
@@ -111,6 +173,11 @@ class Config:
     worksheet_count: int
     output: OutputConfig
     worksheet: WorksheetConfig
+    # "numpy" draws the numeric tasks with vectorized NumPy generators, one seed per sheet
+    random_backend: str = "random"
+    # "sheet": all tasks of a sheet draw from one stream in order; "task": every task has
+    # its own substream, so editing one task leaves the others unchanged
+    random_streams: str = "sheet"
 
 
 def load_config(path: Path) -> Config:
@@ -123,6 +190,28 @@ def load_config(path: Path) -> Config:
 
     output_cfg = raw.get("output", {})
     worksheet_cfg = raw.get("worksheet", {})
+    stylesheet = str(output_cfg.get("stylesheet", "inline"))
+    if stylesheet not in STYLESHEET_MODES:
+        raise ValueError(f"output.stylesheet must be one of {', '.join(STYLESHEET_MODES)}, got {stylesheet!r}")
+    output_format = str(output_cfg.get("format", "files"))
+    if output_format not in OUTPUT_FORMATS:
+        raise ValueError(f"output.format must be one of {', '.join(OUTPUT_FORMATS)}, got {output_format!r}")
+    backend = str(output_cfg.get("backend", "html"))
+    if backend not in OUTPUT_BACKENDS:
+        raise ValueError(f"output.backend must be one of {', '.join(OUTPUT_BACKENDS)}, got {backend!r}")
+    random_backend = str(raw.get("random_backend", "random"))
+    if random_backend not in RANDOM_BACKENDS:
+        raise ValueError(f"random_backend must be one of {', '.join(RANDOM_BACKENDS)}, got {random_backend!r}")
+    if random_backend == "numpy" and np is None:
+        raise ValueError("random_backend numpy needs NumPy, install it with 'pip install numpy'")
+    random_streams = str(raw.get("random_streams", "sheet"))
+    if random_streams not in RANDOM_STREAMS:
+        raise ValueError(f"random_streams must be one of {', '.join(RANDOM_STREAMS)}, got {random_streams!r}")
+    # YAML reads e.g. `title: 2024-05-01` as a date; titles are shown as written
+    tasks = [
+        {**task, "title": str(task["title"])} if not isinstance(task.get("title", ""), str) else task
+        for task in worksheet_cfg.get("tasks", [])
+    ]
 
     return Config(
         base_seed=int(raw.get("base_seed", 0)),
@@ -130,56 +219,423 @@ def load_config(path: Path) -> Config:
         output=OutputConfig(
             out_dir=Path(output_cfg.get("out_dir", "out")),
             file_prefix=str(output_cfg.get("file_prefix", "worksheet")),
+            stylesheet=stylesheet,
+            format=output_format,
+            backend=backend,
         ),
         worksheet=WorksheetConfig(
             header_left_label=str(worksheet_cfg.get("header_left_label", "Name")),
             header_right_label=str(worksheet_cfg.get("header_right_label", "Datum")),
-            tasks=list(worksheet_cfg.get("tasks", [])),
+            tasks=tasks,
+            plans=compile_tasks(tasks),
+            stream_keys=task_stream_keys(tasks),
         ),
+        random_backend=random_backend,
+        random_streams=random_streams,
     )
 
 
+CONFIG_SUFFIXES = (".yaml", ".yml")
+
+
+def resolve_config_paths(paths: Sequence[Path]) -> List[Path]:
+    # directories contribute their *.yaml / *.yml files in name order
+    resolved = []
+    for path in paths:
+        if path.is_dir():
+            found = sorted(p for p in path.iterdir() if p.suffix in CONFIG_SUFFIXES and p.is_file())
+            if not found:
+                raise ValueError(f"No config files ({', '.join(CONFIG_SUFFIXES)}) in {path}")
+            resolved.extend(found)
+        else:
+            resolved.append(path)
+    return resolved
+
+
+def load_configs(paths: Sequence[Path]) -> List[Tuple[Path, Config]]:
+    # several configs in one run must not overwrite each other's files
+    configs = []
+    targets: Dict[Tuple[Path, str], Path] = {}
+    for path in resolve_config_paths(paths):
+        try:
+            cfg = load_config(path)
+        except ValueError as exc:
+            raise ValueError(f"{path}: {exc}") from None
+        target = (cfg.output.out_dir.resolve(), cfg.output.file_prefix)
+        if target in targets:
+            raise ValueError(
+                f"{targets[target]} and {path} both write {cfg.output.file_prefix}_* files to {cfg.output.out_dir}"
+            )
+        targets[target] = path
+        configs.append((path, cfg))
+    return configs
+
+
 def ensure_output_dir(path: Path) -> None:
     path.mkdir(parents=True, exist_ok=True)
 
 
+# ---------- Profiling ----------
+
+class Profiler:
+    # wall time per generator/renderer, retry counters of the sampling loops and
+    # bytes per written file; enabled with --profile
+    def __init__(self) -> None:
+        self.timings: Dict[str, List[float]] = {}
+        self.counters: Dict[str, int] = {}
+        self.files: Dict[str, int] = {}
+
+    def add_time(self, name: str, seconds: float) -> None:
+        entry = self.timings.setdefault(name, [0, 0.0])
+        entry[0] += 1
+        entry[1] += seconds
+
+    def count(self, name: str, amount: int = 1) -> None:
+        self.counters[name] = self.counters.get(name, 0) + amount
+
+    def add_file(self, name: str, size: int) -> None:
+        self.files[name] = size
+
+    def snapshot(self) -> Dict:
+        return {"timings": self.timings, "counters": self.counters, "files": self.files}
+
+    def merge(self, snapshot: Dict) -> None:
+        for name, (calls, seconds) in snapshot["timings"].items():
+            entry = self.timings.setdefault(name, [0, 0.0])
+            entry[0] += calls
+            entry[1] += seconds
+        for name, amount in snapshot["counters"].items():
+            self.count(name, amount)
+        self.files.update(snapshot["files"])
+
+    def report(self) -> Dict:
+        return {
+            "timings": {
+                name: {"calls": int(calls), "seconds": seconds, "mean_seconds": seconds / calls if calls else 0.0}
+                for name, (calls, seconds) in sorted(self.timings.items())
+            },
+            "counters": dict(sorted(self.counters.items())),
+            "files": {
+                "count": len(self.files),
+                "total_bytes": sum(self.files.values()),
+                "largest": max(self.files.items(), key=lambda item: item[1], default=(None, 0))[0],
+                "bytes": dict(sorted(self.files.items())),
+            },
+        }
+
+    def print_summary(self) -> None:
+        report = self.report()
+        print(f"{'section':40} {'calls':>8} {'total ms':>10} {'mean us':>10}")
+        for name, entry in report["timings"].items():
+            print(f"{name:40} {entry['calls']:>8} {entry['seconds'] * 1e3:>10.1f} {entry['mean_seconds'] * 1e6:>10.1f}")
+        if report["counters"]:
+            print(f"{'counter':40} {'count':>8}")
+            for name, amount in report["counters"].items():
+                print(f"{name:40} {amount:>8}")
+        files = report["files"]
+        if files["count"]:
+            print(
+                f"files written: {files['count']}, {files['total_bytes']} bytes, "
+                f"largest {files['largest']} ({files['bytes'][files['largest']]} bytes)"
+            )
+
+
+PROFILE: Optional[Profiler] = None
+
+
 # ---------- Task generation helpers ----------
 
-def generate_number_dictation(data: Dict, rng: random.Random) -> Dict:
-    return {
-        "box_count": int(data.get("box_count", 10)),
-        "show_helper_numbers": bool(data.get("show_helper_numbers", False)),
-        "title": data.get("title", "Zahlendiktat"),
-    }
+UNIQUE_SCOPES = ("sheet", "batch")
+UNIQUE_TASK_TYPES = ("compare_numbers", "arithmetic_list", "number_word_table", "ordering")
+UNIQUE_DRAW_ATTEMPTS = 32
+UNIQUE_ENUMERATION_LIMIT = 1_000_000
+UNIQUE_CHECKPOINT_INTERVAL = 64
+
+
+class UniqueItemsExhausted(ValueError):
+    pass
+
+
+class UniqueItemIndex:
+    # hashed index of items already issued per task type, for tasks with the
+    # `unique` option; "sheet" entries are reset for every sheet, "batch"
+    # entries live for the whole run
+    def __init__(self, checkpoints: bool = False) -> None:
+        self.batch: Dict[str, set] = {}
+        self.sheet: Dict[str, set] = {}
+        self.position = 0
+        # with `checkpoints`, copies of `batch` before every UNIQUE_CHECKPOINT_INTERVAL-th
+        # sheet, for random access (serve)
+        self.checkpoints: Optional[Dict[int, Dict[str, FrozenSet]]] = {0: {}} if checkpoints else None
+
+    def issued(self, scope: str, task_type: str) -> set:
+        index = self.batch if scope == "batch" else self.sheet
+        return index.setdefault(task_type, set())
+
+    def _checkpoint(self) -> None:
+        if self.checkpoints is not None and self.position % UNIQUE_CHECKPOINT_INTERVAL == 0:
+            self.checkpoints[self.position] = {task_type: frozenset(items) for task_type, items in self.batch.items()}
+
+    def start_sheet(self, cfg: "Config", index: int) -> None:
+        # sheets skipped since the last call (or since the nearest checkpoint
+        # after a jump back) are generated again, so sheet `index` sees the
+        # same issued items as in a full serial run
+        if index < self.position:
+            self.position = max(position for position in self.checkpoints or (0,) if position <= index)
+            saved = self.checkpoints[self.position] if self.checkpoints else {}
+            self.batch = {task_type: set(items) for task_type, items in saved.items()}
+        while self.position < index:
+            self._checkpoint()
+            self.sheet = {}
+            generate_tasks(cfg.worksheet.plans, sheet_rngs(cfg, self.position), self)
+            self.position += 1
+        self._checkpoint()
+        self.sheet = {}
+        self.position = index + 1
+
+
+def uses_batch_uniqueness(plans: Sequence["TaskPlan"]) -> bool:
+    return any(getattr(plan, "unique", None) == "batch" for plan in plans)
+
+
+def _compile_unique(data: Dict) -> Optional[str]:
+    scope = data.get("unique")
+    if scope and scope not in UNIQUE_SCOPES:
+        raise ValueError(f"unique must be one of {', '.join(UNIQUE_SCOPES)}, got {scope!r}")
+    return scope or None
+
+
+def _compile_count(data: Dict, key: str, default: int, minimum: int = 0) -> int:
+    value = int(data.get(key, default))
+    if value < minimum:
+        raise ValueError(f"{key} must be at least {minimum}, got {value}")
+    return value
+
+
+def _check_sheet_unique(plan: "TaskPlan", key: str, count: int, available: int) -> None:
+    # a sheet cannot repeat items, so one task cannot ask for more than there are;
+    # batch scope only fails once earlier sheets used them up
+    if plan.unique == "sheet" and count > available:
+        raise ValueError(f"{key} {count} exceeds the {available} distinct items unique: sheet can draw from")
+
+
+def _compile_choice(data: Dict, key: str, default: str, allowed: Sequence[str]) -> str:
+    value = data.get(key, default)
+    if value not in allowed:
+        raise ValueError(f"{key} must be one of {', '.join(allowed)}, got {value!r}")
+    return value
+
+
+class UnusedItems(Generic[T]):
+    # draws for one task: plain draws are accepted when their key is new; after
+    # UNIQUE_DRAW_ATTEMPTS repeats in a row one of the unused candidates is picked
+    # directly. The candidates are listed once; later fallbacks only drop the
+    # items issued in between
+    def __init__(
+        self,
+        issued: set,
+        rng: random.Random,
+        key: Callable[[T], object] = lambda item: item,
+        candidates: Optional[Callable[[], Iterable[T]]] = None,
+    ) -> None:
+        self.issued = issued
+        self.rng = rng
+        self.key = key
+        self.candidates = candidates
+        self.remaining: Optional[List[T]] = None
+        self.stale = False
+
+    def draw(self, draw: Callable[[], T]) -> T:
+        for _ in range(UNIQUE_DRAW_ATTEMPTS):
+            item = draw()
+            item_key = self.key(item)
+            if item_key not in self.issued:
+                self.issued.add(item_key)
+                self.stale = self.remaining is not None
+                return item
+            if PROFILE is not None:
+                PROFILE.count("unique.redraws")
+        if self.remaining is None:
+            candidates = self.candidates() if self.candidates else ()
+            self.remaining = [item for item in candidates if self.key(item) not in self.issued]
+        elif self.stale:
+            self.remaining = [item for item in self.remaining if self.key(item) not in self.issued]
+        self.stale = False
+        if not self.remaining:
+            raise UniqueItemsExhausted(f"all {len(self.issued)} distinct items have already been used")
+        item = self.remaining.pop(self.rng.randrange(len(self.remaining)))
+        self.issued.add(self.key(item))
+        return item
+
+
+@dataclass(frozen=True, slots=True)
+class NumberDictationPlan:
+    task_type: ClassVar[str] = "number_dictation"
+    title: str
+    box_count: int
+    show_helper_numbers: bool
+
+
+def compile_number_dictation(data: Dict) -> NumberDictationPlan:
+    return NumberDictationPlan(
+        title=data.get("title", "Zahlendiktat"),
+        box_count=_compile_count(data, "box_count", 10),
+        show_helper_numbers=bool(data.get("show_helper_numbers", False)),
+    )
+
+
+@dataclass(frozen=True, slots=True)
+class NumberDictationData:
+    title: str
+    box_count: int
+    show_helper_numbers: bool
+
+
+def generate_number_dictation(plan: NumberDictationPlan, rng: random.Random) -> NumberDictationData:
+    return NumberDictationData(title=plan.title, box_count=plan.box_count, show_helper_numbers=plan.show_helper_numbers)
+
+
+@dataclass(frozen=True, slots=True)
+class CompareNumbersPlan:
+    task_type: ClassVar[str] = "compare_numbers"
+    title: str
+    item_count: int
+    min_value: int
+    max_value: int
+    columns: int
+    equal_probability: float
+    # unequal pairs differ in a single digit where the range allows it
+    close_numbers: bool = False
+    unique: Optional[str] = None
+
+    def distinct_items(self) -> Iterator[Tuple[int, int, str]]:
+        # exactly the items generate_compare_numbers can draw: "=" only if equal_probability > 0,
+        # nothing else if it is 1, and only close partners with close_numbers
+        values = range(self.min_value, self.max_value + 1)
+        equal = ((value, value, "=") for value in values) if self.equal_probability > 0 else ()
+        if self.equal_probability >= 1:
+            return iter(equal)
+        if self.close_numbers:
+            unequal = (
+                (a, b, "<" if a < b else ">") for a in values for b in close_partners(a, self.min_value, self.max_value)
+            )
+        else:
+            unequal = ((a, b, "<" if a < b else ">") for a in values for b in values if a != b)
+        return chain(equal, unequal)
 
 
-def generate_compare_numbers(data: Dict, rng: random.Random) -> Dict:
-    item_count = int(data.get("item_count", 6))
+def compile_compare_numbers(data: Dict) -> CompareNumbersPlan:
     min_value = max(0, int(data.get("min_value", 0)))
-    max_value = min(100, int(data.get("max_value", 100)))
+    max_value = max(0, int(data.get("max_value", 100)))
     if min_value > max_value:
         min_value, max_value = max_value, min_value
-    columns = int(data.get("columns", 3))
     equal_probability = max(0.0, min(1.0, float(data.get("equal_probability", 0.05))))
+    if min_value == max_value and equal_probability < 1.0:
+        raise ValueError(f"compare_numbers needs two distinct values between {min_value} and {max_value}")
+    plan = CompareNumbersPlan(
+        title=data.get("title", "Vergleiche! <, >, ="),
+        item_count=_compile_count(data, "item_count", 6),
+        min_value=min_value,
+        max_value=max_value,
+        columns=_compile_count(data, "columns", 3, minimum=1),
+        equal_probability=equal_probability,
+        close_numbers=bool(data.get("close_numbers", False)),
+        unique=_compile_unique(data),
+    )
+    if plan.unique == "sheet":
+        available = sum(1 for _ in islice(plan.distinct_items(), plan.item_count))
+        _check_sheet_unique(plan, "item_count", plan.item_count, available)
+    return plan
+
+
+def close_partners(value: int, min_value: int, max_value: int) -> List[int]:
+    # numbers of the same length within the range that differ from value in exactly one digit
+    partners = []
+    digits = len(str(value))
+    for position in range(digits):
+        place = 10**position
+        digit = value // place % 10
+        base = value - digit * place
+        lowest = 1 if position == digits - 1 and position else 0
+        low = max(lowest, -(-(min_value - base) // place))
+        high = min(9, (max_value - base) // place)
+        partners.extend(base + d * place for d in range(low, high + 1) if d != digit)
+    return partners
+
+
+def _other_value(randint: Callable[[int, int], int], value: int, min_value: int, max_value: int) -> int:
+    # drawn from the range without one value, skipping over value, so no redraws are needed
+    other = randint(min_value, max_value - 1)
+    return other + (other >= value)
+
+
+@dataclass(frozen=True, slots=True)
+class CompareNumbersData:
+    title: str
+    columns: int
+    # item i compares left[i] with right[i], relations[i] being "<", ">" or "="
+    left: array
+    right: array
+    relations: str
+
+    @classmethod
+    def from_items(cls, title: str, columns: int, items: Sequence[Tuple[int, int, str]]) -> "CompareNumbersData":
+        left, right, relations = tuple(zip(*items)) or ((), (), ())
+        return cls(
+            title=title, columns=columns, left=array("q", left), right=array("q", right), relations="".join(relations)
+        )
 
-    items = []
-    for _ in range(item_count):
+    def __len__(self) -> int:
+        return len(self.relations)
+
+    def item(self, index: int) -> Tuple[int, int, str]:
+        return self.left[index], self.right[index], self.relations[index]
+
+    def items(self) -> Iterator[Tuple[int, int, str]]:
+        return zip(self.left, self.right, self.relations)
+
+
+def generate_compare_numbers(
+    plan: CompareNumbersPlan, rng: random.Random, issued: Optional[set] = None
+) -> CompareNumbersData:
+    min_value = plan.min_value
+    max_value = plan.max_value
+    equal_probability = plan.equal_probability
+    close_fallbacks = 0
+
+    def draw_item() -> Tuple[int, int, str]:
+        nonlocal close_fallbacks
         if rng.random() < equal_probability:
             value = rng.randint(min_value, max_value)
-            items.append((value, value, "="))
-            continue
+            return value, value, "="
 
         a = rng.randint(min_value, max_value)
-        b = rng.randint(min_value, max_value)
-        while a == b:
-            b = rng.randint(min_value, max_value)
-        items.append((a, b, "<" if a < b else ">"))
+        partners = close_partners(a, min_value, max_value) if plan.close_numbers else ()
+        if partners:
+            b = partners[rng.randrange(len(partners))]
+        else:
+            close_fallbacks += plan.close_numbers
+            b = _other_value(rng.randint, a, min_value, max_value)
+        return a, b, "<" if a < b else ">"
+
+    def all_items() -> Iterable[Tuple[int, int, str]]:
+        size = max_value - min_value + 1
+        partners = 9 * len(str(max_value)) if plan.close_numbers else size
+        if equal_probability < 1 and size * partners > UNIQUE_ENUMERATION_LIMIT:
+            return []
+        return plan.distinct_items()
+
+    unused = UnusedItems(issued, rng, candidates=all_items) if issued is not None else None
+    items = []
+    for _ in range(plan.item_count):
+        if unused is None:
+            items.append(draw_item())
+        else:
+            items.append(unused.draw(draw_item))
 
-    return {
-        "title": data.get("title", "Vergleiche! <, >, ="),
-        "items": items,
-        "columns": columns,
-    }
+    if PROFILE is not None:
+        PROFILE.count("compare_numbers.close_fallbacks", close_fallbacks)
+    return CompareNumbersData.from_items(plan.title, plan.columns, items)
 
 
 def _choose_middle_value(rng: random.Random, min_value: int, max_value: int) -> int:
@@ -188,102 +644,344 @@ def _choose_middle_value(rng: random.Random, min_value: int, max_value: int) ->
     return rng.randint(min_value + 1, max_value - 1)
 
 
-def generate_pre_succ_table(data: Dict, rng: random.Random) -> Dict:
-    row_count = int(data.get("row_count", 6))
-    min_value = max(10, int(data.get("min_value", 10)))
-    max_value = min(100, int(data.get("max_value", 100)))
+PRE_SUCC_GIVEN_FIELDS = ("middle", "left", "right", "mixed")
+PRE_SUCC_COLUMNS = ("left", "middle", "right")
+
+
+@dataclass(frozen=True, slots=True)
+class PreSuccTablePlan:
+    task_type: ClassVar[str] = "pre_succ_table"
+    title: str
+    row_count: int
+    min_value: int
+    max_value: int
+    given_field: str
+
+
+def compile_pre_succ_table(data: Dict) -> PreSuccTablePlan:
+    min_value = max(0, int(data.get("min_value", 10)))
+    max_value = max(0, int(data.get("max_value", 100)))
     if min_value > max_value:
         min_value, max_value = max_value, min_value
-    given_field = data.get("given_field", "middle")
 
-    min_value = max(min_value, 10)
-    max_value = min(max_value, 100)
     if max_value - min_value < 2:
         raise ValueError("Range too small for predecessor/successor table")
 
-    rows = []
-    for _ in range(row_count):
-        middle_value = _choose_middle_value(rng, min_value, max_value)
-        current_given = given_field
-        if given_field == "mixed":
-            current_given = rng.choice(["left", "middle", "right"])
-        predecessor = middle_value - 1
-        successor = middle_value + 1
-        rows.append({
-            "given_field": current_given,
-            "values": {
-                "left": predecessor,
-                "middle": middle_value,
-                "right": successor,
-            },
-        })
+    return PreSuccTablePlan(
+        title=data.get("title", "Vorgänger / Zahl / Nachfolger"),
+        row_count=_compile_count(data, "row_count", 6),
+        min_value=min_value,
+        max_value=max_value,
+        given_field=_compile_choice(data, "given_field", "middle", PRE_SUCC_GIVEN_FIELDS),
+    )
+
+
+@dataclass(frozen=True, slots=True)
+class PreSuccTableData:
+    title: str
+    middles: array
+    # per row, the PRE_SUCC_COLUMNS index of the value shown on the worksheet
+    given: bytes
+
+    def rows(self) -> Iterator[Tuple[int, Tuple[int, int, int]]]:
+        # (given column, (predecessor, number, successor)) per row
+        for middle, given in zip(self.middles, self.given):
+            yield given, (middle - 1, middle, middle + 1)
+
 
-    return {
-        "title": data.get("title", "Vorgänger / Zahl / Nachfolger"),
-        "rows": rows,
-    }
+def generate_pre_succ_table(plan: PreSuccTablePlan, rng: random.Random) -> PreSuccTableData:
+    middles = array("q")
+    if plan.given_field != "mixed":
+        given = bytes([PRE_SUCC_COLUMNS.index(plan.given_field)]) * plan.row_count
+        for _ in range(plan.row_count):
+            middles.append(_choose_middle_value(rng, plan.min_value, plan.max_value))
+        return PreSuccTableData(title=plan.title, middles=middles, given=given)
 
+    mixed = bytearray()
+    for _ in range(plan.row_count):
+        middles.append(_choose_middle_value(rng, plan.min_value, plan.max_value))
+        mixed.append(rng.randrange(len(PRE_SUCC_COLUMNS)))
+    return PreSuccTableData(title=plan.title, middles=middles, given=bytes(mixed))
 
-def generate_arithmetic_list(data: Dict, rng: random.Random) -> Dict:
-    item_count = int(data.get("item_count", 8))
-    operations = data.get("operations", ["+", "-"])
+
+def is_crossing_ten_add(x: int, y: int) -> bool:
+    ones_sum = (x % 10) + (y % 10)
+    return ones_sum > 10
+
+
+def is_crossing_ten_subtract(x: int, y: int) -> bool:
+    minuend_ones = x % 10
+    if minuend_ones == 0:
+        return False
+    return minuend_ones < (y % 10)
+
+
+# first operands up to which arithmetic_candidates keeps per-operand prefix counts
+# (four array("q") of this length); wider ranges are sampled by rejection instead
+ARITHMETIC_INDEX_LIMIT = 50_000
+ARITHMETIC_REJECTION_ATTEMPTS = 1000
+
+
+def _residue_count(lo: int, hi: int, first: int, last: int) -> int:
+    # integers in [lo, hi] whose last digit lies in [first, last]
+    width = last - first + 1
+    if lo > hi or width <= 0:
+        return 0
+
+    def upto(x: int) -> int:
+        return (x // 10) * width + max(0, min(width, x % 10 - first + 1))
+
+    return upto(hi) - upto(lo - 1)
+
+
+def _residue_nth(lo: int, first: int, last: int, n: int) -> int:
+    # the n-th (0-based) integer from lo upwards whose last digit lies in [first, last]
+    width = last - first + 1
+    target = (lo - 1) // 10 * width + max(0, min(width, (lo - 1) % 10 - first + 1)) + n
+    return 10 * (target // width) + first + target % width
+
+
+@dataclass(frozen=True)
+class ArithmeticCandidates:
+    # the valid (a, b) pairs per operation and crossing-ten, in order of a, then b.
+    # For a fixed a the valid b form an interval, and crossing ten only depends on
+    # the last digits, which leaves an interval of last digits for b; so the pairs of
+    # one a are counted and the n-th one is found arithmetically, without listing them
+    min_value: int
+    max_value: int
+    max_second_operand: int
+    allow_negative: bool
+    # per (op, crossing): number of pairs whose a is below min_value + i, or None
+    # when the range is too wide and pairs are drawn by rejection
+    prefix: Optional[Dict[Tuple[str, bool], array]]
+    totals: Dict[Tuple[str, bool], int]
+
+    def second_range(self, op_symbol: str, a: int) -> Tuple[int, int]:
+        if op_symbol == "+":
+            lo = max(self.min_value, self.min_value - a)
+            if not self.allow_negative:
+                lo = max(lo, -a)
+            return lo, min(self.max_second_operand, self.max_value - a)
+        hi = min(self.max_second_operand, a - self.min_value)
+        if not self.allow_negative:
+            hi = min(hi, a)
+        return max(self.min_value, a - self.max_value), hi
+
+    @staticmethod
+    def second_digits(op_symbol: str, crossing: bool, a: int) -> Tuple[int, int]:
+        # last digits of b for which is_crossing_ten_add/_subtract(a, b) == crossing
+        ones = a % 10
+        if op_symbol == "+":
+            return (11 - ones, 9) if crossing else (0, min(9, 10 - ones))
+        if ones == 0:
+            return (1, 0) if crossing else (0, 9)
+        return (ones + 1, 9) if crossing else (0, ones)
+
+    def count_for(self, op_symbol: str, crossing: bool, a: int) -> int:
+        return _residue_count(*self.second_range(op_symbol, a), *self.second_digits(op_symbol, crossing, a))
+
+    def count(self, op_symbol: str, crossing: bool) -> int:
+        # number of pairs; 1 stands for "some" above ARITHMETIC_INDEX_LIMIT
+        return self.totals[("+" if op_symbol == "+" else "-", crossing)]
+
+    def nth(self, op_symbol: str, crossing: bool, n: int) -> Tuple[int, int]:
+        key = ("+" if op_symbol == "+" else "-", crossing)
+        prefix = self.prefix[key]
+        offset = bisect_right(prefix, n) - 1
+        a = self.min_value + offset
+        first, last = self.second_digits(key[0], crossing, a)
+        lo, _ = self.second_range(key[0], a)
+        return a, _residue_nth(lo, first, last, n - prefix[offset])
+
+    def pick(self, op_symbol: str, crossing: bool, randrange: Callable[[int], int]) -> Tuple[int, int]:
+        if self.prefix is not None:
+            return self.nth(op_symbol, crossing, randrange(self.count(op_symbol, crossing)))
+        # a uniform (a, slot) is accepted when the slot is one of a's pairs, which
+        # keeps the pairs uniformly distributed
+        span = self.max_second_operand - self.min_value + 1
+        for _ in range(ARITHMETIC_REJECTION_ATTEMPTS):
+            a = self.min_value + randrange(self.max_value - self.min_value + 1)
+            slot = randrange(span)
+            if slot < self.count_for(op_symbol, crossing, a):
+                return a, self._second(op_symbol, crossing, a, slot)
+        # very sparse pairs: the first a with pairs from a random start
+        start = randrange(self.max_value - self.min_value + 1)
+        for offset in range(self.max_value - self.min_value + 1):
+            a = self.min_value + (start + offset) % (self.max_value - self.min_value + 1)
+            count = self.count_for(op_symbol, crossing, a)
+            if count:
+                return a, self._second(op_symbol, crossing, a, randrange(count))
+        raise ValueError("Unable to generate arithmetic item with given constraints")
+
+    def _second(self, op_symbol: str, crossing: bool, a: int, n: int) -> int:
+        first, last = self.second_digits(op_symbol, crossing, a)
+        return _residue_nth(self.second_range(op_symbol, a)[0], first, last, n)
+
+    def pairs(self, op_symbol: str, crossing: bool) -> Iterator[Tuple[int, int]]:
+        for a in range(self.min_value, self.max_value + 1):
+            lo, hi = self.second_range(op_symbol, a)
+            first, last = self.second_digits(op_symbol, crossing, a)
+            for b in range(lo, hi + 1):
+                if first <= b % 10 <= last:
+                    yield a, b
+
+
+@lru_cache(maxsize=16)
+def arithmetic_candidates(
+    min_value: int, max_value: int, max_second_operand: int, allow_negative: bool
+) -> ArithmeticCandidates:
+    # O(max_value - min_value) counting, no per-pair storage
+    keys = [("+", False), ("+", True), ("-", False), ("-", True)]
+    index = max_value - min_value + 1 <= ARITHMETIC_INDEX_LIMIT
+    probe = ArithmeticCandidates(min_value, max_value, max_second_operand, allow_negative, None, {})
+    if not index:
+        # only whether each bucket has pairs at all; stops at the first a that has some
+        totals = {
+            key: int(any(probe.count_for(*key, a) for a in range(min_value, max_value + 1))) for key in keys
+        }
+        return replace(probe, totals=totals)
+    # the loop is second_range/second_digits/_residue_count inlined, as it runs once per a
+    plus_keep, plus_cross, minus_keep, minus_cross = (array("q", [0]) for _ in keys)
+    totals = [0, 0, 0, 0]
+    for a in range(min_value, max_value + 1):
+        ones = a % 10
+        lo = max(min_value, min_value - a) if allow_negative else max(min_value, -a)
+        hi = min(max_second_operand, max_value - a)
+        if lo <= hi:
+            crossing = _residue_count(lo, hi, 11 - ones, 9) if ones > 1 else 0
+            totals[0] += hi - lo + 1 - crossing
+            totals[1] += crossing
+        lo = max(min_value, a - max_value)
+        hi = min(max_second_operand, a - min_value)
+        if not allow_negative:
+            hi = min(hi, a)
+        if lo <= hi:
+            crossing = _residue_count(lo, hi, ones + 1, 9) if ones else 0
+            totals[2] += hi - lo + 1 - crossing
+            totals[3] += crossing
+        plus_keep.append(totals[0])
+        plus_cross.append(totals[1])
+        minus_keep.append(totals[2])
+        minus_cross.append(totals[3])
+    prefix = dict(zip(keys, (plus_keep, plus_cross, minus_keep, minus_cross)))
+    return replace(probe, prefix=prefix, totals={key: counts[-1] for key, counts in prefix.items()})
+
+
+@dataclass(frozen=True, slots=True)
+class ArithmeticListPlan:
+    task_type: ClassVar[str] = "arithmetic_list"
+    title: str
+    item_count: int
+    operations: Tuple[str, ...]
+    min_value: int
+    max_value: int
+    allow_negative: bool
+    columns: int
+    cross_ten_probability: float
+    max_second_operand: int
+    unique: Optional[str] = None
+
+    def candidates(self) -> ArithmeticCandidates:
+        return arithmetic_candidates(self.min_value, self.max_value, self.max_second_operand, self.allow_negative)
+
+
+def compile_arithmetic_list(data: Dict) -> ArithmeticListPlan:
+    operations = tuple(data.get("operations", ["+", "-"]))
+    if not operations or any(op not in ("+", "-") for op in operations):
+        raise ValueError(f"operations must be a non-empty list of '+' and '-', got {list(operations)!r}")
     min_value = int(data.get("min_value", 0))
     max_value = int(data.get("max_value", 20))
-    allow_negative = bool(data.get("allow_negative_results", False))
-    columns = int(data.get("columns", 2))
-    cross_ten_probability = max(0.0, min(1.0, float(data.get("cross_ten_probability", 1.0))))
-    max_second_operand = max(min_value, max(0, min(int(data.get("max_second_operand", 10)), max_value)))
-
-    def is_crossing_ten_add(x: int, y: int) -> bool:
-        ones_sum = (x % 10) + (y % 10)
-        return ones_sum > 10
-
-    def is_crossing_ten_subtract(x: int, y: int) -> bool:
-        minuend_ones = x % 10
-        if minuend_ones == 0:
-            return False
-        return minuend_ones < (y % 10)
+    plan = ArithmeticListPlan(
+        title=data.get("title", "Rechne! Achte auf das Rechenzeichen!"),
+        item_count=_compile_count(data, "item_count", 8),
+        operations=operations,
+        min_value=min_value,
+        max_value=max_value,
+        allow_negative=bool(data.get("allow_negative_results", False)),
+        columns=_compile_count(data, "columns", 2, minimum=1),
+        cross_ten_probability=max(0.0, min(1.0, float(data.get("cross_ten_probability", 1.0)))),
+        max_second_operand=max(min_value, max(0, min(int(data.get("max_second_operand", 10)), max_value))),
+        unique=_compile_unique(data),
+    )
+    candidates = plan.candidates()
+    for op in operations:
+        if not candidates.count(op, True) and not candidates.count(op, False):
+            raise ValueError("Unable to generate arithmetic item with given constraints")
+    available = sum(candidates.count(op, crossing) for op in set(operations) for crossing in (False, True))
+    _check_sheet_unique(plan, "item_count", plan.item_count, available)
+    return plan
+
+
+@dataclass(frozen=True, slots=True)
+class ArithmeticListData:
+    title: str
+    columns: int
+    # item i is first[i] operations[i] second[i]; the result is computed when rendered
+    first: array
+    second: array
+    operations: str
+
+    @classmethod
+    def from_items(cls, title: str, columns: int, items: Sequence[Tuple[int, str, int, int]]) -> "ArithmeticListData":
+        first, operations, second, _ = tuple(zip(*items)) or ((), (), (), ())
+        return cls(
+            title=title,
+            columns=columns,
+            first=array("q", first),
+            second=array("q", second),
+            operations="".join(operations),
+        )
 
-    def generate_candidate(op_symbol: str, require_cross: bool) -> Optional[Tuple[int, int, int]]:
-        max_attempts = 500
-        for _ in range(max_attempts):
-            a = rng.randint(min_value, max_value)
-            b = rng.randint(min_value, max_second_operand)
-            result = a + b if op_symbol == "+" else a - b
+    def __len__(self) -> int:
+        return len(self.operations)
 
-            if not allow_negative and result < 0:
-                continue
-            if result < min_value or result > max_value:
-                continue
+    def item(self, index: int) -> Tuple[int, str, int, int]:
+        a, op, b = self.first[index], self.operations[index], self.second[index]
+        return a, op, b, a + b if op == "+" else a - b
 
-            crossing = is_crossing_ten_add(a, b) if op_symbol == "+" else is_crossing_ten_subtract(a, b)
-            if require_cross and not crossing:
-                continue
-            if not require_cross and crossing:
-                continue
-            return a, b, result
-        return None
+    def items(self) -> Iterator[Tuple[int, str, int, int]]:
+        for a, op, b in zip(self.first, self.operations, self.second):
+            yield a, op, b, a + b if op == "+" else a - b
 
-    items: List[Tuple[int, str, int, int]] = []
-    while len(items) < item_count:
-        op = rng.choice(operations)
-        wants_cross = rng.random() < cross_ten_probability
-        candidate = generate_candidate(op, wants_cross)
 
-        if candidate is None:
-            # try the opposite crossing requirement to avoid getting stuck
-            candidate = generate_candidate(op, not wants_cross)
-        if candidate is None:
-            raise ValueError("Unable to generate arithmetic item with given constraints")
+def generate_arithmetic_list(
+    plan: ArithmeticListPlan, rng: random.Random, issued: Optional[set] = None
+) -> ArithmeticListData:
+    operations = plan.operations
+    cross_ten_probability = plan.cross_ten_probability
+    candidates = plan.candidates()
+    fallbacks = 0
 
-        a, b, result = candidate
-        items.append((a, op, b, result))
+    def draw_item() -> Tuple[int, str, int, int]:
+        nonlocal fallbacks
+        op = rng.choice(operations)
+        wants_cross = rng.random() < cross_ten_probability
+        crossing = wants_cross
+        if not candidates.count(op, crossing):
+            # fall back to the opposite crossing requirement
+            crossing = not wants_cross
+            fallbacks += 1
+
+        a, b = candidates.pick(op, crossing, rng.randrange)
+        return a, op, b, a + b if op == "+" else a - b
+
+    def all_items() -> Iterable[Tuple[int, str, int, int]]:
+        for op in dict.fromkeys(operations):
+            for crossing in (False, True):
+                for a, b in candidates.pairs(op, crossing):
+                    yield a, op, b, a + b if op == "+" else a - b
+
+    unused = UnusedItems(issued, rng, candidates=all_items) if issued is not None else None
+    items: List[Tuple[int, str, int, int]] = []
+    while len(items) < plan.item_count:
+        if unused is None:
+            items.append(draw_item())
+        else:
+            items.append(unused.draw(draw_item))
 
-    return {
-        "title": data.get("title", "Rechne! Achte auf das Rechenzeichen!"),
-        "items": items,
-        "columns": columns,
-    }
+    if PROFILE is not None:
+        PROFILE.count("arithmetic_list.crossing_fallbacks", fallbacks)
+    return ArithmeticListData.from_items(plan.title, plan.columns, items)
 
 
 GERMAN_UNDER_20 = [
@@ -321,177 +1019,504 @@ TENS = {
 }
 
 
-def number_to_word(value: int) -> str:
-    if value < 20:
-        return GERMAN_UNDER_20[value]
-    tens = value // 10 * 10
-    ones = value % 10
-    if ones == 0:
-        return TENS[tens]
-    if ones == 1:
-        return f"einund{TENS[tens]}"
-    return f"{GERMAN_UNDER_20[ones]}und{TENS[tens]}"
-
-
-def underline_and_segment(word: str) -> str:
-    return word.replace("und", "<span class='number-word-and'>und</span>")
-
-
-def _dice_svg(face_value: int) -> str:
-    pip_positions = {
-        1: [(50, 50)],
-        2: [(25, 25), (75, 75)],
-        3: [(25, 25), (50, 50), (75, 75)],
-        4: [(25, 25), (75, 25), (25, 75), (75, 75)],
-        5: [(25, 25), (75, 25), (50, 50), (25, 75), (75, 75)],
-    }
-    circles = "".join(
-        f"<circle cx='{x}' cy='{y}' r='8' />" for x, y in pip_positions.get(face_value, [])
+NUMBER_WORD_MAX = 999_999
+
+NumberWordSegments = Tuple[Tuple[str, bool], ...]
+
+
+def _under_thousand_segments(value: int, before_power: bool = False) -> List[Tuple[str, bool]]:
+    # (text, is_and) pieces of 1..999; "eins" is shortened to "ein" in front of
+    # "tausend" and of the joining "und"
+    hundreds, rest = divmod(value, 100)
+    tens, ones = divmod(rest, 10)
+    segments: List[Tuple[str, bool]] = []
+    if hundreds:
+        segments.append((("ein" if hundreds == 1 else GERMAN_UNDER_20[hundreds]) + "hundert", False))
+    if rest == 1 and before_power:
+        segments.append(("ein", False))
+    elif 0 < rest < 20:
+        segments.append((GERMAN_UNDER_20[rest], False))
+    elif rest and not ones:
+        segments.append((TENS[rest], False))
+    elif rest:
+        ones_word = "ein" if ones == 1 else GERMAN_UNDER_20[ones]
+        segments.extend(((ones_word, False), ("und", True), (TENS[tens * 10], False)))
+    return segments
+
+
+def _merge_segments(segments: Iterable[Tuple[str, bool]]) -> NumberWordSegments:
+    merged: List[Tuple[str, bool]] = []
+    for text, is_and in segments:
+        if merged and not is_and and not merged[-1][1]:
+            merged[-1] = (merged[-1][0] + text, False)
+        else:
+            merged.append((text, is_and))
+    return tuple(merged)
+
+
+@dataclass(frozen=True, slots=True)
+class NumberEntry:
+    word: str
+    # the word as (text, is_and) pieces, one line for the thousands and one for the
+    # rest; built structurally, so the "und" inside "hundert" is never marked
+    lines: Tuple[NumberWordSegments, ...]
+    # the word with the joining "und" underlined and a line break opportunity after "tausend"
+    markup: str
+
+
+@lru_cache(maxsize=1 << 16)
+def number_entry(value: int) -> NumberEntry:
+    # lexicon of the German number words 0..NUMBER_WORD_MAX, filled on first use
+    if not 0 <= value <= NUMBER_WORD_MAX:
+        raise ValueError(f"Number words are available for 0 to {NUMBER_WORD_MAX}, got {value}")
+    thousands, rest = divmod(value, 1000)
+    lines = []
+    if thousands:
+        lines.append(_merge_segments([*_under_thousand_segments(thousands, before_power=True), ("tausend", False)]))
+    if rest or not thousands:
+        lines.append(_merge_segments(_under_thousand_segments(rest)) or (("null", False),))
+    markup = "<wbr>".join(
+        "".join(f"<span class='number-word-and'>{text}</span>" if is_and else text for text, is_and in line)
+        for line in lines
     )
-    return "<svg class='dice-svg' viewBox='0 0 100 100' role='img' aria-label='Würfel'>" f"{circles}</svg>"
+    return NumberEntry(word="".join(text for line in lines for text, _ in line), lines=tuple(lines), markup=markup)
 
 
-def _placeholder_dice_svg() -> str:
-    return (
-        "<svg class='dice-svg dice-placeholder' viewBox='0 0 100 100' role='presentation'>"
-        "<rect x='0' y='0' width='100' height='100' fill='#fff' stroke='#fff' /></svg>"
+DICE_PIP_POSITIONS = {
+    1: [(50, 50)],
+    2: [(25, 25), (75, 75)],
+    3: [(25, 25), (50, 50), (75, 75)],
+    4: [(25, 25), (75, 25), (25, 75), (75, 75)],
+    5: [(25, 25), (75, 25), (50, 50), (25, 75), (75, 75)],
+}
+
+TALLY_TOP_MARGIN = 5
+TALLY_LINE_HEIGHT = 90
+TALLY_BOTTOM_MARGIN = 5
+TALLY_LINE_SPACING = 10
+TALLY_GROUP_GAP = 16
+
+
+def _dice_pips(face_value: int) -> str:
+    # fill is set on the circles themselves: stylesheet selectors do not reach the
+    # copies a <use> of the sprite symbol renders
+    return "".join(
+        f"<circle cx='{x}' cy='{y}' r='8' fill='#000' />" for x, y in DICE_PIP_POSITIONS.get(face_value, [])
     )
 
 
-def _tally_svg(count: int) -> str:
-    if count <= 0:
-        return ""
+def _dice_svg(face_value: int, sprites: bool = False) -> str:
+    content = f"<use href='#dice-{face_value}' />" if sprites else _dice_pips(face_value)
+    return "<svg class='dice-svg' viewBox='0 0 100 100' role='img' aria-label='Würfel'>" f"{content}</svg>"
+
+
+def _placeholder_dice_svg(sprites: bool = False) -> str:
+    content = (
+        "<use href='#dice-placeholder' />"
+        if sprites
+        else "<rect x='0' y='0' width='100' height='100' fill='#fff' stroke='#fff' />"
+    )
+    return f"<svg class='dice-svg dice-placeholder' viewBox='0 0 100 100' role='presentation'>{content}</svg>"
+
+
+def _tally_lines(group_size: int, x: int) -> str:
+    return "".join(
+        f"<line x1='{x + i * TALLY_LINE_SPACING}' y1='{TALLY_TOP_MARGIN}' "
+        f"x2='{x + i * TALLY_LINE_SPACING}' y2='{TALLY_TOP_MARGIN + TALLY_LINE_HEIGHT}' class='tally-line' />"
+        for i in range(group_size)
+    )
 
-    top_margin = 5
-    line_height = 90
-    bottom_margin = 5
-    line_spacing = 10
-    group_gap = 16
 
+def _tally_groups(count: int) -> List[int]:
     groups: List[int] = []
     remaining = count
     while remaining > 0:
         groups.append(min(5, remaining))
         remaining -= groups[-1]
+    return groups
 
+
+def _tally_svg(count: int, sprites: bool = False) -> str:
+    if count <= 0:
+        return ""
+
+    groups = _tally_groups(count)
+    height = TALLY_TOP_MARGIN + TALLY_LINE_HEIGHT + TALLY_BOTTOM_MARGIN
     x = 5
-    lines = []
+    parts = []
     for idx, group_size in enumerate(groups):
-        for _ in range(group_size):
-            lines.append(
-                f"<line x1='{x}' y1='{top_margin}' x2='{x}' y2='{top_margin + line_height}' class='tally-line' />"
+        if sprites:
+            # the symbols draw their first line at x=5, like a standalone tally
+            parts.append(
+                f"<use href='#tally-{group_size}' x='{x - 5}' y='0' "
+                f"width='{group_size * TALLY_LINE_SPACING}' height='{height}' />"
             )
-            x += line_spacing
+        else:
+            parts.append(_tally_lines(group_size, x))
+        x += group_size * TALLY_LINE_SPACING
         if idx < len(groups) - 1:
-            x += group_gap
+            x += TALLY_GROUP_GAP
 
     width = x + 5
-    height = top_margin + line_height + bottom_margin
     return (
         f"<svg class='tally-svg' viewBox='0 0 {width} {height}' role='img' aria-label='Zehner-Striche'>"
-        f"{''.join(lines)}</svg>"
+        f"{''.join(parts)}</svg>"
+    )
+
+
+def _build_svg_sprite_sheet() -> str:
+    height = TALLY_TOP_MARGIN + TALLY_LINE_HEIGHT + TALLY_BOTTOM_MARGIN
+    symbols = [
+        f"<symbol id='dice-{face}' viewBox='0 0 100 100'>{_dice_pips(face)}</symbol>" for face in DICE_PIP_POSITIONS
+    ]
+    symbols.append(
+        "<symbol id='dice-placeholder' viewBox='0 0 100 100'>"
+        "<rect x='0' y='0' width='100' height='100' fill='#fff' stroke='#fff' /></symbol>"
+    )
+    symbols.extend(
+        f"<symbol id='tally-{size}' viewBox='0 0 {size * TALLY_LINE_SPACING} {height}'>{_tally_lines(size, 5)}</symbol>"
+        for size in range(1, 6)
+    )
+    return (
+        "<svg xmlns='http://www.w3.org/2000/svg' width='0' height='0' style='position:absolute' aria-hidden='true'>"
+        f"{''.join(symbols)}</svg>\n  "
     )
 
 
-def _ones_as_dice_faces(ones: int) -> List[str]:
+# dice faces and tally groups referenced via <use> when a task enables svg_sprites
+SVG_SPRITE_SHEET = _build_svg_sprite_sheet()
+
+
+def _ones_as_dice_faces(ones: int, sprites: bool = False) -> List[str]:
     faces: List[str] = []
     while ones >= 5:
-        faces.append(_dice_svg(5))
+        faces.append(_dice_svg(5, sprites))
         ones -= 5
     if ones:
-        faces.append(_dice_svg(ones))
+        faces.append(_dice_svg(ones, sprites))
     return faces
 
 
-def dice_representation(value: int) -> str:
-    tens = value // 10
+@dataclass(frozen=True, slots=True)
+class PlaceValueShape:
+    # base-ten block in a 100 unit high box (SVG coordinates): white faces, then grid lines
+    width: int
+    faces: Tuple[Tuple[Tuple[int, int], ...], ...]
+    lines: Tuple[Tuple[int, int, int, int], ...]
+
+
+def _grid_lines(left: int, top: int, size: int, step: int) -> Tuple[Tuple[int, int, int, int], ...]:
+    inner = range(step, size, step)
+    return tuple((left + d, top, left + d, top + size) for d in inner) + tuple(
+        (left, top + d, left + size, top + d) for d in inner
+    )
+
+
+def _block_faces(width: int, height: int, top: int, depth: int) -> Tuple[Tuple[Tuple[int, int], ...], ...]:
+    # front face with the top and right side of a cuboid seen slightly from above
+    bottom = top + height
+    front = ((0, top), (width, top), (width, bottom), (0, bottom))
+    lid = ((0, top), (depth, top - depth), (width + depth, top - depth), (width, top))
+    side = ((width, top), (width + depth, top - depth), (width + depth, bottom - depth), (width, bottom))
+    return front, lid, side
+
+
+# hundreds flat, thousands cube, ten-thousands bar and hundred-thousands plate
+PLACE_VALUE_SHAPES = {
+    100: PlaceValueShape(40, (((0, 30), (40, 30), (40, 70), (0, 70)),), _grid_lines(0, 30, 40, 4)),
+    1000: PlaceValueShape(48, _block_faces(36, 36, 38, 12), _grid_lines(0, 38, 36, 12)),
+    10000: PlaceValueShape(
+        24, _block_faces(16, 80, 14, 8), tuple((0, 14 + 8 * i, 16, 14 + 8 * i) for i in range(1, 10))
+    ),
+    100000: PlaceValueShape(48, _block_faces(40, 40, 34, 8), _grid_lines(0, 34, 40, 4)),
+}
+PLACE_VALUE_LABELS = {100: "Hunderter", 1000: "Tausender", 10000: "Zehntausender", 100000: "Hunderttausender"}
+PLACE_VALUE_GAP = 6
+PLACE_VALUE_GROUP_GAP = 10
+
+
+def _place_value_layout(place: int, count: int) -> Tuple[List[int], int]:
+    # x offsets of count blocks, grouped by five like the tallies, and the total width
+    shape = PLACE_VALUE_SHAPES[place]
+    offsets = []
+    x = 2
+    for i in range(count):
+        if i and i % 5 == 0:
+            x += PLACE_VALUE_GROUP_GAP
+        offsets.append(x)
+        x += shape.width + PLACE_VALUE_GAP
+    return offsets, x - PLACE_VALUE_GAP + 2
+
+
+@lru_cache(maxsize=None)
+def _place_value_shape_svg(place: int) -> str:
+    shape = PLACE_VALUE_SHAPES[place]
+    faces = "".join(
+        f"<polygon points='{' '.join(f'{x},{y}' for x, y in face)}' fill='#fff' stroke='#000' stroke-width='2' />"
+        for face in shape.faces
+    )
+    lines = "".join(
+        f"<line x1='{x1}' y1='{y1}' x2='{x2}' y2='{y2}' stroke='#000' stroke-width='1' />"
+        for x1, y1, x2, y2 in shape.lines
+    )
+    return faces + lines
+
+
+def _place_value_svg(place: int, count: int) -> str:
+    # drawn inline with presentation attributes, so neither the stylesheet nor the sprite sheet changes
+    offsets, width = _place_value_layout(place, count)
+    shape = _place_value_shape_svg(place)
+    parts = "".join(f"<g transform='translate({x} 0)'>{shape}</g>" for x in offsets)
+    return (
+        f"<svg class='tally-svg' viewBox='0 0 {width} 100' role='img' aria-label='{PLACE_VALUE_LABELS[place]}'>"
+        f"{parts}</svg>"
+    )
+
+
+def dice_representation(value: int, sprites: bool = False) -> str:
+    # hundreds and above as base-ten blocks, tens as tallies and ones as dice
+    tens = value // 10 % 10
     ones = value % 10
-    tally_svg = _tally_svg(tens)
-    dice_faces = _ones_as_dice_faces(ones)
+    blocks = "".join(
+        f"<span class='tallies'>{_place_value_svg(place, value // place % 10)}</span>"
+        for place in sorted(PLACE_VALUE_SHAPES, reverse=True)
+        if value // place % 10
+    )
+    tally_svg = _tally_svg(tens, sprites)
+    dice_faces = _ones_as_dice_faces(ones, sprites)
     if not dice_faces:
-        dice_faces.append(_placeholder_dice_svg())
+        dice_faces.append(_placeholder_dice_svg(sprites))
 
-    tally_html = f"<span class='tallies'>{tally_svg}</span>" if tally_svg else ""
+    tally_html = blocks + (f"<span class='tallies'>{tally_svg}</span>" if tally_svg else "")
     dice_html = "".join(f"<span class='dice-face'>{face}</span>" for face in dice_faces)
+    combo = "<div class='dice-combo'>"
+    if blocks:
+        combo = "<div class='dice-combo' style='flex-wrap: wrap; justify-content: center'>"
 
     if tally_html and dice_html:
-        return f"<div class='dice-combo'>{tally_html}<span class='dice-faces'>{dice_html}</span></div>"
+        return f"{combo}{tally_html}<span class='dice-faces'>{dice_html}</span></div>"
     if tally_html:
-        return f"<div class='dice-combo'>{tally_html}</div>"
-    return f"<div class='dice-combo'><span class='dice-faces'>{dice_html}</span></div>"
+        return f"{combo}{tally_html}</div>"
+    return f"{combo}<span class='dice-faces'>{dice_html}</span></div>"
+
+
+NUMBER_WORD_COLUMNS = ("word", "dice", "number")
+
 
+@dataclass(frozen=True, slots=True)
+class NumberWordTablePlan:
+    task_type: ClassVar[str] = "number_word_table"
+    title: str
+    first_row_example: bool
+    # None when the configured example is not representable; one is drawn per sheet
+    example_number: Optional[int]
+    row_count: int
+    valid_values: "NonTensRange"
+    given_columns: Tuple[str, ...]
+    svg_sprites: bool
+    unique: Optional[str] = None
 
-def generate_number_word_table(data: Dict, rng: random.Random) -> Dict:
-    first_row_example = bool(data.get("first_row_example", True))
+
+@dataclass(frozen=True, slots=True)
+class NonTensRange(Sequence[int]):
+    # the numbers from 21 upwards that are no multiple of ten, indexed by rank
+    # (value - value // 10) instead of listing up to a million of them
+    first_rank: int
+    last_rank: int
+
+    @classmethod
+    def between(cls, min_value: int, max_value: int) -> "NonTensRange":
+        return cls((min_value - 1) - (min_value - 1) // 10 + 1, max_value - max_value // 10)
+
+    def __len__(self) -> int:
+        return max(0, self.last_rank - self.first_rank + 1)
+
+    def __getitem__(self, index: int) -> int:
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError(index)
+        rank = self.first_rank + index
+        return rank + (rank - 1) // 9
+
+    def __iter__(self) -> Iterator[int]:
+        return (rank + (rank - 1) // 9 for rank in range(self.first_rank, self.last_rank + 1))
+
+
+def compile_number_word_table(data: Dict) -> NumberWordTablePlan:
     example_number = int(data.get("example_number", 49))
-    row_count = int(data.get("row_count", 5))
     min_value = max(21, int(data.get("min_value", 21)))
-    max_value = min(99, int(data.get("max_value", 99)))
-    given_columns = data.get("given_columns", ["word"])
+    max_value = min(NUMBER_WORD_MAX, int(data.get("max_value", 99)))
+    given_columns = tuple(data.get("given_columns", ["word"]))
+    unknown = [column for column in given_columns if column not in NUMBER_WORD_COLUMNS]
+    if unknown:
+        raise ValueError(f"given_columns may only contain {', '.join(NUMBER_WORD_COLUMNS)}, got {unknown!r}")
 
     if min_value > max_value:
         min_value, max_value = max_value, min_value
 
-    valid_values = [v for v in range(min_value, max_value + 1) if v >= 21 and v % 10 != 0]
+    valid_values = NonTensRange.between(max(21, min_value), max_value)
     if not valid_values:
         raise ValueError("No valid values available for number word table")
 
-    if example_number < 21 or example_number % 10 == 0:
+    plan = NumberWordTablePlan(
+        title=data.get("title", "Zahlwort – Würfelbild – Zahl"),
+        first_row_example=bool(data.get("first_row_example", True)),
+        example_number=(
+            example_number if 21 <= example_number <= NUMBER_WORD_MAX and example_number % 10 != 0 else None
+        ),
+        row_count=_compile_count(data, "row_count", 5),
+        valid_values=valid_values,
+        given_columns=given_columns,
+        svg_sprites=bool(data.get("svg_sprites", False)),
+        unique=_compile_unique(data),
+    )
+    _check_sheet_unique(plan, "row_count", plan.row_count, len(valid_values))
+    return plan
+
+
+def uses_svg_sprites(plans: Sequence["TaskPlan"]) -> bool:
+    return any(isinstance(plan, NumberWordTablePlan) and plan.svg_sprites for plan in plans)
+
+
+@lru_cache(maxsize=1 << 12)
+def dice_markup(value: int, sprites: bool = False) -> str:
+    return dice_representation(value, sprites)
+
+
+@dataclass(frozen=True, slots=True)
+class NumberWordTableData:
+    title: str
+    # fully given first row, None without one
+    example: Optional[int]
+    numbers: array
+    given_columns: Tuple[str, ...]
+    svg_sprites: bool
+
+    def rows(self) -> Iterator[Tuple[int, Tuple[str, ...]]]:
+        # (number, columns shown on the worksheet); word and dice markup are rendered on demand
+        if self.example is not None:
+            yield self.example, NUMBER_WORD_COLUMNS
+        for number in self.numbers:
+            yield number, self.given_columns
+
+
+def generate_number_word_table(
+    plan: NumberWordTablePlan, rng: random.Random, issued: Optional[set] = None
+) -> NumberWordTableData:
+    valid_values = plan.valid_values
+
+    example_number = plan.example_number
+    if example_number is None:
         example_number = rng.choice(valid_values)
 
-    rows = []
-    if first_row_example:
-        example_word = underline_and_segment(number_to_word(example_number))
-        rows.append({
-            "number": example_number,
-            "word": example_word,
-            "dice": dice_representation(example_number),
-            "given": ["word", "dice", "number"],
-        })
-
-    while len(rows) < row_count + (1 if first_row_example else 0):
-        value = rng.choice(valid_values)
-        word = underline_and_segment(number_to_word(value))
-        rows.append({
-            "number": value,
-            "word": word,
-            "dice": dice_representation(value),
-            "given": given_columns,
-        })
-
-    return {
-        "title": data.get("title", "Zahlwort – Würfelbild – Zahl"),
-        "rows": rows,
-    }
-
-
-def generate_ordering(data: Dict, rng: random.Random) -> Dict:
-    set_size = int(data.get("set_size", 5))
-    min_value = int(data.get("min_value", 0))
-    max_value = int(data.get("max_value", 50))
-    order = data.get("order", "increasing")
-    show_symbols = bool(data.get("show_comparison_symbols", False))
+    def all_values() -> Iterable[int]:
+        return valid_values if len(valid_values) <= UNIQUE_ENUMERATION_LIMIT else []
+
+    unused = UnusedItems(issued, rng, candidates=all_values) if issued is not None else None
+    numbers = array("q")
+    while len(numbers) < plan.row_count:
+        if unused is None:
+            numbers.append(rng.choice(valid_values))
+        else:
+            numbers.append(unused.draw(lambda: rng.choice(valid_values)))
+
+    return NumberWordTableData(
+        title=plan.title,
+        example=example_number if plan.first_row_example else None,
+        numbers=numbers,
+        given_columns=plan.given_columns,
+        svg_sprites=plan.svg_sprites,
+    )
 
-    numbers: List[int] = []
-    while len(numbers) < set_size:
-        candidate = rng.randint(min_value, max_value)
-        if candidate not in numbers:
-            numbers.append(candidate)
 
-    sorted_numbers = sorted(numbers)
-    if order == "decreasing":
-        sorted_numbers = list(reversed(sorted_numbers))
+ORDERING_ORDERS = ("increasing", "decreasing")
 
-    return {
-        "title": data.get(
+
+@dataclass(frozen=True, slots=True)
+class OrderingPlan:
+    task_type: ClassVar[str] = "ordering"
+    title: str
+    set_size: int
+    min_value: int
+    max_value: int
+    order: str
+    show_symbols: bool
+    unique: Optional[str] = None
+
+
+def compile_ordering(data: Dict) -> OrderingPlan:
+    set_size = _compile_count(data, "set_size", 5)
+    min_value = int(data.get("min_value", 0))
+    max_value = int(data.get("max_value", 50))
+    order = _compile_choice(data, "order", "increasing", ORDERING_ORDERS)
+    available = max_value - min_value + 1
+    if set_size > available:
+        raise ValueError(f"set_size {set_size} exceeds the {available} numbers from {min_value} to {max_value}")
+    return OrderingPlan(
+        title=data.get(
             "title",
             "Ordne! Beginne mit der kleinsten Zahl!" if order == "increasing" else "Ordne! Beginne mit der größten Zahl!",
         ),
-        "numbers": numbers,
-        "sorted_numbers": sorted_numbers,
-        "order": order,
-        "show_symbols": show_symbols,
-    }
+        set_size=set_size,
+        min_value=min_value,
+        max_value=max_value,
+        order=order,
+        show_symbols=bool(data.get("show_comparison_symbols", False)),
+        unique=_compile_unique(data),
+    )
+
+
+@dataclass(frozen=True, slots=True)
+class OrderingData:
+    title: str
+    # in the order shown on the worksheet
+    numbers: Tuple[int, ...]
+    order: str
+    show_symbols: bool
+
+    def sorted_numbers(self) -> List[int]:
+        return sorted(self.numbers, reverse=self.order == "decreasing")
+
+
+def ordering_rows(numbers: Sequence[int], cell: float, comparator: float, width: float) -> List[Sequence[int]]:
+    # greedy line breaks for the digit boxes; a comparator stays at the end of its row
+    rows: List[Sequence[int]] = []
+    start = 0
+    x = 0.0
+    for idx, value in enumerate(numbers):
+        group_width = len(str(value)) * cell + (0 if idx == len(numbers) - 1 else comparator)
+        if idx > start and x + group_width > width:
+            rows.append(numbers[start:idx])
+            start = idx
+            x = 0.0
+        x += group_width
+    rows.append(numbers[start:])
+    return rows
+
+
+def generate_ordering(plan: OrderingPlan, rng: random.Random, issued: Optional[set] = None) -> OrderingData:
+    # sampling without replacement takes set_size draws whatever the range;
+    # compile_ordering already rejects sets larger than the range
+    population = range(plan.min_value, plan.max_value + 1)
+
+    def draw_numbers() -> List[int]:
+        return rng.sample(population, plan.set_size)
+
+    def all_sets() -> Iterable[Tuple[int, ...]]:
+        if math.comb(len(population), plan.set_size) > UNIQUE_ENUMERATION_LIMIT:
+            return []
+        return combinations(population, plan.set_size)
+
+    if issued is None:
+        numbers = draw_numbers()
+    else:
+        unused = UnusedItems(issued, rng, key=lambda numbers: tuple(sorted(numbers)), candidates=all_sets)
+        numbers = unused.draw(draw_numbers)
+        if isinstance(numbers, tuple):
+            # listed candidates are in ascending order
+            numbers = rng.sample(numbers, len(numbers))
+    return OrderingData(title=plan.title, numbers=tuple(numbers), order=plan.order, show_symbols=plan.show_symbols)
 
 
 def parse_header_sequence(values: Sequence[int] | Dict[str, int]) -> List[int]:
@@ -523,6 +1548,97 @@ def _enforce_tens_headers(headers: List[int]) -> List[int]:
     return enforced
 
 
+HEADER_VALUES = tuple(range(10, 101, 10))
+
+
+def _count_sequences(length: int, size: int, need_low: bool, need_high: bool) -> int:
+    # sequences of `length` values from `size` candidates that contain the lowest
+    # and/or highest candidate (inclusion-exclusion)
+    total = size**length
+    if need_low:
+        total -= (size - 1) ** length
+    if need_high:
+        total -= (size - 1) ** length
+    if need_low and need_high:
+        total += (size - 2) ** length
+    return total
+
+
+def _extent_weight(count: int, low: int, high: int) -> int:
+    # number of header picks (as pick_values used to draw them) with exactly this min and max index
+    if low == high:
+        return 1 if count == 1 or count > len(HEADER_VALUES) else 0
+    if count <= len(HEADER_VALUES):
+        return math.comb(high - low - 1, count - 2) if count >= 2 else 0
+    return _count_sequences(count, high - low + 1, True, True)
+
+
+@lru_cache(maxsize=None)
+def _feasible_header_extents(
+    operation: str, row_count: int, col_count: int, min_result: int, max_result: int
+) -> Tuple[List[Tuple[int, int, int, int]], List[int]]:
+    # all (row_low, row_high, col_low, col_high) index extents whose header
+    # combinations satisfy every row x column result, with cumulative weights
+    # proportional to the number of header picks sharing that extent
+    if operation == "+":
+        lowest, highest = min_result, min(max_result, 100)
+    else:
+        lowest, highest = max(min_result, 0), max_result
+    size = len(HEADER_VALUES)
+    extents: List[Tuple[int, int, int, int]] = []
+    cumulative: List[int] = []
+    total = 0
+    for row_low in range(size):
+        for row_high in range(row_low, size):
+            row_weight = _extent_weight(row_count, row_low, row_high)
+            if not row_weight:
+                continue
+            for col_low in range(size):
+                for col_high in range(col_low, size):
+                    col_weight = _extent_weight(col_count, col_low, col_high)
+                    if not col_weight:
+                        continue
+                    if operation == "+":
+                        smallest = HEADER_VALUES[row_low] + HEADER_VALUES[col_low]
+                        largest = HEADER_VALUES[row_high] + HEADER_VALUES[col_high]
+                    else:
+                        smallest = HEADER_VALUES[row_low] - HEADER_VALUES[col_high]
+                        largest = HEADER_VALUES[row_high] - HEADER_VALUES[col_low]
+                    if smallest < lowest or largest > highest:
+                        continue
+                    total += row_weight * col_weight
+                    extents.append((row_low, row_high, col_low, col_high))
+                    cumulative.append(total)
+    return extents, cumulative
+
+
+def _sample_headers(count: int, low: int, high: int, rng: random.Random) -> List[int]:
+    if low == high:
+        return [HEADER_VALUES[low]] * count
+    if count <= len(HEADER_VALUES):
+        indices = [low, high] + rng.sample(range(low + 1, high), count - 2)
+        rng.shuffle(indices)
+        return [HEADER_VALUES[i] for i in indices]
+
+    size = high - low + 1
+    need_low = need_high = True
+    indices = []
+    for remaining in range(count - 1, -1, -1):
+        low_weight = _count_sequences(remaining, size, False, need_high)
+        high_weight = _count_sequences(remaining, size, need_low, False)
+        inner_weight = _count_sequences(remaining, size, need_low, need_high)
+        pick = rng.randrange(low_weight + high_weight + inner_weight * (size - 2))
+        if pick < low_weight:
+            indices.append(low)
+            need_low = False
+        elif pick < low_weight + high_weight:
+            indices.append(high)
+            need_high = False
+        else:
+            indices.append(rng.randint(low + 1, high - 1))
+    return [HEADER_VALUES[i] for i in indices]
+
+
 def _generate_random_headers(
     operation: str,
     row_count: int,
@@ -531,42 +1647,91 @@ def _generate_random_headers(
     min_result: int,
     max_result: int,
 ) -> Tuple[List[int], List[int]]:
-    possible_values = list(range(10, 101, 10))
-
-    def pick_values(count: int) -> List[int]:
-        if count <= len(possible_values):
-            return rng.sample(possible_values, count)
-        choices = [rng.choice(possible_values) for _ in range(count)]
-        rng.shuffle(choices)
-        return choices
-
-    for _ in range(1000):
-        rows = pick_values(row_count)
-        cols = pick_values(col_count)
-
-        valid = True
-        for r in rows:
-            for c in cols:
-                result = r + c if operation == "+" else r - c
-                if operation == "+" and result > 100:
-                    valid = False
-                    break
-                if operation == "-" and result < 0:
-                    valid = False
-                    break
-                if result < min_result or result > max_result:
-                    valid = False
-                    break
-            if not valid:
-                break
-
-        if valid:
-            return rows, cols
-
-    raise ValueError("Unable to generate headers that satisfy all constraints")
-
-
-def generate_operation_table(data: Dict, rng: random.Random) -> Dict:
+    if row_count < 1 or col_count < 1:
+        raise ValueError("row_count and col_count must be positive")
+    # only the smallest and largest header of each side decide whether every
+    # result fits, so pick a feasible extent first and fill in the rest
+    extents, cumulative = _feasible_header_extents(
+        "+" if operation == "+" else "-", row_count, col_count, min_result, max_result
+    )
+    if not extents:
+        raise ValueError("Unable to generate headers that satisfy all constraints")
+    row_low, row_high, col_low, col_high = extents[bisect_right(cumulative, rng.randrange(cumulative[-1]))]
+    rows = _sample_headers(row_count, row_low, row_high, rng)
+    cols = _sample_headers(col_count, col_low, col_high, rng)
+    return rows, cols
+
+
+@dataclass(frozen=True, slots=True)
+class OperationTablePlan:
+    operation: str
+    row_count: int
+    col_count: int
+    # fixed (and checked) headers; None when headers are drawn per sheet
+    row_headers: Optional[Tuple[int, ...]]
+    col_headers: Optional[Tuple[int, ...]]
+    # "none", "diagonal", "random" (reveal `random_count` of `cells`) or "explicit"
+    given_cells: str
+    cells: Tuple[Tuple[int, int], ...]
+    random_count: int = 0
+
+
+@dataclass(frozen=True, slots=True)
+class OperationTablesPlan:
+    task_type: ClassVar[str] = "operation_table"
+    title: str
+    min_result: int
+    max_result: int
+    tables: Tuple[OperationTablePlan, ...]
+
+
+def _check_table_results(
+    operation: str, row_headers: Sequence[int], col_headers: Sequence[int], min_result: int, max_result: int
+) -> None:
+    for r in row_headers:
+        for c in col_headers:
+            result = r + c if operation == "+" else r - c
+            if result < min_result or result > max_result:
+                raise ValueError(
+                    f"Result {result} outside allowed range [{min_result}, {max_result}] for {r} {operation} {c}"
+                )
+            if operation == "+" and result > 100:
+                raise ValueError(
+                    f"Result {result} is above the allowed maximum of 100 for {r} {operation} {c}"
+                )
+            if operation == "-" and result < 0:
+                raise ValueError(
+                    f"Result {result} is below the allowed minimum of 0 for {r} {operation} {c}"
+                )
+
+
+def _compile_given_cells(given_cells, row_count: int, col_count: int) -> Tuple[str, Tuple[Tuple[int, int], ...], int]:
+    all_cells = tuple((r_idx, c_idx) for r_idx in range(row_count) for c_idx in range(col_count))
+    if isinstance(given_cells, str):
+        if given_cells == "none":
+            return "none", (), 0
+        if given_cells == "diagonal":
+            return "diagonal", tuple((i, i) for i in range(min(row_count, col_count))), 0
+        if given_cells.startswith("random_"):
+            try:
+                count = int(given_cells.split("_", 1)[1])
+            except ValueError:
+                raise ValueError(f"given_cells must be random_<n> with a number n, got {given_cells!r}") from None
+            if not 0 <= count <= len(all_cells):
+                raise ValueError(
+                    f"given_cells {given_cells!r} must reveal 0 to {len(all_cells)} cells "
+                    f"of the {row_count}x{col_count} table"
+                )
+            return "random", all_cells, count
+        raise ValueError(f"given_cells must be none, diagonal, random_<n> or a list of cells, got {given_cells!r}")
+    cells = tuple((int(cell[0]), int(cell[1])) for cell in given_cells)
+    outside = [cell for cell in cells if cell not in all_cells]
+    if outside:
+        raise ValueError(f"given_cells {outside!r} lie outside the {row_count}x{col_count} table")
+    return "explicit", cells, 0
+
+
+def compile_operation_table(data: Dict) -> OperationTablesPlan:
     result_range = data.get("result_range")
     if not result_range or "min" not in result_range or "max" not in result_range:
         raise ValueError("result_range with min and max is required for operation_table")
@@ -592,9 +1757,11 @@ def generate_operation_table(data: Dict, rng: random.Random) -> Dict:
             },
         ]
 
-    tables_data = []
+    tables: List[OperationTablePlan] = []
     for table in provided_tables:
         operation = table.get("operation", "+")
+        if operation not in ("+", "-"):
+            raise ValueError(f"operation must be '+' or '-', got {operation!r}")
         row_step = int(table.get("row_step", table.get("step", default_step)))
         col_step = int(table.get("col_step", table.get("step", default_step)))
         row_count = int(table.get("row_count", default_row_count))
@@ -603,9 +1770,11 @@ def generate_operation_table(data: Dict, rng: random.Random) -> Dict:
         row_headers_source = table.get("row_headers")
         col_headers_source = table.get("col_headers")
         if row_headers_source is None and col_headers_source is None:
-            row_headers, col_headers = _generate_random_headers(
-                operation, row_count, col_count, rng, min_result, max_result
-            )
+            if row_count < 1 or col_count < 1:
+                raise ValueError("row_count and col_count must be positive")
+            if not _feasible_header_extents(operation, row_count, col_count, min_result, max_result)[0]:
+                raise ValueError("Unable to generate headers that satisfy all constraints")
+            row_headers = col_headers = None
         else:
             if not row_headers_source:
                 row_headers_source = [10, 10 + row_step]
@@ -617,87 +1786,168 @@ def generate_operation_table(data: Dict, rng: random.Random) -> Dict:
             if isinstance(col_headers_source, dict) and "step" not in col_headers_source:
                 col_headers_source = {**col_headers_source, "step": col_step}
 
-            row_headers = _enforce_tens_headers(parse_header_sequence(row_headers_source))
-            col_headers = _enforce_tens_headers(parse_header_sequence(col_headers_source))
+            row_headers = tuple(_enforce_tens_headers(parse_header_sequence(row_headers_source)))
+            col_headers = tuple(_enforce_tens_headers(parse_header_sequence(col_headers_source)))
             if not row_headers or not col_headers:
                 raise ValueError("Row and column headers must contain at least one value")
-        given_cells = table.get("given_cells", "none")
-
-        # validate results
-        results: List[List[int]] = []
-        for r in row_headers:
-            row = []
-            for c in col_headers:
-                result = r + c if operation == "+" else r - c
-                if result < min_result or result > max_result:
-                    raise ValueError(
-                        f"Result {result} outside allowed range [{min_result}, {max_result}] for {r} {operation} {c}"
-                    )
-                if operation == "+" and result > 100:
-                    raise ValueError(
-                        f"Result {result} is above the allowed maximum of 100 for {r} {operation} {c}"
-                    )
-                if operation == "-" and result < 0:
-                    raise ValueError(
-                        f"Result {result} is below the allowed minimum of 0 for {r} {operation} {c}"
-                    )
-                row.append(result)
-            results.append(row)
-
-        revealed: List[Tuple[int, int]] = []
-        if isinstance(given_cells, str):
-            if given_cells == "diagonal":
-                revealed = [(i, i) for i in range(min(len(row_headers), len(col_headers)))]
-            elif given_cells.startswith("random_"):
-                try:
-                    count = int(given_cells.split("_", 1)[1])
-                except ValueError:
-                    count = 0
-                all_cells = [(r_idx, c_idx) for r_idx in range(len(row_headers)) for c_idx in range(len(col_headers))]
-                rng.shuffle(all_cells)
-                revealed = all_cells[:count]
+            row_count, col_count = len(row_headers), len(col_headers)
+            _check_table_results(operation, row_headers, col_headers, min_result, max_result)
+
+        given_cells, cells, random_count = _compile_given_cells(table.get("given_cells", "none"), row_count, col_count)
+        tables.append(
+            OperationTablePlan(
+                operation=operation,
+                row_count=row_count,
+                col_count=col_count,
+                row_headers=row_headers,
+                col_headers=col_headers,
+                given_cells=given_cells,
+                cells=cells,
+                random_count=random_count,
+            )
+        )
+
+    return OperationTablesPlan(
+        title=data.get("title", "Achte auf das Rechenzeichen!"),
+        min_result=min_result,
+        max_result=max_result,
+        tables=tuple(tables),
+    )
+
+
+@dataclass(frozen=True, slots=True)
+class OperationTableData:
+    operation: str
+    row_headers: Tuple[int, ...]
+    col_headers: Tuple[int, ...]
+    # (row, column) of the cells filled in on the worksheet
+    revealed: FrozenSet[Tuple[int, int]]
+
+    def row_results(self, row_header: int) -> List[int]:
+        if self.operation == "+":
+            return [row_header + c for c in self.col_headers]
+        return [row_header - c for c in self.col_headers]
+
+
+@dataclass(frozen=True, slots=True)
+class OperationTablesData:
+    title: str
+    tables: Tuple[OperationTableData, ...]
+
+
+def generate_operation_table(plan: OperationTablesPlan, rng: random.Random) -> OperationTablesData:
+    tables_data = []
+    for table in plan.tables:
+        if table.row_headers is None:
+            # drawn from feasible extents only, so every result is in range
+            row_headers, col_headers = _generate_random_headers(
+                table.operation, table.row_count, table.col_count, rng, plan.min_result, plan.max_result
+            )
+        else:
+            row_headers, col_headers = table.row_headers, table.col_headers
+
+        if table.given_cells == "random":
+            all_cells = list(table.cells)
+            rng.shuffle(all_cells)
+            revealed = all_cells[: table.random_count]
         else:
-            for cell in given_cells:
-                revealed.append((int(cell[0]), int(cell[1])))
+            revealed = table.cells
+
+        tables_data.append(
+            OperationTableData(
+                operation=table.operation,
+                row_headers=tuple(row_headers),
+                col_headers=tuple(col_headers),
+                revealed=frozenset(revealed),
+            )
+        )
+
+    return OperationTablesData(title=plan.title, tables=tuple(tables_data))
 
-        tables_data.append({
-            "operation": operation,
-            "row_headers": row_headers,
-            "col_headers": col_headers,
-            "results": results,
-            "revealed": revealed,
-        })
 
-    return {
-        "title": data.get("title", "Achte auf das Rechenzeichen!"),
-        "tables": tables_data,
-    }
+@dataclass(frozen=True, slots=True)
+class NumberLinePlan:
+    task_type: ClassVar[str] = "number_line"
+    title: str
+    start: int
+    end: int
+    major_tick: int
+    value_count: int
+    # numbers off the major ticks to draw from; None when `values` are fixed
+    possible_numbers: Optional[Tuple[int, ...]]
+    values: Optional[Tuple[int, ...]]
 
 
-def generate_number_line(data: Dict, rng: random.Random) -> Dict:
+def compile_number_line(data: Dict) -> NumberLinePlan:
     start = int(data.get("start", 0))
     end = int(data.get("end", 100))
     major_tick = max(1, int(data.get("major_tick_interval", 10)))
     explicit_values = data.get("values")
-    value_count = int(data.get("value_count", data.get("values_count", 5)))
+    value_count = _compile_count(data, "value_count", data.get("values_count", 5))
+    possible_numbers = values = None
     if explicit_values is None:
-        possible_numbers = [number for number in range(start, end + 1) if number % major_tick != 0]
+        possible_numbers = tuple(number for number in range(start, end + 1) if number % major_tick != 0)
         if value_count > len(possible_numbers):
-            raise ValueError("Not enough non-major numbers available for number line values")
-        values = sorted(rng.sample(possible_numbers, value_count))
+            raise ValueError(f"value_count {value_count}: only {len(possible_numbers)} numbers lie off the major ticks")
     else:
-        values = [int(v) for v in explicit_values]
-    return {
-        "title": data.get(
+        values = tuple(int(v) for v in explicit_values)
+        outside = [value for value in values if not start <= value <= end]
+        if outside:
+            raise ValueError(f"values {outside!r} lie outside the number line from {start} to {end}")
+    return NumberLinePlan(
+        title=data.get(
             "title", "Trage zuerst die Zehnerzahlen an den Zahlenstrahl. Trage dann die Zahlen ein."
         ),
-        "start": start,
-        "end": end,
-        "major_tick": major_tick,
-        "values": values,
-    }
+        start=start,
+        end=end,
+        major_tick=major_tick,
+        value_count=value_count,
+        possible_numbers=possible_numbers,
+        values=values,
+    )
+
+
+@dataclass(frozen=True, slots=True)
+class NumberLineData:
+    title: str
+    start: int
+    end: int
+    major_tick: int
+    values: Tuple[int, ...]
 
 
+def generate_number_line(plan: NumberLinePlan, rng: random.Random) -> NumberLineData:
+    if plan.values is None:
+        values = tuple(sorted(rng.sample(plan.possible_numbers, plan.value_count)))
+    else:
+        values = plan.values
+    return NumberLineData(
+        title=plan.title, start=plan.start, end=plan.end, major_tick=plan.major_tick, values=values
+    )
+
+
+TaskPlan = Union[
+    NumberDictationPlan,
+    CompareNumbersPlan,
+    PreSuccTablePlan,
+    ArithmeticListPlan,
+    NumberWordTablePlan,
+    OrderingPlan,
+    OperationTablesPlan,
+    NumberLinePlan,
+]
+
+TaskData = Union[
+    NumberDictationData,
+    CompareNumbersData,
+    PreSuccTableData,
+    ArithmeticListData,
+    NumberWordTableData,
+    OrderingData,
+    OperationTablesData,
+    NumberLineData,
+]
+
 TASK_GENERATORS = {
     "number_dictation": generate_number_dictation,
     "compare_numbers": generate_compare_numbers,
@@ -709,197 +1959,466 @@ TASK_GENERATORS = {
     "number_line": generate_number_line,
 }
 
+TASK_COMPILERS: Dict[str, Callable[[Dict], TaskPlan]] = {
+    "number_dictation": compile_number_dictation,
+    "compare_numbers": compile_compare_numbers,
+    "pre_succ_table": compile_pre_succ_table,
+    "arithmetic_list": compile_arithmetic_list,
+    "number_word_table": compile_number_word_table,
+    "ordering": compile_ordering,
+    "operation_table": compile_operation_table,
+    "number_line": compile_number_line,
+}
 
-# ---------- Rendering helpers ----------
 
-def render_number_boxes(count: int, content: Optional[List[str]] = None) -> str:
-    boxes = []
-    for i in range(count):
-        text = content[i] if content and i < len(content) else ""
-        boxes.append(f"<span class='number-box'>{text}</span>")
-    return "".join(boxes)
-
-
-def render_number_dictation(data: Dict, solution: bool) -> str:
-    helper_content = None
-    if solution and data.get("show_helper_numbers"):
-        helper_content = [str(i + 1) for i in range(data["box_count"])]
-    boxes = render_number_boxes(data["box_count"], helper_content)
-    return f"""<div class='task'>
-  <div class='task-title'>{data['title']}</div>
-  <div class='number-dictation'>{boxes}</div>
-</div>"""
-
-
-def render_compare_numbers(data: Dict, solution: bool) -> str:
-    items_html = []
-    for a, b, symbol in data["items"]:
-        sign = symbol if solution else ""
-        items_html.append(
-            f"<div class='compare-item'><span class='compare-number'>{a}</span>"
-            f"<span class='compare-circle'>{sign}</span><span class='compare-number'>{b}</span></div>"
-        )
-    column_class = f"cols-{data['columns']}"
-    return f"""<div class='task'>
-  <div class='task-title'>{data['title']}</div>
-  <div class='compare-grid {column_class}'>
-    {''.join(items_html)}
-  </div>
-</div>"""
-
-
-def render_pre_succ_table(data: Dict, solution: bool) -> str:
-    rows_html = []
-    for row in data["rows"]:
-        values = row["values"]
-        given = row["given_field"]
-        def cell_content(key: str) -> str:
-            if solution or given == key:
-                return str(values[key])
-            return ""
-        rows_html.append(
-            "<tr>" + "".join(f"<td>{cell_content(key)}</td>" for key in ["left", "middle", "right"]) + "</tr>"
-        )
-    return f"""<div class='task'>
-  <div class='task-title'>{data['title']}</div>
-  <table class='simple-table'>
-    <thead><tr><th>Vorgänger</th><th>Zahl</th><th>Nachfolger</th></tr></thead>
-    <tbody>{''.join(rows_html)}</tbody>
-  </table>
-</div>"""
-
-
-def render_arithmetic_list(data: Dict, solution: bool) -> str:
-    items_html = []
-    for a, op, b, result in data["items"]:
-        result_html = str(result) if solution else ""
-        items_html.append(f"<div class='arithmetic-item'>{a} {op} {b} = <span class='number-box'>{result_html}</span></div>")
-    column_class = f"cols-{data['columns']}"
-    return f"""<div class='task'>
-  <div class='task-title'>{data['title']}</div>
-  <div class='arithmetic-grid {column_class}'>
-    {''.join(items_html)}
-  </div>
-</div>"""
-
-
-def render_number_word_table(data: Dict, solution: bool) -> str:
-    rows_html = []
-    for row in data["rows"]:
-        given_cols = set(row["given"] if not solution else ["word", "dice", "number"])
-        word_cell = row["word"] if "word" in given_cols else ""
-        dice_cell = row["dice"] if "dice" in given_cols else ""
-        number_cell = str(row["number"]) if "number" in given_cols else ""
-        rows_html.append(
-            f"<tr><td>{word_cell}</td><td class='dice-cell'>{dice_cell}</td><td>{number_cell}</td></tr>"
+def compile_task(data: Dict) -> TaskPlan:
+    task_type = data.get("type")
+    if task_type not in TASK_COMPILERS:
+        raise ValueError(f"Unsupported task type: {task_type}")
+    if data.get("unique") and task_type not in UNIQUE_TASK_TYPES:
+        raise ValueError(f"unique is not supported for task type {task_type}")
+    return TASK_COMPILERS[task_type](data)
+
+
+@lru_cache(maxsize=None)
+def _compile_task_json(settings: str) -> TaskPlan:
+    # configs of a multi-config run with identical task settings share one plan
+    return compile_task(json.loads(settings))
+
+
+def compile_tasks(task_configs: List[Dict]) -> Tuple[TaskPlan, ...]:
+    # every task is validated once here, so a bad setting fails before any sheet is written
+    plans = []
+    for position, data in enumerate(task_configs, start=1):
+        try:
+            settings: Optional[str] = json.dumps(data, sort_keys=True)
+        except TypeError:
+            # values JSON cannot encode (e.g. YAML dates) skip the shared cache
+            settings = None
+        try:
+            plans.append(compile_task(data) if settings is None else _compile_task_json(settings))
+        except (TypeError, ValueError) as exc:
+            raise ValueError(f"Task {position} ({data.get('type')}): {exc}") from None
+    return tuple(plans)
+
+
+# ---------- Vectorized generators (NumPy) ----------
+
+# Block versions of the numeric generators: one call draws a task for `sheets` sheets
+# in a few array operations from a numpy.random.Generator and returns the task data
+# per sheet; same plans, same task data.
+VECTOR_BLOCK_SHEETS = 64
+
+
+def _int_array(values: "np.ndarray") -> array:
+    return array("q", values.astype(np.int64).tobytes())
+
+
+def _sheet_slices(count: int, sheets: int) -> List[slice]:
+    # the items of each sheet in a block-wide draw of count * sheets items
+    return [slice(sheet * count, (sheet + 1) * count) for sheet in range(sheets)]
+
+
+def vector_compare_numbers(
+    plan: CompareNumbersPlan, rng: "np.random.Generator", sheets: int
+) -> List[CompareNumbersData]:
+    total = plan.item_count * sheets
+    min_value, max_value = plan.min_value, plan.max_value
+    equal = rng.random(total) < plan.equal_probability
+    a = rng.integers(min_value, max_value, size=total, endpoint=True)
+    if max_value > min_value:
+        # a distinct b in one draw: pick from the range without one value and skip over a
+        b = rng.integers(min_value, max_value - 1, size=total, endpoint=True)
+        b += b >= a
+        if plan.close_numbers:
+            # the partner lists are short; picking from them stays a per-item step
+            close_fallbacks = 0
+            for i in np.flatnonzero(~equal).tolist():
+                partners = close_partners(int(a[i]), min_value, max_value)
+                if partners:
+                    b[i] = partners[int(rng.integers(len(partners)))]
+                else:
+                    close_fallbacks += 1
+            if PROFILE is not None:
+                PROFILE.count("compare_numbers.close_fallbacks", close_fallbacks)
+        b = np.where(equal, a, b)
+    else:
+        b = a
+    left, right = _int_array(a), _int_array(b)
+    relations = "".join(np.where(a == b, "=", np.where(a < b, "<", ">")).tolist())
+    return [
+        CompareNumbersData(
+            title=plan.title, columns=plan.columns, left=left[items], right=right[items], relations=relations[items]
         )
-    return f"""<div class='task'>
-  <div class='task-title'>{data['title']}</div>
-  <table class='simple-table'>
-    <thead><tr><th>Zahlwort</th><th>Würfelbild</th><th>Zahl</th></tr></thead>
-    <tbody>{''.join(rows_html)}</tbody>
-  </table>
-</div>"""
-
-
-def render_ordering(data: Dict, solution: bool) -> str:
-    numbers_str = ", ".join(str(n) for n in data["numbers"])
-    comparison_symbol = "<" if data["order"] == "increasing" else ">"
-
-    def cells_for_number(chars: List[str]) -> List[str]:
-        return [f"<td class='ordering-cell'>{digit}</td>" for digit in chars]
-
-    def cells_for_comparator() -> str:
-        symbol = comparison_symbol if data["show_symbols"] else ""
-        return f"<td class='ordering-cell comparator'>{symbol}</td>"
-
-    row_cells: List[str] = []
-    for idx, value in enumerate(data["sorted_numbers"]):
-        digits = list(str(value)) if solution else ["" for _ in str(value)]
-        row_cells.extend(cells_for_number(digits))
-        if idx < len(data["sorted_numbers"]) - 1:
-            row_cells.append(cells_for_comparator())
-
-    table_html = f"<table class='ordering-table'><tr>{''.join(row_cells)}</tr></table>"
-    return f"""<div class='task'>
-  <div class='task-title'>{data['title']}</div>
-  <div class='ordering-numbers'>{numbers_str}</div>
-  {table_html}
-</div>"""
-
-
-def render_operation_table(data: Dict, solution: bool) -> str:
-    tables_html = []
-    for table in data["tables"]:
-        header_cells = f"<th class='operation-symbol'>{table['operation']}</th>" + "".join(
-            f"<th>{c}</th>" for c in table["col_headers"]
+        for items in _sheet_slices(plan.item_count, sheets)
+    ]
+
+
+def vector_pre_succ_table(plan: PreSuccTablePlan, rng: "np.random.Generator", sheets: int) -> List[PreSuccTableData]:
+    total = plan.row_count * sheets
+    middles = _int_array(rng.integers(plan.min_value + 1, plan.max_value - 1, size=total, endpoint=True))
+    if plan.given_field == "mixed":
+        given = rng.integers(0, len(PRE_SUCC_COLUMNS), size=total).astype(np.uint8).tobytes()
+    else:
+        given = bytes([PRE_SUCC_COLUMNS.index(plan.given_field)]) * total
+    return [
+        PreSuccTableData(title=plan.title, middles=middles[rows], given=given[rows])
+        for rows in _sheet_slices(plan.row_count, sheets)
+    ]
+
+
+def vector_arithmetic_list(
+    plan: ArithmeticListPlan, rng: "np.random.Generator", sheets: int
+) -> List[ArithmeticListData]:
+    total = plan.item_count * sheets
+    candidates = plan.candidates()
+    is_add = np.array([op == "+" for op in plan.operations])[rng.integers(0, len(plan.operations), size=total)]
+    wants_cross = rng.random(total) < plan.cross_ten_probability
+    first = np.empty(total, dtype=np.int64)
+    second = np.empty(total, dtype=np.int64)
+    fallbacks = 0
+    for op in ("+", "-"):
+        for crossing in (False, True):
+            mask = (is_add == (op == "+")) & (wants_cross == crossing)
+            selected = int(mask.sum())
+            if not selected:
+                continue
+            bucket = crossing
+            if not candidates.count(op, bucket):
+                # fall back to the opposite crossing requirement
+                bucket = not crossing
+                fallbacks += selected
+            if candidates.prefix is not None:
+                indices = rng.integers(0, candidates.count(op, bucket), size=selected).tolist()
+                pairs = [candidates.nth(op, bucket, n) for n in indices]
+            else:
+                pairs = [candidates.pick(op, bucket, lambda n: int(rng.integers(n))) for _ in range(selected)]
+            first[mask], second[mask] = zip(*pairs)
+    first_values, second_values = _int_array(first), _int_array(second)
+    operations = "".join(np.where(is_add, "+", "-").tolist())
+
+    if PROFILE is not None:
+        PROFILE.count("arithmetic_list.crossing_fallbacks", fallbacks)
+    return [
+        ArithmeticListData(
+            title=plan.title,
+            columns=plan.columns,
+            first=first_values[items],
+            second=second_values[items],
+            operations=operations[items],
         )
-        body_rows = []
-        for r_idx, row_header in enumerate(table["row_headers"]):
-            cells = [f"<th>{row_header}</th>"]
-            for c_idx, result in enumerate(table["results"][r_idx]):
-                reveal = solution or (r_idx, c_idx) in table["revealed"]
-                cells.append(f"<td>{result if reveal else ''}</td>")
-            body_rows.append("<tr>" + "".join(cells) + "</tr>")
-        tables_html.append(
-            f"""
-<div class='operation-table'>
-  <table class='simple-table'>
-    <thead><tr>{header_cells}</tr></thead>
-    <tbody>{''.join(body_rows)}</tbody>
-  </table>
-</div>"""
+        for items in _sheet_slices(plan.item_count, sheets)
+    ]
+
+
+def vector_number_line(plan: NumberLinePlan, rng: "np.random.Generator", sheets: int) -> List[NumberLineData]:
+    if plan.values is None:
+        # sampling without replacement has no block form; one call per sheet
+        picks = [rng.choice(len(plan.possible_numbers), size=plan.value_count, replace=False) for _ in range(sheets)]
+        values = [tuple(sorted(plan.possible_numbers[i] for i in picked.tolist())) for picked in picks]
+    else:
+        values = [plan.values] * sheets
+    return [
+        NumberLineData(title=plan.title, start=plan.start, end=plan.end, major_tick=plan.major_tick, values=line_values)
+        for line_values in values
+    ]
+
+
+VECTOR_GENERATORS = {
+    "compare_numbers": vector_compare_numbers,
+    "pre_succ_table": vector_pre_succ_table,
+    "arithmetic_list": vector_arithmetic_list,
+    "number_line": vector_number_line,
+}
+
+
+# ---------- Rendering helpers ----------
+
+class VariantWriter:
+    # writes the worksheet and the solution variant of the same markup in one
+    # pass into two text sinks (open files, io.StringIO, ...): shared structure
+    # goes to both, answer slots differ per variant. Renderers hand over a whole
+    # task per call, so the sinks see a few large writes
+    def __init__(self, worksheet: Optional[TextIO] = None, solution: Optional[TextIO] = None) -> None:
+        self.worksheet = worksheet if worksheet is not None else io.StringIO()
+        self.solution = solution if solution is not None else io.StringIO()
+        self._write_worksheet = self.worksheet.write
+        self._write_solution = self.solution.write
+
+    def write(self, text: str) -> None:
+        self._write_worksheet(text)
+        self._write_solution(text)
+
+    def answer(self, worksheet_text: str, solution_text: str) -> None:
+        self._write_worksheet(worksheet_text)
+        self._write_solution(solution_text)
+
+    def getvalues(self) -> Tuple[str, str]:
+        return self.worksheet.getvalue(), self.solution.getvalue()
+
+
+def _task_start(title: str) -> str:
+    return f"<div class='task'>\n  <div class='task-title'>{title}</div>\n  "
+
+
+# Every renderer builds the markup of its task as two lists, worksheet and solution:
+# shared fragments are formatted once and appended to both, answers only to the
+# solution; each list is joined once and handed to the writer in a single call.
+
+
+def render_number_dictation(data: NumberDictationData, out: VariantWriter) -> None:
+    head = _task_start(data.title) + "<div class='number-dictation'>"
+    tail = "</div>\n</div>"
+    worksheet = head + "<span class='number-box'></span>" * data.box_count + tail
+    if not data.show_helper_numbers:
+        out.write(worksheet)
+        return
+    boxes = "".join([f"<span class='number-box'>{i}</span>" for i in range(1, data.box_count + 1)])
+    out.answer(worksheet, head + boxes + tail)
+
+
+def render_compare_numbers(data: CompareNumbersData, out: VariantWriter) -> None:
+    head = _task_start(data.title) + f"<div class='compare-grid cols-{data.columns}'>\n    "
+    tail = "\n  </div>\n</div>"
+    starts = [
+        f"<div class='compare-item'><span class='compare-number'>{a}</span><span class='compare-circle'>"
+        for a in data.left
+    ]
+    ends = [f"</span><span class='compare-number'>{b}</span></div>" for b in data.right]
+    worksheet = "".join([start + end for start, end in zip(starts, ends)])
+    solution = "".join([start + symbol + end for start, symbol, end in zip(starts, data.relations, ends)])
+    out.answer(head + worksheet + tail, head + solution + tail)
+
+
+# worksheet cells before and after the given one, per given column
+PRE_SUCC_BLANKS = tuple(("<td></td>" * column, "<td></td>" * (2 - column)) for column in range(3))
+
+
+def render_pre_succ_table(data: PreSuccTableData, out: VariantWriter) -> None:
+    head = _task_start(data.title) + (
+        "<table class='simple-table'>\n"
+        "    <thead><tr><th>Vorgänger</th><th>Zahl</th><th>Nachfolger</th></tr></thead>\n"
+        "    <tbody>"
+    )
+    worksheet = [head]
+    solution = [head]
+    add_worksheet, add_solution = worksheet.append, solution.append
+    for given, values in data.rows():
+        before, after = PRE_SUCC_BLANKS[given]
+        add_worksheet(f"<tr>{before}<td>{values[given]}</td>{after}</tr>")
+        add_solution(f"<tr><td>{values[0]}</td><td>{values[1]}</td><td>{values[2]}</td></tr>")
+    tail = "</tbody>\n  </table>\n</div>"
+    add_worksheet(tail)
+    add_solution(tail)
+    out.answer("".join(worksheet), "".join(solution))
+
+
+def render_arithmetic_list(data: ArithmeticListData, out: VariantWriter) -> None:
+    head = _task_start(data.title) + f"<div class='arithmetic-grid cols-{data.columns}'>\n    "
+    tail = "\n  </div>\n</div>"
+    starts = []
+    solution = [head]
+    add_start, add_solution = starts.append, solution.append
+    for a, op, b in zip(data.first, data.operations, data.second):
+        start = f"<div class='arithmetic-item'>{a} {op} {b} = <span class='number-box'>"
+        add_start(start)
+        add_solution(f"{start}{a + b if op == '+' else a - b}</span></div>")
+    solution.append(tail)
+    worksheet = head + "</span></div>".join(starts) + ("</span></div>" if starts else "") + tail
+    out.answer(worksheet, "".join(solution))
+
+
+def render_number_word_table(data: NumberWordTableData, out: VariantWriter) -> None:
+    head = _task_start(data.title) + (
+        "<table class='simple-table'>\n"
+        "    <thead><tr><th>Zahlwort</th><th>Würfelbild</th><th>Zahl</th></tr></thead>\n"
+        "    <tbody>"
+    )
+    worksheet = [head]
+    solution = [head]
+    add_worksheet, add_solution = worksheet.append, solution.append
+    for number, given_columns in data.rows():
+        word = number_entry(number).markup
+        dice = dice_markup(number, data.svg_sprites)
+        add_solution(f"<tr><td>{word}</td><td class='dice-cell'>{dice}</td><td>{number}</td></tr>")
+        if "word" not in given_columns:
+            word = ""
+        if "dice" not in given_columns:
+            dice = ""
+        shown_number = number if "number" in given_columns else ""
+        add_worksheet(f"<tr><td>{word}</td><td class='dice-cell'>{dice}</td><td>{shown_number}</td></tr>")
+    tail = "</tbody>\n  </table>\n</div>"
+    add_worksheet(tail)
+    add_solution(tail)
+    out.answer("".join(worksheet), "".join(solution))
+
+
+# cell widths of .ordering-cell and the room for one row of boxes on the page
+ORDERING_CELL_CM = 0.8
+ORDERING_COMPARATOR_CM = 0.6
+ORDERING_ROW_WIDTH_CM = 17.0
+
+
+# str.translate table turning every digit into its solution cell
+ORDERING_DIGIT_CELLS = str.maketrans({digit: f"<td class='ordering-cell'>{digit}</td>" for digit in "0123456789-"})
+
+
+def render_ordering(data: OrderingData, out: VariantWriter) -> None:
+    numbers_str = ", ".join(str(n) for n in data.numbers)
+    comparison_symbol = "<" if data.order == "increasing" else ">"
+    comparator_cell = f"<td class='ordering-cell comparator'>{comparison_symbol if data.show_symbols else ''}</td>"
+
+    head = _task_start(data.title) + f"<div class='ordering-numbers'>{numbers_str}</div>\n  "
+    worksheet = [head]
+    solution = [head]
+    sorted_numbers = data.sorted_numbers()
+    rows = ordering_rows(sorted_numbers, ORDERING_CELL_CM, ORDERING_COMPARATOR_CM, ORDERING_ROW_WIDTH_CM)
+    table = "<table class='ordering-table'><tr>"
+    if len(rows) > 1:
+        # wrapped rows keep their natural width so the boxes line up from row to row
+        table = "<table class='ordering-table' style='width: auto'><tr>"
+    remaining = len(sorted_numbers)
+    for row_idx, row in enumerate(rows):
+        start = "\n  " + table if row_idx else table
+        worksheet.append(start)
+        solution.append(start)
+        for value in row:
+            digits = str(value)
+            remaining -= 1
+            end = comparator_cell if remaining else ""
+            worksheet.append("<td class='ordering-cell'></td>" * len(digits) + end)
+            solution.append(digits.translate(ORDERING_DIGIT_CELLS) + end)
+        worksheet.append("</tr></table>")
+        solution.append("</tr></table>")
+    worksheet.append("\n</div>")
+    solution.append("\n</div>")
+    out.answer("".join(worksheet), "".join(solution))
+
+
+def render_operation_table(data: OperationTablesData, out: VariantWriter) -> None:
+    head = _task_start(data.title) + "<div class='operation-table-grid'>\n    "
+    worksheet = [head]
+    solution = [head]
+    add_worksheet, add_solution = worksheet.append, solution.append
+    for table in data.tables:
+        header_cells = "".join(f"<th>{c}</th>" for c in table.col_headers)
+        start = (
+            "\n<div class='operation-table'>\n"
+            "  <table class='simple-table'>\n"
+            f"    <thead><tr><th class='operation-symbol'>{table.operation}</th>{header_cells}</tr></thead>\n"
+            "    <tbody>"
         )
-    return f"""<div class='task'>
-  <div class='task-title'>{data['title']}</div>
-  <div class='operation-table-grid'>
-    {''.join(tables_html)}
-  </div>
-</div>"""
-
-
-def render_number_line(data: Dict, solution: bool) -> str:
-    start = data["start"]
-    end = data["end"]
-    major = data["major_tick"]
+        add_worksheet(start)
+        add_solution(start)
+        revealed = table.revealed
+        for r_idx, row_header in enumerate(table.row_headers):
+            row_start = f"<tr><th>{row_header}</th>"
+            cells = [f"<td>{result}</td>" for result in table.row_results(row_header)]
+            add_worksheet(
+                row_start
+                + "".join([cell if (r_idx, c_idx) in revealed else "<td></td>" for c_idx, cell in enumerate(cells)])
+                + "</tr>"
+            )
+            add_solution(row_start + "".join(cells) + "</tr>")
+        end = "</tbody>\n  </table>\n</div>"
+        add_worksheet(end)
+        add_solution(end)
+    tail = "\n  </div>\n</div>"
+    add_worksheet(tail)
+    add_solution(tail)
+    out.answer("".join(worksheet), "".join(solution))
+
+
+# geometry of the number line SVG (viewBox 0 0 1000 220), shared with the PDF backend
+NUMBER_LINE_WIDTH = 1000
+NUMBER_LINE_HEIGHT = 220
+NUMBER_LINE_MARGIN = 50
+NUMBER_LINE_AXIS_Y = 150
+NUMBER_LINE_TICK_HEIGHTS = {"major": 48, "mid": 32, "minor": 18}
+# wider ranges only keep every n-th minor tick, n being the smallest divisor of the
+# major interval that brings them under this limit
+NUMBER_LINE_MAX_MINOR_TICKS = 200
+
+
+def _minor_tick_step(start: int, end: int, major: int) -> int:
+    for step in range(1, major + 1):
+        if major % step == 0 and (end - start) // step <= NUMBER_LINE_MAX_MINOR_TICKS:
+            return step
+    return major
+
+
+@lru_cache(maxsize=256)
+def _number_line_ticks(start: int, end: int, major: int) -> Tuple[Tuple[int, float, float, float, str], ...]:
+    # (value, x, top, bottom, kind) per tick, kind being "major", "mid" or "minor"
     total_range = max(1, end - start)
-
-    width = 1000
-    height = 220
-    left_margin = 50
-    right_margin = 50
-    usable_width = width - left_margin - right_margin
-    axis_y = 150
-    tick_height_major = 48
-    tick_height_mid = 32
-    tick_height_minor = 18
-    label_offset = 18
-
-    tick_elements = []
-    tick_tops: Dict[int, float] = {}
+    usable_width = NUMBER_LINE_WIDTH - 2 * NUMBER_LINE_MARGIN
+    minor_step = _minor_tick_step(start, end, major)
+    ticks = []
     for value in range(start, end + 1):
-        x = left_margin + ((value - start) / total_range) * usable_width
-        is_major = (value - start) % major == 0
-        is_mid_major = major % 2 == 0 and not is_major and (value - start) % major == major // 2
-        if is_major:
-            tick_height = tick_height_major
-        elif is_mid_major:
-            tick_height = tick_height_mid
+        offset = value - start
+        if offset % major == 0:
+            kind = "major"
+        elif major % 2 == 0 and offset % major == major // 2:
+            kind = "mid"
+        elif offset % minor_step == 0:
+            kind = "minor"
         else:
-            tick_height = tick_height_minor
-        y_top = axis_y - tick_height / 2
-        y_bottom = axis_y + tick_height / 2
-        tick_tops[value] = y_top
-        tick_elements.append(
-            f"<line x1='{x:.2f}' y1='{y_top:.2f}' x2='{x:.2f}' y2='{y_bottom:.2f}' class='tick-line{' major' if is_major else ' mid' if is_mid_major else ''}' />"
-        )
-        if is_major and solution:
-            tick_elements.append(
-                f"<text x='{x:.2f}' y='{y_top - label_offset:.2f}' class='tick-label'>{value}</text>"
-            )
+            continue
+        x = NUMBER_LINE_MARGIN + (offset / total_range) * usable_width
+        tick_height = NUMBER_LINE_TICK_HEIGHTS[kind]
+        ticks.append((value, x, NUMBER_LINE_AXIS_Y - tick_height / 2, NUMBER_LINE_AXIS_Y + tick_height / 2, kind))
+    return tuple(ticks)
+
+
+@dataclass(frozen=True)
+class NumberLineSkeleton:
+    # markup shared by every sheet with the same (start, end, major_tick)
+    ticks: str
+    labels: str
+    tick_tops: Dict[int, float]
+
+
+@lru_cache(maxsize=256)
+def number_line_skeleton(start: int, end: int, major: int) -> NumberLineSkeleton:
+    ticks = _number_line_ticks(start, end, major)
+    paths = []
+    for kind, css_class in (("minor", "tick-line"), ("mid", "tick-line mid"), ("major", "tick-line major")):
+        d = "".join(f"M{x:.2f} {top:g}V{bottom:g}" for _, x, top, bottom, k in ticks if k == kind)
+        if d:
+            paths.append(f"<path d='{d}' class='{css_class}' />")
+    labels = "".join(
+        f"<text x='{x:.2f}' y='{top - 18:.2f}' class='tick-label'>{value}</text>"
+        for value, x, top, _, kind in ticks
+        if kind == "major"
+    )
+    return NumberLineSkeleton(
+        ticks="".join(paths), labels=labels, tick_tops={value: top for value, _, top, _, _ in ticks}
+    )
 
-    value_elements = []
-    if data["values"]:
+
+def render_number_line(data: NumberLineData, out: VariantWriter) -> None:
+    start = data.start
+    end = data.end
+    total_range = max(1, end - start)
+
+    width = NUMBER_LINE_WIDTH
+    height = NUMBER_LINE_HEIGHT
+    left_margin = NUMBER_LINE_MARGIN
+    right_margin = NUMBER_LINE_MARGIN
+    usable_width = width - left_margin - right_margin
+    axis_y = NUMBER_LINE_AXIS_Y
+    skeleton = number_line_skeleton(start, end, data.major_tick)
+
+    head = _task_start(data.title) + (
+        "<div class='number-line-container'>\n"
+        f"    <svg class='number-line-svg' viewBox='0 0 {width} {height}' preserveAspectRatio='none'>\n"
+        f"      <line x1='{left_margin}' y1='{axis_y}' x2='{width - right_margin}' y2='{axis_y}' class='axis-line' />\n"
+        "      "
+    )
+    worksheet = [head, skeleton.ticks]
+    solution = [head, skeleton.ticks, skeleton.labels]
+
+    if data.values:
         box_width = 70
         box_height = 36
         box_y = 24
@@ -909,7 +2428,7 @@ def render_number_line(data: Dict, solution: bool) -> str:
         placements: List[Tuple[int, float, float]] = []
         previous_right = left_margin - min_gap
 
-        for value in sorted(data["values"]):
+        for value in sorted(data.values):
             tick_x = left_margin + ((value - start) / total_range) * usable_width
             desired_center = tick_x
             min_center = previous_right + box_width / 2 + min_gap
@@ -928,29 +2447,27 @@ def render_number_line(data: Dict, solution: bool) -> str:
             placements.append((value, box_center_x, tick_x))
             previous_right = box_center_x + box_width / 2
 
+        minor_half = NUMBER_LINE_TICK_HEIGHTS["minor"] / 2
         for value, box_center_x, tick_x in placements:
-            tick_target_y = tick_tops.get(value, axis_y - tick_height_minor / 2)
-            value_elements.append(
+            tick_target_y = skeleton.tick_tops.get(value)
+            if tick_target_y is None:
+                # a thinned-out minor tick is drawn for the values that are asked for
+                tick_target_y = axis_y - minor_half
+                tick = f"<path d='M{tick_x:.2f} {tick_target_y:g}V{axis_y + minor_half:g}' class='tick-line' />"
+                worksheet.append(tick)
+                solution.append(tick)
+            box = (
                 f"<line x1='{box_center_x:.2f}' y1='{box_y + box_height}' x2='{tick_x:.2f}' y2='{tick_target_y:.2f}' class='connector-line' />"
-            )
-            box_value = str(value) if solution else ""
-            value_elements.append(
                 f"<rect x='{box_center_x - box_width / 2:.2f}' y='{box_y}' width='{box_width}' height='{box_height}' rx='4' class='number-line-rect' />"
-                f"<text x='{box_center_x:.2f}' y='{box_y + box_height / 2 + 5:.2f}' class='number-line-text'>{box_value}</text>"
+                f"<text x='{box_center_x:.2f}' y='{box_y + box_height / 2 + 5:.2f}' class='number-line-text'>"
             )
+            worksheet.append(box + "</text>")
+            solution.append(f"{box}{value}</text>")
 
-    svg_content = "".join(tick_elements + value_elements)
-    axis_line = f"<line x1='{left_margin}' y1='{axis_y}' x2='{width - right_margin}' y2='{axis_y}' class='axis-line' />"
-
-    return f"""<div class='task'>
-  <div class='task-title'>{data['title']}</div>
-  <div class='number-line-container'>
-    <svg class='number-line-svg' viewBox='0 0 {width} {height}' preserveAspectRatio='none'>
-      {axis_line}
-      {svg_content}
-    </svg>
-  </div>
-</div>"""
+    tail = "\n    </svg>\n  </div>\n</div>"
+    worksheet.append(tail)
+    solution.append(tail)
+    out.answer("".join(worksheet), "".join(solution))
 
 
 TASK_RENDERERS = {
@@ -1106,9 +2623,6 @@ STYLE_BLOCK = """
   .dice-svg.dice-placeholder {
     visibility: hidden;
   }
-  .dice-svg circle {
-    fill: #000;
-  }
 
   .number-word-and {
     text-decoration: underline;
@@ -1159,6 +2673,7 @@ STYLE_BLOCK = """
   .axis-line, .tick-line, .connector-line {
     stroke: #000;
     stroke-width: 2;
+    fill: none;
   }
   .tick-line.major {
     stroke-width: 3;
@@ -1202,6 +2717,22 @@ STYLE_BLOCK = """
 </style>
 """
 
+STYLESHEET_CSS = STYLE_BLOCK.strip()[len("<style>") : -len("</style>")].strip("\n") + "\n"
+STYLESHEET_NAME = f"styles_{hashlib.sha256(STYLESHEET_CSS.encode('utf-8')).hexdigest()[:12]}.css"
+
+
+def document_styles(output: OutputConfig) -> str:
+    if output.stylesheet == "external":
+        return f"<link rel='stylesheet' href='{STYLESHEET_NAME}'>"
+    return STYLE_BLOCK
+
+
+def write_stylesheet(output: OutputConfig) -> None:
+    # the file name carries the content hash, so an existing file is already up to date
+    path = output.out_dir / STYLESHEET_NAME
+    if not path.exists():
+        path.write_text(STYLESHEET_CSS, encoding="utf-8")
+
 
 HTML_TEMPLATE = """<!DOCTYPE html>
 <html lang='de'>
@@ -1214,7 +2745,7 @@ HTML_TEMPLATE = """<!DOCTYPE html>
   {styles}
 </head>
 <body>
-  {worksheet_body}
+  {svg_sprites}{worksheet_body}
 </body>
 </html>
 """
@@ -1231,122 +2762,1781 @@ COMBINED_TEMPLATE = """<!DOCTYPE html>
   {styles}
 </head>
 <body>
-  {pages}
+  {svg_sprites}{pages}
 </body>
 </html>
 """
 
 
-def generate_tasks(task_configs: List[Dict], rng: random.Random) -> List[Tuple[str, Dict]]:
+def _generate_unique(generator: Callable, task_type: str, issued: set, plan: TaskPlan, rng: random.Random) -> TaskData:
+    try:
+        return generator(plan, rng, issued)
+    except UniqueItemsExhausted as exc:
+        hint = "widen the value range or use unique: sheet" if plan.unique == "batch" else "widen the value range"
+        raise ValueError(f"{task_type}: {exc}; {hint}") from None
+
+
+def task_stream_keys(task_configs: List[Dict]) -> Tuple[str, ...]:
+    keys = []
+    for position, data in enumerate(task_configs, start=1):
+        key = str(data["id"]) if data.get("id") is not None else str(position)
+        if key in keys:
+            raise ValueError(f"Task {position} ({data.get('type')}): id {key!r} is used by another task")
+        keys.append(key)
+    return tuple(keys)
+
+
+# the random.Random of a task and, with the numpy backend, the generator handing out
+# its vectorized task data
+TaskRngs = Tuple[random.Random, Optional[Callable[[TaskPlan, random.Random], TaskData]]]
+
+# per process, the last block of vectorized task data of each task stream
+_vector_blocks: Dict[Tuple[int, int, str], Tuple[TaskPlan, int, List[TaskData]]] = {}
+
+
+def _vector_block_data(cfg: Config, key: str, index: int, plan: TaskPlan, rng: random.Random) -> TaskData:
+    # called like a task generator; sheet `index` gets its row of the block of
+    # VECTOR_BLOCK_SHEETS sheets it belongs to. The block is drawn from a child of
+    # SeedSequence(base_seed) keyed by block and task, so every sheet can be reproduced
+    # on its own by drawing its block again
+    block, row = divmod(index, VECTOR_BLOCK_SHEETS)
+    cache_key = (id(plan), cfg.base_seed, key)
+    cached = _vector_blocks.get(cache_key)
+    if cached is None or cached[0] is not plan or cached[1] != block:
+        stream = int.from_bytes(hashlib.sha256(key.encode("utf-8")).digest()[:8], "big")
+        vector_rng = np.random.default_rng(np.random.SeedSequence(cfg.base_seed % 2**64, spawn_key=(block, stream)))
+        data = VECTOR_GENERATORS[plan.task_type](plan, vector_rng, VECTOR_BLOCK_SHEETS)
+        cached = _vector_blocks[cache_key] = (plan, block, data)
+    return cached[2][row]
+
+
+def sheet_rngs(cfg: Config, index: int) -> List[TaskRngs]:
+    # the random.Random and (numpy backend) vectorized generator of each task of sheet `index`
+    keys = cfg.worksheet.stream_keys
+    if cfg.random_streams == "sheet":
+        rngs = [random.Random(cfg.base_seed + index)] * len(cfg.worksheet.plans)
+    else:
+        # str seeds are hashed with SHA-512, independent of PYTHONHASHSEED
+        rngs = [random.Random(f"{cfg.base_seed}:{index}:{key}") for key in keys]
+    if cfg.random_backend != "numpy":
+        return [(rng, None) for rng in rngs]
+    return [(rng, partial(_vector_block_data, cfg, key, index)) for rng, key in zip(rngs, keys)]
+
+
+def generate_tasks(
+    plans: Sequence[TaskPlan], rngs: Sequence[TaskRngs], unique: Optional[UniqueItemIndex] = None
+) -> List[Tuple[str, TaskData]]:
+    # with the numpy backend the task types in VECTOR_GENERATORS take their block-wide
+    # NumPy draw, all others (and tasks with `unique`, whose draws depend on each other)
+    # draw from the random.Random
     generated = []
-    for task in task_configs:
-        task_type = task.get("type")
-        if task_type not in TASK_GENERATORS:
-            raise ValueError(f"Unsupported task type: {task_type}")
+    for plan, (rng, vector_generator) in zip(plans, rngs):
+        task_type = plan.task_type
         generator = TASK_GENERATORS[task_type]
-        generated.append((task_type, generator(task, rng)))
+        task_rng = rng
+        scope = getattr(plan, "unique", None)
+        if scope:
+            if unique is None:
+                unique = UniqueItemIndex()
+            generator = partial(_generate_unique, generator, task_type, unique.issued(scope, task_type))
+        elif vector_generator is not None and task_type in VECTOR_GENERATORS:
+            generator = vector_generator
+        if PROFILE is None:
+            generated.append((task_type, generator(plan, task_rng)))
+        else:
+            started = time.perf_counter()
+            generated.append((task_type, generator(plan, task_rng)))
+            PROFILE.add_time(f"generate:{task_type}", time.perf_counter() - started)
     return generated
 
 
-def render_tasks(tasks: List[Tuple[str, Dict]], solution: bool) -> str:
-    rendered = []
-    for task_type, data in tasks:
-        renderer = TASK_RENDERERS[task_type]
-        rendered.append(renderer(data, solution))
-    return "\n".join(rendered)
-
-
-def render_worksheet_body(left_label: str, right_label: str, tasks_html: str) -> str:
-    return f"""  <div class='worksheet'>
-    <div class='header'>
-      <div class='header-field'>{left_label}</div>
-      <div class='header-field'>{right_label}</div>
-    </div>
-    {tasks_html}
-  </div>"""
-
-
-def build_html(title: str, worksheet_body: str) -> str:
-    return HTML_TEMPLATE.format(
-        title=title,
-        styles=STYLE_BLOCK,
-        worksheet_body=worksheet_body,
+def render_tasks(tasks: List[Tuple[str, TaskData]], out: VariantWriter) -> None:
+    # renders the worksheet and the solution variant of every task in a single pass
+    for position, (task_type, data) in enumerate(tasks):
+        if position:
+            out.write("\n")
+        if PROFILE is None:
+            TASK_RENDERERS[task_type](data, out)
+        else:
+            started = time.perf_counter()
+            TASK_RENDERERS[task_type](data, out)
+            PROFILE.add_time(f"render:{task_type}", time.perf_counter() - started)
+
+
+def render_worksheet_body(
+    left_label: str, right_label: str, tasks: List[Tuple[str, TaskData]], out: VariantWriter
+) -> None:
+    out.write(
+        "  <div class='worksheet'>\n"
+        "    <div class='header'>\n"
+        f"      <div class='header-field'>{left_label}</div>\n"
+        f"      <div class='header-field'>{right_label}</div>\n"
+        "    </div>\n"
+        "    "
     )
+    render_tasks(tasks, out)
+    out.write("\n  </div>")
+
+
+def html_document_parts(title: str, svg_sprites: bool = False, styles: str = STYLE_BLOCK) -> Tuple[str, str]:
+    head, _, tail = HTML_TEMPLATE.partition("{worksheet_body}")
+    return head.format(title=title, styles=styles, svg_sprites=SVG_SPRITE_SHEET if svg_sprites else ""), tail
+
+
+def build_html(title: str, worksheet_body: str, svg_sprites: bool = False, styles: str = STYLE_BLOCK) -> str:
+    head, tail = html_document_parts(title, svg_sprites, styles)
+    return head + worksheet_body + tail
+
+
+def write_html_file(
+    path: Path, title: str, worksheet_body: str, svg_sprites: bool = False, styles: str = STYLE_BLOCK
+) -> str:
+    # streams head, body and tail to disk without joining them; returns the file's sha256
+    head, tail = html_document_parts(title, svg_sprites, styles)
+    digest = hashlib.sha256()
+    size = 0
+    with path.open("wb") as f:
+        for part in (head, worksheet_body, tail):
+            data = part.encode("utf-8")
+            f.write(data)
+            digest.update(data)
+            size += len(data)
+    if PROFILE is not None:
+        PROFILE.add_file(path.name, size)
+    return digest.hexdigest()
+
+
+WRITE_THREADS = 2
+WRITE_QUEUE_SIZE = 16
+
+
+class WriteQueue:
+    # performs file writes on background threads so disk latency overlaps with
+    # generation; submit blocks while max_pending writes wait (backpressure), and the
+    # first failed write is raised again by the next submit and by close
+    def __init__(self, threads: int = WRITE_THREADS, max_pending: int = WRITE_QUEUE_SIZE) -> None:
+        self._queue: "queue.Queue[Optional[Tuple[Future, Callable, Tuple]]]" = queue.Queue(max_pending)
+        self._error: Optional[BaseException] = None
+        self._cancelled = False
+        self._threads = [threading.Thread(target=self._drain, daemon=True) for _ in range(max(1, threads))]
+        for thread in self._threads:
+            thread.start()
+
+    def _drain(self) -> None:
+        while True:
+            item = self._queue.get()
+            if item is None:
+                return
+            future, func, args = item
+            if self._cancelled or self._error is not None:
+                # a write failed or the producer gave up, drop the rest
+                future.cancel()
+                continue
+            if not future.set_running_or_notify_cancel():
+                continue
+            try:
+                future.set_result(func(*args))
+            except BaseException as exc:
+                if self._error is None:
+                    self._error = exc
+                future.set_exception(exc)
+
+    def _raise_error(self) -> None:
+        if self._error is not None:
+            raise self._error
+
+    def submit(self, func: Callable[..., T], *args) -> "Future[T]":
+        self._raise_error()
+        future: "Future[T]" = Future()
+        self._queue.put((future, func, args))
+        return future
+
+    def _shutdown(self) -> None:
+        for _ in self._threads:
+            self._queue.put(None)
+        for thread in self._threads:
+            thread.join()
+        self._threads = []
+
+    def close(self) -> None:
+        self._shutdown()
+        self._raise_error()
+
+    def __enter__(self) -> "WriteQueue":
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        if exc_type is None:
+            self.close()
+            return
+        # keep the caller's exception, pending writes are dropped
+        self._cancelled = True
+        self._shutdown()
+
+
+class QueuedStream:
+    # file-like wrapper whose writes are handed to one background thread in order
+    def __init__(self, stream: IO, max_pending: int = WRITE_QUEUE_SIZE) -> None:
+        self._stream = stream
+        self._writes = WriteQueue(1, max_pending)
+
+    def write(self, data: Union[str, bytes]) -> int:
+        self._writes.submit(self._stream.write, data)
+        return len(data)
+
+    def __enter__(self) -> "QueuedStream":
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        self._writes.__exit__(exc_type, exc, tb)
+
+
+class CombinedDocumentWriter:
+    def __init__(
+        self, stream: TextIO, title: str, styles: str = STYLE_BLOCK, svg_sprites: bool = False
+    ) -> None:
+        head, _, tail = COMBINED_TEMPLATE.partition("{pages}")
+        self._stream = stream
+        self._tail = tail
+        self._page_count = 0
+        self._stream.write(
+            head.format(title=title, styles=styles, svg_sprites=SVG_SPRITE_SHEET if svg_sprites else "")
+        )
 
+    def write_page(self, page_title: str, body: str) -> None:
+        if self._page_count:
+            self._stream.write("\n")
+        self._stream.write(f"<div class='worksheet-page'><div class='page-title'>{page_title}</div>")
+        self._stream.write(body)
+        self._stream.write("</div>")
+        self._page_count += 1
+
+    def close(self) -> None:
+        self._stream.write(self._tail)
+
+
+class ArchiveWriter:
+    # streams documents one after another into a single ZIP archive; entries get a
+    # fixed timestamp so identical input produces an identical archive
+    def __init__(self, path: Path) -> None:
+        self._zip = zipfile.ZipFile(path, "w", compression=zipfile.ZIP_DEFLATED)
+
+    def _entry(self, name: str) -> zipfile.ZipInfo:
+        info = zipfile.ZipInfo(name)
+        info.compress_type = zipfile.ZIP_DEFLATED
+        info.external_attr = 0o644 << 16
+        return info
+
+    def write_document(self, name: str, parts: Sequence[Union[str, bytes]]) -> None:
+        size = 0
+        with self._zip.open(self._entry(name), "w") as entry:
+            for part in parts:
+                data = part.encode("utf-8") if isinstance(part, str) else part
+                entry.write(data)
+                size += len(data)
+        if PROFILE is not None:
+            PROFILE.add_file(name, size)
+
+    def write_file(self, name: str, path: Path) -> None:
+        size = path.stat().st_size
+        with path.open("rb") as source, self._zip.open(
+            self._entry(name), "w", force_zip64=size >= zipfile.ZIP64_LIMIT
+        ) as entry:
+            shutil.copyfileobj(source, entry, 1 << 16)
+        if PROFILE is not None:
+            PROFILE.add_file(name, size)
+
+    def close(self) -> None:
+        self._zip.close()
+
+
+# ---------- PDF backend ----------
+
+PDF_CM = 72 / 2.54
+PDF_PAGE_WIDTH = 595.28
+PDF_PAGE_HEIGHT = 841.89
+PDF_MARGIN = 1.5 * PDF_CM
+PDF_TOP = PDF_PAGE_HEIGHT - PDF_MARGIN
+PDF_CONTENT_WIDTH = PDF_PAGE_WIDTH - 2 * PDF_MARGIN
+PDF_TASK_PADDING = 0.4 * PDF_CM
+PDF_TASK_GAP = 0.6 * PDF_CM
+PDF_INNER_LEFT = PDF_MARGIN + PDF_TASK_PADDING
+PDF_INNER_WIDTH = PDF_CONTENT_WIDTH - 2 * PDF_TASK_PADDING
+PDF_LINE_HEIGHT = 14.4
+PDF_TABLE_ROW_HEIGHT = 0.85 * PDF_CM
+PDF_HEADER_SHADE = "0.96 g"
+PDF_PAGE_START = "0.75 w 0 G 0 g\n"
+
+# the standard 14 fonts need no embedding; F1 is Helvetica, F2 Helvetica-Bold
+PDF_FONTS = {"F1": "Helvetica", "F2": "Helvetica-Bold"}
+# glyph widths (1/1000 em) of both fonts for " " to "~" plus the German letters used in titles
+_PDF_ASCII = "".join(chr(code) for code in range(32, 127)) + "ÄÖÜäöüß–"
+_PDF_WIDTHS_REGULAR = (
+    278, 278, 355, 556, 556, 889, 667, 191, 333, 333, 389, 584, 278, 333, 278, 278,
+    556, 556, 556, 556, 556, 556, 556, 556, 556, 556, 278, 278, 584, 584, 584, 556,
+    1015, 667, 667, 722, 722, 667, 611, 778, 722, 278, 500, 667, 556, 833, 722, 778,
+    667, 778, 722, 667, 611, 722, 667, 944, 667, 667, 611, 278, 278, 278, 469, 556,
+    333, 556, 556, 500, 556, 556, 278, 556, 556, 222, 222, 500, 222, 833, 556, 556,
+    556, 556, 333, 500, 278, 556, 500, 722, 500, 500, 500, 334, 260, 334, 584,
+    667, 778, 722, 556, 556, 556, 611, 556,
+)
+_PDF_WIDTHS_BOLD = (
+    278, 333, 474, 556, 556, 889, 722, 238, 333, 333, 389, 584, 278, 333, 278, 278,
+    556, 556, 556, 556, 556, 556, 556, 556, 556, 556, 333, 333, 584, 584, 584, 611,
+    975, 722, 722, 722, 722, 667, 611, 778, 722, 278, 556, 722, 611, 833, 722, 778,
+    667, 778, 722, 667, 611, 722, 667, 944, 667, 667, 611, 333, 278, 333, 584, 556,
+    333, 556, 611, 556, 611, 556, 333, 611, 611, 278, 278, 556, 278, 889, 611, 611,
+    611, 611, 389, 556, 333, 611, 556, 778, 556, 556, 500, 389, 280, 389, 584,
+    722, 778, 722, 556, 611, 611, 611, 556,
+)
+PDF_FONT_WIDTHS = {
+    "F1": dict(zip(_PDF_ASCII, _PDF_WIDTHS_REGULAR)),
+    "F2": dict(zip(_PDF_ASCII, _PDF_WIDTHS_BOLD)),
+}
 
-def build_combined_document(title: str, pages: List[Tuple[str, str]]) -> str:
-    combined_pages = []
-    for page_title, body in pages:
-        combined_pages.append(f"<div class='worksheet-page'><div class='page-title'>{page_title}</div>{body}</div>")
-    return COMBINED_TEMPLATE.format(title=title, styles=STYLE_BLOCK, pages="\n".join(combined_pages))
 
+def pdf_text_width(text: str, size: float = 12, font: str = "F1") -> float:
+    widths = PDF_FONT_WIDTHS[font]
+    return sum(widths.get(char, 556) for char in text) * size / 1000
 
-def generate_single_worksheet(cfg: Config, index: int) -> Tuple[str, str, str, str]:
-    rng = random.Random(cfg.base_seed + index)
-    tasks_data = generate_tasks(cfg.worksheet.tasks, rng)
 
-    worksheet_tasks_html = render_tasks(tasks_data, solution=False)
-    solution_tasks_html = render_tasks(tasks_data, solution=True)
+def _pdf_literal(text: str) -> str:
+    # content streams are assembled as latin-1 text, which maps 1:1 onto the WinAnsi bytes
+    encoded = text.encode("cp1252", "replace").decode("latin-1")
+    return "(" + encoded.replace("\\", "\\\\").replace("(", "\\(").replace(")", "\\)") + ")"
 
-    worksheet_body = render_worksheet_body(
-        cfg.worksheet.header_left_label,
-        cfg.worksheet.header_right_label,
-        worksheet_tasks_html,
-    )
 
-    solution_body = render_worksheet_body(
-        cfg.worksheet.header_left_label,
-        cfg.worksheet.header_right_label,
-        solution_tasks_html,
+def _pdf_text_string(text: str) -> str:
+    # document strings (title, outline) are UTF-16 with byte order mark
+    return "<FEFF" + text.encode("utf-16-be").hex().upper() + ">"
+
+
+def _pdf_text(x: float, y: float, text: str, size: float = 12, font: str = "F1", align: str = "left") -> str:
+    if align == "center":
+        x -= pdf_text_width(text, size, font) / 2
+    elif align == "right":
+        x -= pdf_text_width(text, size, font)
+    return f"BT /{font} {size:.2f} Tf {x:.2f} {y:.2f} Td {_pdf_literal(text)} Tj ET\n"
+
+
+def _pdf_baseline(top: float, height: float, size: float = 12) -> float:
+    # baseline that centres digits and lower-case text vertically in a box
+    return top - height / 2 - size * 0.35
+
+
+def _pdf_centered_text(
+    x: float, top: float, width: float, height: float, text: str, size: float = 12, font: str = "F1"
+) -> str:
+    return _pdf_text(x + width / 2, _pdf_baseline(top, height, size), text, size, font, "center")
+
+
+def _pdf_rect(x: float, y: float, width: float, height: float, shaded: bool = False) -> str:
+    if shaded:
+        return f"{PDF_HEADER_SHADE} {x:.2f} {y:.2f} {width:.2f} {height:.2f} re B 0 g\n"
+    return f"{x:.2f} {y:.2f} {width:.2f} {height:.2f} re S\n"
+
+
+def _pdf_line(x1: float, y1: float, x2: float, y2: float) -> str:
+    return f"{x1:.2f} {y1:.2f} m {x2:.2f} {y2:.2f} l S\n"
+
+
+def _pdf_circle(cx: float, cy: float, r: float) -> str:
+    k = 0.5523 * r
+    return (
+        f"{cx + r:.2f} {cy:.2f} m "
+        f"{cx + r:.2f} {cy + k:.2f} {cx + k:.2f} {cy + r:.2f} {cx:.2f} {cy + r:.2f} c "
+        f"{cx - k:.2f} {cy + r:.2f} {cx - r:.2f} {cy + k:.2f} {cx - r:.2f} {cy:.2f} c "
+        f"{cx - r:.2f} {cy - k:.2f} {cx - k:.2f} {cy - r:.2f} {cx:.2f} {cy - r:.2f} c "
+        f"{cx + k:.2f} {cy - r:.2f} {cx + r:.2f} {cy - k:.2f} {cx + r:.2f} {cy:.2f} c "
     )
 
-    worksheet_html = build_html(
-        title=f"Arbeitsblatt {index + 1}",
-        worksheet_body=worksheet_body,
+
+def _pdf_wrap(text: str, width: float, size: float = 12, font: str = "F1") -> List[str]:
+    lines: List[str] = []
+    current = ""
+    for word in text.split(" "):
+        candidate = f"{current} {word}" if current else word
+        if current and pdf_text_width(candidate, size, font) > width:
+            lines.append(current)
+            current = word
+        else:
+            current = candidate
+    lines.append(current)
+    return lines
+
+
+@dataclass(frozen=True)
+class PdfForm:
+    # reusable drawing (form XObject) with a 0 0 width height bounding box
+    name: str
+    width: float
+    height: float
+    content: bytes
+
+
+def _pdf_form(name: str, width: float, height: float, content: str) -> PdfForm:
+    return PdfForm(name, width, height, zlib.compress(content.encode("latin-1")))
+
+
+# dice faces and tally groups in their SVG coordinates, flipped upright
+PDF_DICE_FORMS = {
+    face: _pdf_form(f"Dice{face}", 100, 100, "".join(_pdf_circle(x, 100 - y, 8) for x, y in pips) + "f\n")
+    for face, pips in DICE_PIP_POSITIONS.items()
+}
+PDF_TALLY_FORMS = {
+    size: _pdf_form(
+        f"Tally{size}",
+        size * TALLY_LINE_SPACING,
+        TALLY_TOP_MARGIN + TALLY_LINE_HEIGHT + TALLY_BOTTOM_MARGIN,
+        "5 w 1 J "
+        + "".join(
+            _pdf_line(
+                5 + i * TALLY_LINE_SPACING,
+                TALLY_BOTTOM_MARGIN,
+                5 + i * TALLY_LINE_SPACING,
+                TALLY_BOTTOM_MARGIN + TALLY_LINE_HEIGHT,
+            )
+            for i in range(size)
+        ),
     )
+    for size in range(1, 6)
+}
+PDF_PLACE_FORMS = {
+    place: _pdf_form(
+        f"Place{place}",
+        shape.width,
+        100,
+        "1 g 2 w "
+        + "".join(
+            " ".join(f"{x} {100 - y} {'m' if i == 0 else 'l'}" for i, (x, y) in enumerate(face)) + " h B\n"
+            for face in shape.faces
+        )
+        + "1 w "
+        + "".join(_pdf_line(x1, 100 - y1, x2, 100 - y2) for x1, y1, x2, y2 in shape.lines),
+    )
+    for place, shape in PLACE_VALUE_SHAPES.items()
+}
+
+
+@dataclass(frozen=True)
+class PdfPages:
+    # compressed content streams of one variant of a sheet and the forms they use
+    contents: Tuple[bytes, ...]
+    forms: Tuple[PdfForm, ...]
+
+
+class PdfCanvas:
+    # lays out one sheet from top to bottom and records the worksheet and the
+    # solution page contents side by side, like VariantWriter does for markup;
+    # blocks that do not fit start a new page, an open task frame continues there
+    def __init__(self) -> None:
+        self.forms: Dict[str, PdfForm] = {}
+        self.y = PDF_TOP
+        self._pages: List[Tuple[bytes, bytes]] = []
+        self._worksheet: List[str] = [PDF_PAGE_START]
+        self._solution: List[str] = [PDF_PAGE_START]
+        self._fresh = True
+        self._frame_top: Optional[float] = None
+
+    def draw(self, op: str) -> None:
+        self._worksheet.append(op)
+        self._solution.append(op)
+
+    def answer(self, worksheet_op: str, solution_op: str) -> None:
+        self._worksheet.append(worksheet_op)
+        self._solution.append(solution_op)
+
+    def place(self, form: PdfForm, x: float, y: float, scale: float) -> str:
+        self.forms.setdefault(form.name, form)
+        return f"q {scale:.4f} 0 0 {scale:.4f} {x:.2f} {y:.2f} cm /{form.name} Do Q\n"
+
+    def space(self, height: float) -> None:
+        if self.y - height < PDF_MARGIN and not self._fresh:
+            if self._frame_top is not None:
+                self.draw(_pdf_rect(PDF_MARGIN, PDF_MARGIN, PDF_CONTENT_WIDTH, self._frame_top - PDF_MARGIN))
+            self._flush()
+            if self._frame_top is not None:
+                self._frame_top = self.y
+                self.y -= PDF_TASK_PADDING
+        self._fresh = False
+
+    def begin_task(self, title: str, first_block: float) -> None:
+        lines = _pdf_wrap(title, PDF_INNER_WIDTH, 12, "F2")
+        title_height = len(lines) * PDF_LINE_HEIGHT + 0.2 * PDF_CM
+        self.space(PDF_TASK_PADDING + title_height + first_block)
+        self._frame_top = self.y
+        self.y -= PDF_TASK_PADDING
+        for line in lines:
+            self.draw(_pdf_text(PDF_INNER_LEFT, self.y - 11, line, 12, "F2"))
+            self.y -= PDF_LINE_HEIGHT
+        self.y -= 0.2 * PDF_CM
+
+    def end_task(self) -> None:
+        self.y -= PDF_TASK_PADDING
+        self.draw(_pdf_rect(PDF_MARGIN, self.y, PDF_CONTENT_WIDTH, self._frame_top - self.y))
+        self._frame_top = None
+        self.y -= PDF_TASK_GAP
+
+    def _flush(self) -> None:
+        self._pages.append((
+            zlib.compress("".join(self._worksheet).encode("latin-1")),
+            zlib.compress("".join(self._solution).encode("latin-1")),
+        ))
+        self._worksheet = [PDF_PAGE_START]
+        self._solution = [PDF_PAGE_START]
+        self.y = PDF_TOP
+        self._fresh = True
+
+    def finish(self) -> Tuple[PdfPages, PdfPages]:
+        self._flush()
+        forms = tuple(self.forms.values())
+        return (
+            PdfPages(tuple(worksheet for worksheet, _ in self._pages), forms),
+            PdfPages(tuple(solution for _, solution in self._pages), forms),
+        )
+
+
+def _pdf_grid_rows(
+    canvas: PdfCanvas, count: int, columns: int, row_height: float, gap: float
+) -> Iterator[Tuple[int, int, float, float]]:
+    # yields (first item, last item, top, column width) per grid row
+    columns = max(1, columns)
+    column_width = (PDF_INNER_WIDTH - (columns - 1) * gap) / columns
+    for row, first in enumerate(range(0, count, columns)):
+        if row:
+            canvas.y -= gap
+        canvas.space(row_height)
+        yield first, min(count, first + columns), canvas.y, column_width
+        canvas.y -= row_height
+
+
+def render_pdf_number_dictation(data: NumberDictationData, canvas: PdfCanvas) -> None:
+    box = PDF_CM
+    gap = 0.1 * PDF_CM
+    per_line = max(1, int((PDF_INNER_WIDTH + gap) // (box + gap)))
+    canvas.begin_task(data.title, box)
+    for first, last, top, _ in _pdf_grid_rows(canvas, data.box_count, per_line, box, gap):
+        for i in range(first, last):
+            x = PDF_INNER_LEFT + (i - first) * (box + gap)
+            canvas.draw(_pdf_rect(x, top - box, box, box))
+            if data.show_helper_numbers:
+                canvas.answer("", _pdf_centered_text(x, top, box, box, str(i + 1)))
+    canvas.end_task()
+
+
+def render_pdf_compare_numbers(data: CompareNumbersData, canvas: PdfCanvas) -> None:
+    circle = PDF_CM
+    gap = 0.2 * PDF_CM
+    canvas.begin_task(data.title, circle)
+    for first, last, top, width in _pdf_grid_rows(canvas, len(data), data.columns, circle, 0.4 * PDF_CM):
+        slot = max(0.0, min(1.6 * PDF_CM, (width - circle - 2 * gap) / 2))
+        for column, (a, b, symbol) in enumerate(map(data.item, range(first, last))):
+            x = PDF_INNER_LEFT + column * (width + 0.4 * PDF_CM)
+            circle_x = x + slot + gap
+            canvas.draw(
+                _pdf_centered_text(x, top, slot, circle, str(a))
+                + _pdf_circle(circle_x + circle / 2, top - circle / 2, circle / 2)
+                + "S\n"
+                + _pdf_centered_text(circle_x + circle + gap, top, slot, circle, str(b))
+            )
+            canvas.answer("", _pdf_centered_text(circle_x, top, circle, circle, symbol, 14))
+    canvas.end_task()
+
+
+def _pdf_table_header(
+    canvas: PdfCanvas, left: float, widths: Sequence[float], labels: Sequence[str], height: float
+) -> None:
+    x = left
+    for width, label in zip(widths, labels):
+        canvas.draw(_pdf_rect(x, canvas.y - height, width, height, shaded=True))
+        canvas.draw(_pdf_centered_text(x, canvas.y, width, height, label, 12, "F2"))
+        x += width
+    canvas.y -= height
+
+
+def render_pdf_pre_succ_table(data: PreSuccTableData, canvas: PdfCanvas) -> None:
+    height = PDF_TABLE_ROW_HEIGHT
+    width = PDF_INNER_WIDTH / 3
+    canvas.begin_task(data.title, 2 * height)
+    _pdf_table_header(canvas, PDF_INNER_LEFT, (width,) * 3, ("Vorgänger", "Zahl", "Nachfolger"), height)
+    for given, values in data.rows():
+        canvas.space(height)
+        for column, value in enumerate(values):
+            x = PDF_INNER_LEFT + column * width
+            canvas.draw(_pdf_rect(x, canvas.y - height, width, height))
+            text = _pdf_centered_text(x, canvas.y, width, height, str(value))
+            if given == column:
+                canvas.draw(text)
+            else:
+                canvas.answer("", text)
+        canvas.y -= height
+    canvas.end_task()
+
+
+def render_pdf_arithmetic_list(data: ArithmeticListData, canvas: PdfCanvas) -> None:
+    box = PDF_CM
+    canvas.begin_task(data.title, box)
+    for first, last, top, width in _pdf_grid_rows(canvas, len(data), data.columns, box, 0.4 * PDF_CM):
+        for column, (a, op, b, result) in enumerate(map(data.item, range(first, last))):
+            x = PDF_INNER_LEFT + column * (width + 0.4 * PDF_CM)
+            exercise = f"{a} {op} {b} ="
+            box_x = x + pdf_text_width(exercise) + 0.2 * PDF_CM
+            canvas.draw(_pdf_text(x, _pdf_baseline(top, box), exercise) + _pdf_rect(box_x, top - box, box, box))
+            canvas.answer("", _pdf_centered_text(box_x, top, box, box, str(result)))
+    canvas.end_task()
+
+
+# long words below this size are broken after "tausend" instead
+PDF_NUMBER_WORD_MIN_SIZE = 9.0
+
+
+def _pdf_number_word_line(segments: NumberWordSegments, x: float, width: float, baseline: float, size: float) -> str:
+    word = "".join(text for text, _ in segments)
+    text_x = x + (width - pdf_text_width(word, size)) / 2
+    ops = [_pdf_text(text_x, baseline, word, size)]
+    for text, is_and in segments:
+        segment_width = pdf_text_width(text, size)
+        if is_and:
+            underline_y = baseline - 0.15 * size
+            underline = _pdf_line(text_x, underline_y, text_x + segment_width, underline_y)
+            ops.append(f"{0.08 * size:.2f} w {underline}0.75 w\n")
+        text_x += segment_width
+    return "".join(ops)
+
+
+def _pdf_number_word(value: int, x: float, top: float, width: float, height: float) -> str:
+    entry = number_entry(value)
+    available = width - 0.4 * PDF_CM
+    size = min(12.0, 12.0 * available / max(1.0, pdf_text_width(entry.word)))
+    if size >= PDF_NUMBER_WORD_MIN_SIZE or len(entry.lines) == 1:
+        segments = tuple(segment for line in entry.lines for segment in line)
+        return _pdf_number_word_line(segments, x, width, _pdf_baseline(top, height, size), size)
+    widest = max(pdf_text_width("".join(text for text, _ in line)) for line in entry.lines)
+    size = min(12.0, 12.0 * available / widest)
+    leading = 1.2 * size
+    line_top = top - (height - leading * len(entry.lines)) / 2
+    ops = []
+    for line in entry.lines:
+        ops.append(_pdf_number_word_line(line, x, width, _pdf_baseline(line_top, leading, size), size))
+        line_top -= leading
+    return "".join(ops)
+
+
+PdfPlacement = Tuple[PdfForm, float, float, float]
+
+
+def _pdf_dice_layout(value: int, size: float, ones_place: bool = True) -> Tuple[List[PdfPlacement], float]:
+    # same arrangement as dice_representation: blocks for the hundreds and above, tally
+    # groups for the tens, dice for the ones; (form, x, y below the centre line, scale)
+    # for a row size high, and the width of the row
+    tally_unit = size / (TALLY_TOP_MARGIN + TALLY_LINE_HEIGHT + TALLY_BOTTOM_MARGIN)
+    gap = 0.15 * size
+    placements: List[PdfPlacement] = []
+    left = 0.0
+    for place in sorted(PLACE_VALUE_SHAPES, reverse=True):
+        count = value // place % 10
+        if count:
+            offsets, width = _place_value_layout(place, count)
+            placements.extend((PDF_PLACE_FORMS[place], left + x * tally_unit, size / 2, tally_unit) for x in offsets)
+            left += width * tally_unit + gap
+
+    groups = _tally_groups(value // 10 % 10)
+    x = 5
+    for idx, group_size in enumerate(groups):
+        placements.append((PDF_TALLY_FORMS[group_size], left + (x - 5) * tally_unit, size / 2, tally_unit))
+        x += group_size * TALLY_LINE_SPACING
+        if idx < len(groups) - 1:
+            x += TALLY_GROUP_GAP
+    if groups:
+        left += (x + 5) * tally_unit + gap
+    if not ones_place:
+        return placements, left - gap
 
-    solution_html = build_html(
-        title=f"Arbeitsblatt {index + 1} – Lösung",
-        worksheet_body=solution_body,
+    ones = value % 10
+    faces = [5] * (ones // 5) + ([ones % 5] if ones % 5 else [])
+    face_size = 0.9 * size
+    # an empty ones place keeps the width of one (invisible) die
+    for face in faces:
+        placements.append((PDF_DICE_FORMS[face], left, face_size / 2, face_size / 100))
+        left += face_size + 0.1 * size
+    return placements, left + (0.0 if faces else face_size + 0.1 * size) - 0.1 * size
+
+
+def _pdf_dice(canvas: PdfCanvas, value: int, center_x: float, center_y: float, max_width: float) -> str:
+    # one row scaled down to max_width; large numbers that would shrink too much
+    # get their thousands on a row of their own, like the number word
+    rows = [(_pdf_dice_layout(value, PDF_CM), center_y)]
+    if value >= 1000 and value % 1000 and rows[0][0][1] > 1.5 * max_width:
+        rows = [
+            (_pdf_dice_layout(value // 1000 * 1000, 0.8 * PDF_CM, ones_place=False), center_y + 0.42 * PDF_CM),
+            (_pdf_dice_layout(value % 1000, 0.8 * PDF_CM), center_y - 0.42 * PDF_CM),
+        ]
+    ops = []
+    for (placements, width), row_y in rows:
+        scale = min(1.0, max_width / width)
+        left = center_x - width * scale / 2
+        for form, x, below, form_scale in placements:
+            ops.append(canvas.place(form, left + x * scale, row_y - below * scale, form_scale * scale))
+    return "".join(ops)
+
+
+def render_pdf_number_word_table(data: NumberWordTableData, canvas: PdfCanvas) -> None:
+    header_height = PDF_TABLE_ROW_HEIGHT
+    height = 1.8 * PDF_CM
+    width = PDF_INNER_WIDTH / 3
+    canvas.begin_task(data.title, header_height + height)
+    _pdf_table_header(canvas, PDF_INNER_LEFT, (width,) * 3, ("Zahlwort", "Würfelbild", "Zahl"), header_height)
+    for value, given_columns in data.rows():
+        canvas.space(height)
+        top = canvas.y
+        for column, (key, content) in enumerate((
+            ("word", _pdf_number_word(value, PDF_INNER_LEFT, top, width, height)),
+            ("dice", _pdf_dice(canvas, value, PDF_INNER_LEFT + 1.5 * width, top - height / 2, width - 0.2 * PDF_CM)),
+            ("number", _pdf_centered_text(PDF_INNER_LEFT + 2 * width, top, width, height, str(value))),
+        )):
+            canvas.draw(_pdf_rect(PDF_INNER_LEFT + column * width, top - height, width, height))
+            if key in given_columns:
+                canvas.draw(content)
+            else:
+                canvas.answer("", content)
+        canvas.y -= height
+    canvas.end_task()
+
+
+def render_pdf_ordering(data: OrderingData, canvas: PdfCanvas) -> None:
+    cell = 0.8 * PDF_CM
+    comparator = 0.6 * PDF_CM
+    symbol = ("<" if data.order == "increasing" else ">") if data.show_symbols else ""
+    lines = _pdf_wrap(", ".join(str(n) for n in data.numbers), PDF_INNER_WIDTH)
+    canvas.begin_task(data.title, PDF_LINE_HEIGHT)
+    for line in lines:
+        canvas.space(PDF_LINE_HEIGHT)
+        canvas.draw(_pdf_text(PDF_INNER_LEFT, canvas.y - 11, line))
+        canvas.y -= PDF_LINE_HEIGHT
+    canvas.y -= 0.3 * PDF_CM
+
+    sorted_numbers = data.sorted_numbers()
+    remaining = len(sorted_numbers)
+    for row_idx, row in enumerate(ordering_rows(sorted_numbers, cell, comparator, PDF_INNER_WIDTH)):
+        if row_idx:
+            canvas.y -= cell + 0.2 * PDF_CM
+        canvas.space(cell)
+        x = PDF_INNER_LEFT
+        for value in row:
+            for digit in str(value):
+                canvas.draw(_pdf_rect(x, canvas.y - cell, cell, cell))
+                canvas.answer("", _pdf_centered_text(x, canvas.y, cell, cell, digit))
+                x += cell
+            remaining -= 1
+            if remaining:
+                canvas.draw(_pdf_rect(x, canvas.y - cell, comparator, cell))
+                if symbol:
+                    canvas.draw(_pdf_centered_text(x, canvas.y, comparator, cell, symbol))
+                x += comparator
+    canvas.y -= cell
+    canvas.end_task()
+
+
+def render_pdf_operation_table(data: OperationTablesData, canvas: PdfCanvas) -> None:
+    # cards flow like the grid's repeat(auto-fit, minmax(6cm, 1fr))
+    gap = 0.5 * PDF_CM
+    padding = 0.2 * PDF_CM
+    height = PDF_TABLE_ROW_HEIGHT
+    per_row = max(1, int((PDF_INNER_WIDTH + gap) // (6 * PDF_CM + gap)))
+    tables = data.tables
+    card_width = (PDF_INNER_WIDTH - (min(per_row, max(1, len(tables))) - 1) * gap) / min(per_row, max(1, len(tables)))
+
+    def card_height(table: OperationTableData) -> float:
+        return 2 * padding + (len(table.row_headers) + 1) * height
+
+    canvas.begin_task(data.title, card_height(tables[0]) if tables else 0)
+    for row, first in enumerate(range(0, len(tables), per_row)):
+        group = tables[first : first + per_row]
+        row_height = max(card_height(table) for table in group)
+        if row:
+            canvas.y -= gap
+        canvas.space(row_height)
+        for column, table in enumerate(group):
+            x = PDF_INNER_LEFT + column * (card_width + gap)
+            top = canvas.y
+            canvas.draw(_pdf_rect(x, top - card_height(table), card_width, card_height(table)))
+            left = x + padding
+            cell = (card_width - 2 * padding) / (len(table.col_headers) + 1)
+            y = top - padding
+            labels = [table.operation, *(str(c) for c in table.col_headers)]
+            for c_idx, label in enumerate(labels):
+                canvas.draw(_pdf_rect(left + c_idx * cell, y - height, cell, height, shaded=True))
+                font = "F2" if c_idx == 0 else "F1"
+                canvas.draw(_pdf_centered_text(left + c_idx * cell, y, cell, height, label, 12, font))
+            for r_idx, row_header in enumerate(table.row_headers):
+                y -= height
+                canvas.draw(_pdf_rect(left, y - height, cell, height, shaded=True))
+                canvas.draw(_pdf_centered_text(left, y, cell, height, str(row_header)))
+                for c_idx, result in enumerate(table.row_results(row_header)):
+                    cell_x = left + (c_idx + 1) * cell
+                    canvas.draw(_pdf_rect(cell_x, y - height, cell, height))
+                    text = _pdf_centered_text(cell_x, y, cell, height, str(result))
+                    if (r_idx, c_idx) in table.revealed:
+                        canvas.draw(text)
+                    else:
+                        canvas.answer("", text)
+        canvas.y -= row_height
+    canvas.end_task()
+
+
+@lru_cache(maxsize=256)
+def _pdf_axis_form(start: int, end: int, major: int) -> PdfForm:
+    # axis and ticks of one number line, shared by every sheet with the same range
+    flip = NUMBER_LINE_HEIGHT
+    axis_y = flip - NUMBER_LINE_AXIS_Y
+    ops = ["2 w " + _pdf_line(NUMBER_LINE_MARGIN, axis_y, NUMBER_LINE_WIDTH - NUMBER_LINE_MARGIN, axis_y)]
+    ticks = _number_line_ticks(start, end, major)
+    for kind, stroke in (("minor", 2), ("mid", 2.5), ("major", 3)):
+        lines = "".join(
+            f"{x:.2f} {flip - top:.2f} m {x:.2f} {flip - bottom:.2f} l " for _, x, top, bottom, k in ticks if k == kind
+        )
+        if lines:
+            ops.append(f"{stroke} w {lines}S\n")
+    name = f"Axis{start}_{end}_{major}".replace("-", "m")
+    return _pdf_form(name, NUMBER_LINE_WIDTH, NUMBER_LINE_HEIGHT, "".join(ops))
+
+
+def render_pdf_number_line(data: NumberLineData, canvas: PdfCanvas) -> None:
+    start = data.start
+    end = data.end
+    major = data.major_tick
+    total_range = max(1, end - start)
+    scale = PDF_INNER_WIDTH / NUMBER_LINE_WIDTH
+    usable_width = NUMBER_LINE_WIDTH - 2 * NUMBER_LINE_MARGIN
+    height = NUMBER_LINE_HEIGHT * scale
+
+    canvas.begin_task(data.title, height)
+    canvas.space(height)
+    top = canvas.y
+    left = PDF_INNER_LEFT
+
+    def point(x: float, y: float) -> Tuple[float, float]:
+        return left + x * scale, top - y * scale
+
+    canvas.draw(canvas.place(_pdf_axis_form(start, end, major), left, top - height, scale))
+    ticks = _number_line_ticks(start, end, major)
+    tick_tops = {value: tick_top for value, _, tick_top, _, _ in ticks}
+    labels = []
+    for value, x, tick_top, _, kind in ticks:
+        if kind == "major":
+            label_x, label_y = point(x, tick_top - 18)
+            labels.append(_pdf_text(label_x, label_y, str(value), 13.33 * scale, align="center"))
+    canvas.answer("", "".join(labels))
+
+    if data.values:
+        box_width = 70
+        box_height = 36
+        box_y = 24
+        min_gap = 12
+        max_offset = 40
+        previous_right = NUMBER_LINE_MARGIN - min_gap
+        minor_half = NUMBER_LINE_TICK_HEIGHTS["minor"] / 2
+        canvas.draw(f"{2 * scale:.2f} w\n")
+        for value in sorted(data.values):
+            tick_x = NUMBER_LINE_MARGIN + ((value - start) / total_range) * usable_width
+            min_center = previous_right + box_width / 2 + min_gap
+            box_center_x = max(tick_x, min_center)
+            if abs(box_center_x - tick_x) > max_offset:
+                direction = 1 if box_center_x > tick_x else -1
+                box_center_x = max(tick_x + direction * max_offset, min_center)
+            box_center_x = min(
+                max(box_center_x, NUMBER_LINE_MARGIN + box_width / 2),
+                NUMBER_LINE_WIDTH - NUMBER_LINE_MARGIN - box_width / 2,
+            )
+            previous_right = box_center_x + box_width / 2
+
+            line_start = point(box_center_x, box_y + box_height)
+            tick_top = tick_tops.get(value)
+            if tick_top is None:
+                # a thinned-out minor tick is drawn for the values that are asked for
+                tick_top = NUMBER_LINE_AXIS_Y - minor_half
+                canvas.draw(_pdf_line(*point(tick_x, tick_top), *point(tick_x, NUMBER_LINE_AXIS_Y + minor_half)))
+            line_end = point(tick_x, tick_top)
+            box_x, box_top = point(box_center_x - box_width / 2, box_y)
+            box = f"{box_x:.2f} {box_top - box_height * scale:.2f} {box_width * scale:.2f} {box_height * scale:.2f} re"
+            canvas.draw(_pdf_line(*line_start, *line_end) + f"1 g {box} B 0 g\n")
+            canvas.answer(
+                "", _pdf_centered_text(box_x, box_top, box_width * scale, box_height * scale, str(value), 16 * scale)
+            )
+        canvas.draw("0.75 w\n")
+    canvas.y -= height
+    canvas.end_task()
+
+
+TASK_PDF_RENDERERS = {
+    "number_dictation": render_pdf_number_dictation,
+    "compare_numbers": render_pdf_compare_numbers,
+    "pre_succ_table": render_pdf_pre_succ_table,
+    "arithmetic_list": render_pdf_arithmetic_list,
+    "number_word_table": render_pdf_number_word_table,
+    "ordering": render_pdf_ordering,
+    "operation_table": render_pdf_operation_table,
+    "number_line": render_pdf_number_line,
+}
+
+
+def render_pdf_sheet(left_label: str, right_label: str, tasks: List[Tuple[str, TaskData]]) -> Tuple[PdfPages, PdfPages]:
+    canvas = PdfCanvas()
+    header_baseline = PDF_TOP - 11
+    canvas.draw(
+        _pdf_text(PDF_MARGIN, header_baseline, left_label)
+        + _pdf_text(PDF_MARGIN + 0.52 * PDF_CONTENT_WIDTH, header_baseline, right_label)
     )
+    canvas.y -= PDF_LINE_HEIGHT + 0.3 * PDF_CM
+    canvas.draw(_pdf_line(PDF_MARGIN, canvas.y, PDF_MARGIN + PDF_CONTENT_WIDTH, canvas.y))
+    canvas.y -= 0.5 * PDF_CM
+    for task_type, data in tasks:
+        if PROFILE is None:
+            TASK_PDF_RENDERERS[task_type](data, canvas)
+        else:
+            started = time.perf_counter()
+            TASK_PDF_RENDERERS[task_type](data, canvas)
+            PROFILE.add_time(f"pdf:{task_type}", time.perf_counter() - started)
+    return canvas.finish()
+
+
+class PdfDocumentWriter:
+    # streams pages into a PDF file; fonts and forms are written once and shared by
+    # all pages through one resource dictionary, which like the page tree and the
+    # outline (one entry per sheet variant) is written when the document is closed
+    CATALOG, PAGES, RESOURCES = 1, 2, 3
+
+    def __init__(self, stream: BinaryIO, title: str) -> None:
+        self._stream = stream
+        self._title = title
+        self._position = 0
+        self._offsets: Dict[int, int] = {}
+        self._next_number = self.RESOURCES + 1
+        self._pages: List[int] = []
+        self._forms: Dict[str, int] = {}
+        self._outline: List[Tuple[str, int]] = []
+        self._emit(b"%PDF-1.4\n%\xe2\xe3\xcf\xd3\n")
+        self._fonts = {
+            name: self._add(
+                f"<< /Type /Font /Subtype /Type1 /BaseFont /{base} /Encoding /WinAnsiEncoding >>".encode()
+            )
+            for name, base in PDF_FONTS.items()
+        }
+
+    def _emit(self, data: bytes) -> None:
+        self._stream.write(data)
+        self._position += len(data)
+
+    def _add(self, body: bytes, number: Optional[int] = None) -> int:
+        if number is None:
+            number = self._next_number
+            self._next_number += 1
+        self._offsets[number] = self._position
+        self._emit(f"{number} 0 obj\n".encode() + body + b"\nendobj\n")
+        return number
+
+    def _add_stream(self, dictionary: str, data: bytes) -> int:
+        header = f"<< {dictionary} /Filter /FlateDecode /Length {len(data)} >>\nstream\n".encode()
+        return self._add(header + data + b"\nendstream")
+
+    def write_page(self, page_title: str, pages: PdfPages) -> None:
+        for form in pages.forms:
+            if form.name not in self._forms:
+                self._forms[form.name] = self._add_stream(
+                    f"/Type /XObject /Subtype /Form /BBox [0 0 {form.width:g} {form.height:g}]", form.content
+                )
+        for position, content in enumerate(pages.contents):
+            contents = self._add_stream("", content)
+            page = self._add(
+                f"<< /Type /Page /Parent {self.PAGES} 0 R /MediaBox [0 0 {PDF_PAGE_WIDTH} {PDF_PAGE_HEIGHT}] "
+                f"/Resources {self.RESOURCES} 0 R /Contents {contents} 0 R >>".encode()
+            )
+            if not position:
+                self._outline.append((page_title, page))
+            self._pages.append(page)
+
+    def close(self) -> None:
+        fonts = " ".join(f"/{name} {number} 0 R" for name, number in self._fonts.items())
+        forms = " ".join(f"/{name} {number} 0 R" for name, number in self._forms.items())
+        self._add(f"<< /ProcSet [/PDF /Text] /Font << {fonts} >> /XObject << {forms} >> >>".encode(), self.RESOURCES)
+        kids = " ".join(f"{page} 0 R" for page in self._pages)
+        self._add(f"<< /Type /Pages /Kids [{kids}] /Count {len(self._pages)} >>".encode(), self.PAGES)
+
+        outline_root = self._next_number
+        items = list(range(outline_root + 1, outline_root + 1 + len(self._outline)))
+        self._next_number += 1 + len(items)
+        for position, ((title, page), number) in enumerate(zip(self._outline, items)):
+            links = f" /Prev {items[position - 1]} 0 R" if position else ""
+            if position < len(items) - 1:
+                links += f" /Next {items[position + 1]} 0 R"
+            self._add(
+                f"<< /Title {_pdf_text_string(title)} /Parent {outline_root} 0 R{links} "
+                f"/Dest [{page} 0 R /XYZ null null null] >>".encode(),
+                number,
+            )
+        if items:
+            self._add(
+                f"<< /Type /Outlines /First {items[0]} 0 R /Last {items[-1]} 0 R /Count {len(items)} >>".encode(),
+                outline_root,
+            )
+            outlines = f" /Outlines {outline_root} 0 R /PageMode /UseOutlines"
+        else:
+            self._add(b"<< /Type /Outlines /Count 0 >>", outline_root)
+            outlines = ""
+        self._add(f"<< /Type /Catalog /Pages {self.PAGES} 0 R{outlines} >>".encode(), self.CATALOG)
+        info = self._add(f"<< /Title {_pdf_text_string(self._title)} /Producer (generate_worksheets.py) >>".encode())
+
+        xref = self._position
+        size = self._next_number
+        entries = "".join(f"{self._offsets[number]:010d} 00000 n \n" for number in range(1, size))
+        self._emit(
+            f"xref\n0 {size}\n0000000000 65535 f \n{entries}"
+            f"trailer\n<< /Size {size} /Root {self.CATALOG} 0 R /Info {info} 0 R >>\nstartxref\n{xref}\n%%EOF\n".encode()
+        )
+
+
+def build_pdf(title: str, pages: PdfPages) -> bytes:
+    buffer = io.BytesIO()
+    writer = PdfDocumentWriter(buffer, title)
+    writer.write_page(title, pages)
+    writer.close()
+    return buffer.getvalue()
+
+
+def write_pdf_file(path: Path, title: str, pages: PdfPages) -> str:
+    data = build_pdf(title, pages)
+    path.write_bytes(data)
+    if PROFILE is not None:
+        PROFILE.add_file(path.name, len(data))
+    return hashlib.sha256(data).hexdigest()
+
+
+def worksheet_titles(index: int) -> Tuple[str, str]:
+    return f"Arbeitsblatt {index + 1}", f"Arbeitsblatt {index + 1} – Lösung"
+
+
+def generate_sheet_tasks(
+    cfg: Config, index: int, unique: Optional[UniqueItemIndex] = None
+) -> List[Tuple[str, TaskData]]:
+    if unique is None and uses_batch_uniqueness(cfg.worksheet.plans):
+        unique = UniqueItemIndex()
+    if unique is not None:
+        unique.start_sheet(cfg, index)
+    return generate_tasks(cfg.worksheet.plans, sheet_rngs(cfg, index), unique)
 
+
+def render_single_worksheet(
+    cfg: Config, index: int, out: Optional[VariantWriter] = None, unique: Optional[UniqueItemIndex] = None
+) -> VariantWriter:
+    tasks_data = generate_sheet_tasks(cfg, index, unique)
+    out = out if out is not None else VariantWriter()
+    render_worksheet_body(cfg.worksheet.header_left_label, cfg.worksheet.header_right_label, tasks_data, out)
+    return out
+
+
+def generate_single_worksheet(
+    cfg: Config, index: int, unique: Optional[UniqueItemIndex] = None
+) -> Tuple[str, str, str, str]:
+    worksheet_body, solution_body = render_single_worksheet(cfg, index, unique=unique).getvalues()
+    svg_sprites = uses_svg_sprites(cfg.worksheet.plans)
+    styles = document_styles(cfg.output)
+    worksheet_title, solution_title = worksheet_titles(index)
+    worksheet_html = build_html(worksheet_title, worksheet_body, svg_sprites, styles)
+    solution_html = build_html(solution_title, solution_body, svg_sprites, styles)
     return worksheet_html, solution_html, worksheet_body, solution_body
 
 
-def write_files(cfg: Config, index: int, worksheet_html: str, solution_html: str) -> None:
+def worksheet_paths(cfg: Config, index: int) -> Tuple[Path, Path]:
+    suffix = f".{cfg.output.backend}"
+    worksheet_path = cfg.output.out_dir / f"{cfg.output.file_prefix}_{index + 1:03d}{suffix}"
+    solution_path = cfg.output.out_dir / f"{cfg.output.file_prefix}_{index + 1:03d}_loesung{suffix}"
+    return worksheet_path, solution_path
+
+
+def combined_document_path(cfg: Config) -> Path:
+    return cfg.output.out_dir / f"{cfg.output.file_prefix}_gesamt.{cfg.output.backend}"
+
+
+def write_files(cfg: Config, index: int, worksheet_body, solution_body) -> Dict[str, str]:
+    # bodies are markup strings for the html backend and PdfPages for the pdf backend
     ensure_output_dir(cfg.output.out_dir)
-    worksheet_path = cfg.output.out_dir / f"{cfg.output.file_prefix}_{index + 1:03d}.html"
-    solution_path = cfg.output.out_dir / f"{cfg.output.file_prefix}_{index + 1:03d}_loesung.html"
-    worksheet_path.write_text(worksheet_html, encoding="utf-8")
-    solution_path.write_text(solution_html, encoding="utf-8")
+    svg_sprites = uses_svg_sprites(cfg.worksheet.plans)
+    styles = document_styles(cfg.output)
+    digests = {}
+    for path, title, body in zip(worksheet_paths(cfg, index), worksheet_titles(index), (worksheet_body, solution_body)):
+        if cfg.output.backend == "pdf":
+            digests[path.name] = write_pdf_file(path, title, body)
+        else:
+            digests[path.name] = write_html_file(path, title, body, svg_sprites, styles)
+    return digests
+
+
+def generate_worksheet_bodies(cfg: Config, index: int, unique: Optional[UniqueItemIndex] = None) -> Tuple:
+    # markup strings for the html backend, PdfPages for the pdf backend
+    if cfg.output.backend == "pdf":
+        tasks_data = generate_sheet_tasks(cfg, index, unique)
+        return render_pdf_sheet(cfg.worksheet.header_left_label, cfg.worksheet.header_right_label, tasks_data)
+    return render_single_worksheet(cfg, index, unique=unique).getvalues()
+
+
+def generate_and_write_worksheet(cfg: Config, index: int, unique: Optional[UniqueItemIndex] = None) -> Tuple:
+    # the page bodies are kept for the combined document, the files are streamed from them;
+    # in zip mode the parent process writes them into the archive instead
+    worksheet_body, solution_body = generate_worksheet_bodies(cfg, index, unique)
+    outputs = write_files(cfg, index, worksheet_body, solution_body) if cfg.output.format == "files" else {}
+    return worksheet_body, solution_body, outputs
+
+
+def generate_and_write_sheets(
+    cfg: Config, indices: Iterable[int], write_threads: int = WRITE_THREADS, unique: Optional[UniqueItemIndex] = None
+) -> Iterator[Tuple[int, object, object, Dict[str, str]]]:
+    # the next sheet is generated while earlier ones are written by a WriteQueue; sheets
+    # come out in order once their files are on disk, so the manifest never records a
+    # file that failed to write
+    if cfg.output.format != "files" or write_threads < 1:
+        for i in indices:
+            yield (i, *generate_and_write_worksheet(cfg, i, unique))
+        return
+    with WriteQueue(write_threads) as writer:
+        pending: Deque[Tuple[int, object, object, Future]] = deque()
+        for i in indices:
+            worksheet_body, solution_body = generate_worksheet_bodies(cfg, i, unique)
+            written = writer.submit(write_files, cfg, i, worksheet_body, solution_body)
+            pending.append((i, worksheet_body, solution_body, written))
+            while pending and pending[0][3].done():
+                done, worksheet_body, solution_body, written = pending.popleft()
+                yield done, worksheet_body, solution_body, written.result()
+        while pending:
+            done, worksheet_body, solution_body, written = pending.popleft()
+            yield done, worksheet_body, solution_body, written.result()
+
+
+# the configs of the SheetPool that started this worker process, set once by its initializer
+_worker_configs: Tuple[Config, ...] = ()
+
+
+def _init_worker(configs: Tuple[Config, ...]) -> None:
+    global _worker_configs
+    _worker_configs = configs
+
+
+def generate_and_write_chunk(
+    config: int, indices: Sequence[int], profile: bool = False, write_threads: int = WRITE_THREADS
+) -> Tuple[List[Tuple[str, str, Dict[str, str]]], Optional[Dict]]:
+    # runs in a worker process on the pool's config at position `config`; its profile is
+    # sent back to be merged by the parent
+    global PROFILE
+    PROFILE = Profiler() if profile else None
+    results = [result[1:] for result in generate_and_write_sheets(_worker_configs[config], indices, write_threads)]
+    snapshot = PROFILE.snapshot() if PROFILE is not None else None
+    PROFILE = None
+    return results, snapshot
+
+
+def uses_worker_processes(cfg: Config, jobs: int, sheet_count: int) -> bool:
+    # batch-wide uniqueness makes every sheet depend on the ones before it
+    return jobs > 1 and sheet_count > 1 and not uses_batch_uniqueness(cfg.worksheet.plans)
+
+
+class SheetPool:
+    # worker processes for the sheets of one or more configs. The initializer hands every
+    # worker all configs once, so a chunk only names its config and sheets. Chunks are
+    # submitted in build order across configs within a bounded window: while the parent
+    # writes the last pages of one config, the workers already draw the next one.
+    # With prefetch, every sheet of every config is scheduled up front; otherwise
+    # (incremental builds) a config's sheets are known once its build asks for them
+    def __init__(
+        self, configs: Sequence[Config], jobs: int, write_threads: int = WRITE_THREADS, prefetch: bool = True
+    ) -> None:
+        self.configs = tuple(configs)
+        self.jobs = jobs
+        self.write_threads = write_threads
+        self._executor = ProcessPoolExecutor(max_workers=jobs, initializer=_init_worker, initargs=(self.configs,))
+        self._chunks: List[Optional[Iterator[Sequence[int]]]] = [
+            self._split(cfg, range(cfg.worksheet_count)) if prefetch else None for cfg in self.configs
+        ]
+        self._pending: List[Deque[Tuple[Sequence[int], Future]]] = [deque() for _ in self.configs]
+        self._next = 0
+        self._in_flight = 0
+
+    def __enter__(self) -> "SheetPool":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self._executor.shutdown(cancel_futures=True)
+
+    def _split(self, cfg: Config, indices: Sequence[int]) -> Iterator[Sequence[int]]:
+        if not uses_worker_processes(cfg, self.jobs, len(indices)):
+            return iter(())
+        chunksize = max(1, min(64, len(indices) // (min(self.jobs, len(indices)) * 4)))
+        return (indices[start : start + chunksize] for start in range(0, len(indices), chunksize))
+
+    def _fill(self) -> None:
+        # only a bounded window of chunks is in flight, so finished pages never pile up
+        while self._in_flight < self.jobs * 2 and self._next < len(self.configs):
+            chunks = self._chunks[self._next]
+            if chunks is None:
+                return
+            chunk = next(chunks, None)
+            if chunk is None:
+                self._next += 1
+                continue
+            future = self._executor.submit(
+                generate_and_write_chunk, self._next, chunk, PROFILE is not None, self.write_threads
+            )
+            self._pending[self._next].append((chunk, future))
+            self._in_flight += 1
+
+    def results(self, cfg: Config, indices: Sequence[int]) -> Iterator[Tuple[int, str, str, Dict[str, str]]]:
+        position = next(position for position, known in enumerate(self.configs) if known is cfg)
+        if self._chunks[position] is None:
+            self._chunks[position] = self._split(cfg, indices)
+        # configs are built in order; earlier ones that never asked for sheets have none
+        for earlier in range(position):
+            if self._chunks[earlier] is None:
+                self._chunks[earlier] = iter(())
+        pending = self._pending[position]
+        self._fill()
+        while pending:
+            chunk, future = pending.popleft()
+            self._in_flight -= 1
+            results, snapshot = future.result()
+            if snapshot is not None and PROFILE is not None:
+                PROFILE.merge(snapshot)
+            self._fill()
+            for i, result in zip(chunk, results):
+                yield (i, *result)
+
+
+def iter_worksheets(
+    cfg: Config,
+    jobs: int = 1,
+    indices: Optional[Sequence[int]] = None,
+    write_threads: int = WRITE_THREADS,
+    pool: Optional[SheetPool] = None,
+) -> Iterator[Tuple[int, str, str, Dict[str, str]]]:
+    # every sheet has its own seed, so sheets can be generated in any process;
+    # chunks are consumed in submission order, keeping the combined document stable.
+    # A multi-config run passes one SheetPool for all configs
+    if indices is None:
+        indices = range(cfg.worksheet_count)
+    if not uses_worker_processes(cfg, jobs, len(indices)):
+        unique = UniqueItemIndex() if uses_batch_uniqueness(cfg.worksheet.plans) else None
+        yield from generate_and_write_sheets(cfg, indices, write_threads, unique)
+        return
+    with nullcontext(pool) if pool is not None else SheetPool([cfg], min(jobs, len(indices)), write_threads) as sheets:
+        yield from sheets.results(cfg, indices)
+
+
+# ---------- Incremental builds ----------
+
+MANIFEST_FORMAT = 1
+MANIFEST_SAVE_INTERVAL = 50
+
+
+@lru_cache(maxsize=None)
+def generator_version() -> str:
+    return hashlib.sha256(Path(__file__).read_bytes()).hexdigest()
+
+
+def _hash_json(value) -> str:
+    # settings JSON cannot encode (e.g. YAML dates) are hashed by their repr
+    data = json.dumps(value, sort_keys=True, ensure_ascii=False, default=repr)
+    return hashlib.sha256(data.encode("utf-8")).hexdigest()
+
+
+def sheet_input_hash(cfg: Config, index: int) -> str:
+    return _hash_json({
+        "generator": generator_version(),
+        "seed": cfg.base_seed + index,
+        "random_backend": cfg.random_backend,
+        "random_streams": cfg.random_streams,
+        "index": index,
+        "file_prefix": cfg.output.file_prefix,
+        "stylesheet": cfg.output.stylesheet,
+        "header_left_label": cfg.worksheet.header_left_label,
+        "header_right_label": cfg.worksheet.header_right_label,
+        "tasks": cfg.worksheet.tasks,
+    })
+
+
+def file_digest(path: Path) -> Optional[str]:
+    digest = hashlib.sha256()
+    try:
+        with path.open("rb") as f:
+            for block in iter(partial(f.read, 1 << 16), b""):
+                digest.update(block)
+    except FileNotFoundError:
+        return None
+    return digest.hexdigest()
+
+
+def extract_worksheet_body(html: str, title: str, styles: str, svg_sprites: bool) -> Optional[str]:
+    # inverse of build_html for a file this generator wrote
+    marker = "\0"
+    prefix, _, suffix = build_html(title, marker, svg_sprites=svg_sprites, styles=styles).partition(marker)
+    if not html.startswith(prefix) or not html.endswith(suffix) or len(html) < len(prefix) + len(suffix):
+        return None
+    return html[len(prefix) : len(html) - len(suffix)]
+
+
+class BuildManifest:
+    def __init__(self, path: Path, entries: Dict[str, Dict]) -> None:
+        self.path = path
+        self.entries = entries
+        self._unsaved = 0
+
+    @classmethod
+    def load(cls, path: Path) -> "BuildManifest":
+        try:
+            raw = json.loads(path.read_text(encoding="utf-8"))
+        except (FileNotFoundError, ValueError):
+            raw = {}
+        if raw.get("format") != MANIFEST_FORMAT:
+            raw = {}
+        return cls(path, dict(raw.get("entries", {})))
+
+    def is_fresh(self, key: str, inputs: str, out_dir: Path) -> bool:
+        entry = self.entries.get(key)
+        if not entry or entry.get("inputs") != inputs:
+            return False
+        return all(file_digest(out_dir / name) == digest for name, digest in entry.get("outputs", {}).items())
+
+    def record(self, key: str, inputs: str, outputs: Dict[str, str]) -> None:
+        self.entries[key] = {"inputs": inputs, "outputs": outputs}
+        self._unsaved += 1
+        # saving regularly lets an interrupted batch resume where it stopped
+        if self._unsaved >= MANIFEST_SAVE_INTERVAL:
+            self.save()
+
+    def discard(self, key: str) -> None:
+        self.entries.pop(key, None)
+
+    def save(self) -> None:
+        tmp_path = self.path.with_name(self.path.name + ".tmp")
+        tmp_path.write_text(
+            json.dumps({"format": MANIFEST_FORMAT, "entries": self.entries}, indent=2, sort_keys=True),
+            encoding="utf-8",
+        )
+        os.replace(tmp_path, self.path)
+        self._unsaved = 0
+
+
+def manifest_path(cfg: Config) -> Path:
+    return cfg.output.out_dir / f"{cfg.output.file_prefix}_manifest.json"
+
+
+def _read_worksheet_bodies(cfg: Config, index: int) -> Optional[Tuple[str, str]]:
+    styles = document_styles(cfg.output)
+    svg_sprites = uses_svg_sprites(cfg.worksheet.plans)
+    bodies = []
+    for path, title in zip(worksheet_paths(cfg, index), worksheet_titles(index)):
+        body = extract_worksheet_body(path.read_bytes().decode("utf-8"), title, styles, svg_sprites)
+        if body is None:
+            return None
+        bodies.append(body)
+    return bodies[0], bodies[1]
+
+
+def iter_incremental_worksheets(
+    cfg: Config,
+    jobs: int,
+    manifest: BuildManifest,
+    sheet_inputs: List[str],
+    stale: List[int],
+    write_threads: int = WRITE_THREADS,
+    pool: Optional[SheetPool] = None,
+) -> Iterator[Tuple[int, str, str]]:
+    # regenerate only stale sheets and read the page bodies of the others back from disk
+    generated = iter_worksheets(cfg, jobs, stale, write_threads, pool)
+    stale_set = set(stale)
+    for i in range(cfg.worksheet_count):
+        if i in stale_set:
+            _, worksheet_body, solution_body, outputs = next(generated)
+        else:
+            bodies = _read_worksheet_bodies(cfg, i)
+            if bodies is not None:
+                yield i, bodies[0], bodies[1]
+                continue
+            # the file does not have the layout build_html produces, regenerate it in place
+            worksheet_body, solution_body, outputs = generate_and_write_worksheet(cfg, i)
+        manifest.record(f"sheet:{i}", sheet_inputs[i], outputs)
+        yield i, worksheet_body, solution_body
+
+
+def index_page(cfg: Config, worksheet_href: Callable[[int], str], solution_href: Callable[[int], str]) -> str:
+    links = "\n".join(
+        f"<li><a href='{worksheet_href(i)}'>Arbeitsblatt {i + 1}</a> – <a href='{solution_href(i)}'>Lösung</a></li>"
+        for i in range(cfg.worksheet_count)
+    )
+    # links the shared stylesheet instead of inlining it when output.stylesheet is external
+    return build_html(
+        f"{cfg.output.file_prefix} – Übersicht", f"<ul>\n{links}\n</ul>", styles=document_styles(cfg.output)
+    )
+
+
+def archive_path(cfg: Config) -> Path:
+    return cfg.output.out_dir / f"{cfg.output.file_prefix}.zip"
+
+
+def write_combined_document(
+    cfg: Config, path: Path, worksheets: Iterable[Tuple[int, object, object]], write_threads: int = WRITE_THREADS
+) -> None:
+    # worksheet and solution pages of every sheet, in order, as one document; with
+    # write threads the disk writes run behind the generation of the next pages
+    title = f"{cfg.output.file_prefix} – Gesamtpaket"
+    if cfg.output.backend == "pdf":
+        stream = path.open("wb")
+    else:
+        stream = path.open("w", encoding="utf-8", newline="")
+    with stream, (QueuedStream(stream) if write_threads > 0 else nullcontext(stream)) as target:
+        if cfg.output.backend == "pdf":
+            combined = PdfDocumentWriter(target, title)
+        else:
+            combined = CombinedDocumentWriter(
+                target,
+                title=title,
+                styles=document_styles(cfg.output),
+                svg_sprites=uses_svg_sprites(cfg.worksheet.plans),
+            )
+        for i, worksheet_body, solution_body in worksheets:
+            worksheet_title, solution_title = worksheet_titles(i)
+            combined.write_page(worksheet_title, worksheet_body)
+            combined.write_page(solution_title, solution_body)
+        combined.close()
+
+
+def build_archive(
+    cfg: Config, jobs: int = 1, write_threads: int = WRITE_THREADS, pool: Optional[SheetPool] = None
+) -> int:
+    # layout: index.html, the stylesheet (external mode), worksheet and solution of
+    # every sheet in order, then the combined document, all under the usual file names
+    ensure_output_dir(cfg.output.out_dir)
+    path = archive_path(cfg)
+    tmp_path = path.with_name(path.name + ".tmp")
+    # the combined document grows alongside the pages and is appended last
+    combined_path = combined_document_path(cfg)
+    combined_tmp_path = combined_path.with_name(combined_path.name + ".tmp")
+    styles = document_styles(cfg.output)
+    svg_sprites = uses_svg_sprites(cfg.worksheet.plans)
+
+    def archived(worksheets: Iterator[Tuple]) -> Iterator[Tuple[int, object, object]]:
+        for i, worksheet_body, solution_body, _ in worksheets:
+            pages = zip(worksheet_paths(cfg, i), worksheet_titles(i), (worksheet_body, solution_body))
+            for page_path, title, body in pages:
+                if cfg.output.backend == "pdf":
+                    archive.write_document(page_path.name, [build_pdf(title, body)])
+                else:
+                    head, tail = html_document_parts(title, svg_sprites, styles)
+                    archive.write_document(page_path.name, (head, body, tail))
+            yield i, worksheet_body, solution_body
+
+    archive = ArchiveWriter(tmp_path)
+    try:
+        archive.write_document(
+            "index.html",
+            [index_page(cfg, lambda i: worksheet_paths(cfg, i)[0].name, lambda i: worksheet_paths(cfg, i)[1].name)],
+        )
+        if cfg.output.stylesheet == "external" and cfg.output.backend == "html":
+            archive.write_document(STYLESHEET_NAME, [STYLESHEET_CSS])
+        if cfg.worksheet_count > 0:
+            worksheets = iter_worksheets(cfg, jobs, write_threads=write_threads, pool=pool)
+            write_combined_document(cfg, combined_tmp_path, archived(worksheets), write_threads)
+            archive.write_file(combined_path.name, combined_tmp_path)
+        archive.close()
+        os.replace(tmp_path, path)
+    finally:
+        archive.close()
+        combined_tmp_path.unlink(missing_ok=True)
+        tmp_path.unlink(missing_ok=True)
+    if PROFILE is not None:
+        PROFILE.add_file(path.name, path.stat().st_size)
+    return cfg.worksheet_count
+
+
+def check_incremental(cfg: Config) -> None:
+    if cfg.output.format != "files" or cfg.output.backend != "html":
+        raise ValueError("--incremental needs output.format files and output.backend html")
+
+
+def build_worksheets(
+    cfg: Config,
+    jobs: int = 1,
+    incremental: bool = False,
+    write_threads: int = WRITE_THREADS,
+    pool: Optional[SheetPool] = None,
+) -> int:
+    if incremental:
+        check_incremental(cfg)
+    if cfg.output.format == "zip":
+        return build_archive(cfg, jobs, write_threads, pool)
+    ensure_output_dir(cfg.output.out_dir)
+    if cfg.output.stylesheet == "external" and cfg.output.backend == "html":
+        write_stylesheet(cfg.output)
+
+    manifest = BuildManifest.load(manifest_path(cfg)) if incremental else None
+    combined_path = combined_document_path(cfg)
+    if manifest is None:
+        stale = list(range(cfg.worksheet_count))
+        generated = iter_worksheets(cfg, jobs, write_threads=write_threads, pool=pool)
+        worksheets = ((i, ws, sol) for i, ws, sol, _ in generated)
+    else:
+        sheet_inputs = [sheet_input_hash(cfg, i) for i in range(cfg.worksheet_count)]
+        stale = [
+            i
+            for i in range(cfg.worksheet_count)
+            if not manifest.is_fresh(f"sheet:{i}", sheet_inputs[i], cfg.output.out_dir)
+        ]
+        for key in list(manifest.entries):
+            if key.startswith("sheet:") and int(key.split(":", 1)[1]) >= cfg.worksheet_count:
+                manifest.discard(key)
+        combined_inputs = _hash_json(sheet_inputs)
+        if not stale and manifest.is_fresh("combined", combined_inputs, cfg.output.out_dir):
+            manifest.save()
+            return 0
+        worksheets = iter_incremental_worksheets(cfg, jobs, manifest, sheet_inputs, stale, write_threads, pool)
+
+    if cfg.worksheet_count > 0:
+        write_combined_document(cfg, combined_path, worksheets, write_threads)
+        if PROFILE is not None:
+            PROFILE.add_file(combined_path.name, combined_path.stat().st_size)
+
+    if manifest is not None:
+        if cfg.worksheet_count > 0:
+            manifest.record("combined", combined_inputs, {combined_path.name: file_digest(combined_path)})
+        manifest.save()
+    return len(stale)
+
+
+# ---------- On-demand server ----------
+
+class PageCache:
+    # bounded LRU of rendered (worksheet, solution) documents, shared by the request threads
+    def __init__(self, max_entries: int) -> None:
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[Tuple[str, int, int], Tuple[str, str]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: Tuple[str, int, int]) -> Optional[Tuple[str, str]]:
+        with self._lock:
+            pages = self._entries.get(key)
+            if pages is not None:
+                self._entries.move_to_end(key)
+            return pages
+
+    def put(self, key: Tuple[str, int, int], pages: Tuple[str, str]) -> None:
+        with self._lock:
+            self._entries[key] = pages
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+
+def config_hash(cfg: Config) -> str:
+    return _hash_json({
+        "stylesheet": cfg.output.stylesheet,
+        "header_left_label": cfg.worksheet.header_left_label,
+        "header_right_label": cfg.worksheet.header_right_label,
+        "tasks": cfg.worksheet.tasks,
+    })
+
+
+SERVE_UNIQUE_SEEDS = 8
+
+
+class WorksheetServer:
+    def __init__(self, cfg: Config, cache_size: int = 256) -> None:
+        self.cfg = cfg
+        self.config_hash = config_hash(cfg)
+        self.cache = PageCache(cache_size)
+        # with `unique: batch` a sheet depends on all earlier ones; the index of
+        # issued items is kept per seed (for the SERVE_UNIQUE_SEEDS most recent
+        # ones), so a request only replays the sheets since its last position
+        # or checkpoint
+        self.batch_unique = uses_batch_uniqueness(cfg.worksheet.plans)
+        self.unique: "OrderedDict[int, UniqueItemIndex]" = OrderedDict()
+        self._unique_lock = threading.Lock()
+
+    def _generate(self, cfg: Config, index: int) -> Tuple[str, str, str, str]:
+        if not self.batch_unique:
+            return generate_single_worksheet(cfg, index)
+        with self._unique_lock:
+            unique = self.unique.pop(cfg.base_seed, None) or UniqueItemIndex(checkpoints=True)
+            self.unique[cfg.base_seed] = unique
+            while len(self.unique) > SERVE_UNIQUE_SEEDS:
+                self.unique.popitem(last=False)
+            return generate_single_worksheet(cfg, index, unique)
+
+    def pages(self, seed: int, index: int) -> Tuple[str, str]:
+        key = (self.config_hash, seed, index)
+        pages = self.cache.get(key)
+        if pages is None:
+            cfg = self.cfg if seed == self.cfg.base_seed else replace(self.cfg, base_seed=seed)
+            worksheet_html, solution_html, _, _ = self._generate(cfg, index)
+            pages = (worksheet_html, solution_html)
+            self.cache.put(key, pages)
+        return pages
+
+    def index_page(self) -> str:
+        return index_page(self.cfg, lambda i: f"/{i + 1}", lambda i: f"/{i + 1}/loesung")
+
+    def resolve(self, raw_path: str) -> Tuple[int, str, str]:
+        # routes: /, /<k>, /<k>/loesung (k is 1-based like the file names), optional ?seed=N
+        url = urlsplit(raw_path)
+        query = parse_qs(url.query)
+        parts = [part for part in url.path.split("/") if part]
+        if not parts:
+            return 200, "text/html; charset=utf-8", self.index_page()
+        if parts and parts[-1] == STYLESHEET_NAME:
+            # pages link the stylesheet relatively, so /<k>/loesung asks for /<k>/<name>
+            return 200, "text/css; charset=utf-8", STYLESHEET_CSS
+        if len(parts) > 2 or not parts[0].isdigit() or int(parts[0]) < 1 or parts[1:] not in ([], ["loesung"]):
+            return 404, "text/plain; charset=utf-8", "Not found"
+        try:
+            seed = int(query.get("seed", [self.cfg.base_seed])[0])
+        except ValueError:
+            return 400, "text/plain; charset=utf-8", "seed must be an integer"
+        worksheet_html, solution_html = self.pages(seed, int(parts[0]) - 1)
+        return 200, "text/html; charset=utf-8", solution_html if parts[1:] else worksheet_html
+
+
+def serve(cfg: Config, host: str, port: int, cache_size: int) -> None:
+    app = WorksheetServer(cfg, cache_size)
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self) -> None:
+            try:
+                status, content_type, text = app.resolve(self.path)
+            except ValueError as exc:
+                status, content_type, text = 500, "text/plain; charset=utf-8", str(exc)
+            data = text.encode("utf-8")
+            self.send_response(status)
+            self.send_header("Content-Type", content_type)
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+    server = ThreadingHTTPServer((host, port), Handler)
+    print(f"Serving worksheets for {cfg.output.file_prefix} on http://{host}:{server.server_port}/")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+def resolve_jobs(value: int) -> int:
+    if value == 0:
+        return os.cpu_count() or 1
+    return value
 
 
 def parse_args() -> argparse.Namespace:
     parser = argparse.ArgumentParser(description="Generate printable math worksheets")
-    parser.add_argument("--config", type=Path, required=True, help="Path to config.yaml")
-    return parser.parse_args()
+    parser.add_argument(
+        "command",
+        nargs="?",
+        choices=["build", "serve"],
+        default="build",
+        help="build writes the whole batch (default), serve renders single sheets on request",
+    )
+    parser.add_argument(
+        "--config",
+        type=Path,
+        nargs="+",
+        required=True,
+        help="Path to config.yaml; several files or directories of *.yaml files are built in one run",
+    )
+    parser.add_argument(
+        "--jobs",
+        "-j",
+        type=int,
+        default=1,
+        help="Number of worker processes (default: 1, 0 = one per CPU core)",
+    )
+    parser.add_argument(
+        "--write-threads",
+        type=int,
+        default=WRITE_THREADS,
+        help=f"Threads per process that write finished files in the background (default: {WRITE_THREADS}, "
+        "0 = write in the generating thread)",
+    )
+    parser.add_argument(
+        "--incremental",
+        action="store_true",
+        help="Only rewrite sheets whose inputs changed since the last run (tracked in <file_prefix>_manifest.json)",
+    )
+    parser.add_argument("--host", default="127.0.0.1", help="Address to listen on in serve mode")
+    parser.add_argument("--port", type=int, default=8000, help="Port to listen on in serve mode")
+    parser.add_argument(
+        "--cache-size", type=int, default=256, help="Number of rendered sheets kept in memory in serve mode"
+    )
+    parser.add_argument(
+        "--profile",
+        action="store_true",
+        help="Print per-task timings, sampling retry counters and bytes written per file",
+    )
+    parser.add_argument(
+        "--profile-report", type=Path, help="Also write the profile as JSON to this path (implies --profile)"
+    )
+    args = parser.parse_args()
+    if args.jobs < 0:
+        parser.error("--jobs must be zero or a positive number")
+    if args.write_threads < 0:
+        parser.error("--write-threads must be zero or a positive number")
+    if args.cache_size < 1:
+        parser.error("--cache-size must be a positive number")
+    if args.command == "serve" and (len(args.config) > 1 or args.config[0].is_dir()):
+        parser.error("serve takes a single config file")
+    return args
 
 
 def main() -> None:
+    global PROFILE
     args = parse_args()
-    cfg = load_config(args.config)
-    combined_pages: List[Tuple[str, str]] = []
-    for i in range(cfg.worksheet_count):
-        worksheet_html, solution_html, worksheet_body, solution_body = generate_single_worksheet(cfg, i)
-        write_files(cfg, i, worksheet_html, solution_html)
-        combined_pages.append((f"Arbeitsblatt {i + 1}", worksheet_body))
-        combined_pages.append((f"Arbeitsblatt {i + 1} – Lösung", solution_body))
-
-    if combined_pages:
-        combined_html = build_combined_document(
-            title=f"{cfg.output.file_prefix} – Gesamtpaket",
-            pages=combined_pages,
-        )
-        combined_path = cfg.output.out_dir / f"{cfg.output.file_prefix}_gesamt.html"
-        ensure_output_dir(cfg.output.out_dir)
-        combined_path.write_text(combined_html, encoding="utf-8")
-
-    print(f"Generated {cfg.worksheet_count} worksheets in {cfg.output.out_dir}")
+    if args.command == "serve":
+        serve(load_config(args.config[0]), args.host, args.port, args.cache_size)
+        return
+    # all configs are loaded and checked before the first sheet is written
+    configs = load_configs(args.config)
+    if args.incremental:
+        for path, cfg in configs:
+            try:
+                check_incremental(cfg)
+            except ValueError as exc:
+                raise ValueError(f"{path}: {exc}") from None
+
+    if args.profile or args.profile_report:
+        PROFILE = Profiler()
+    started = time.perf_counter()
+    jobs = resolve_jobs(args.jobs)
+    # one process pool serves every config, so its workers and their caches stay warm and
+    # the sheets of the next config are drawn while the current one is finished
+    shared_pool = len(configs) > 1 and jobs > 1
+    sheet_pool = (
+        SheetPool([cfg for _, cfg in configs], jobs, args.write_threads, prefetch=not args.incremental)
+        if shared_pool
+        else nullcontext()
+    )
+    with sheet_pool as pool:
+        for path, cfg in configs:
+            written = build_worksheets(
+                cfg, jobs, incremental=args.incremental, write_threads=args.write_threads, pool=pool
+            )
+            source = f" ({path})" if len(configs) > 1 else ""
+            if args.incremental:
+                print(f"Regenerated {written} of {cfg.worksheet_count} worksheets in {cfg.output.out_dir}{source}")
+            elif cfg.output.format == "zip":
+                print(f"Generated {cfg.worksheet_count} worksheets in {archive_path(cfg)}{source}")
+            else:
+                print(f"Generated {cfg.worksheet_count} worksheets in {cfg.output.out_dir}{source}")
+
+    if PROFILE is not None:
+        PROFILE.add_time("build", time.perf_counter() - started)
+        PROFILE.print_summary()
+        if args.profile_report:
+            args.profile_report.write_text(json.dumps(PROFILE.report(), indent=2), encoding="utf-8")
 
 
 if __name__ == "__main__":
@@ -0,0 +1,692 @@
+import dataclasses
+import importlib.util
+import io
+import json
+import pickle
+import re
+import subprocess
+import sys
+import zipfile
+import zlib
+from pathlib import Path
+from urllib.parse import urljoin, urlsplit
+
+import pytest
+
+ROOT = Path(__file__).resolve().parents[1]
+
+
+def _load_script(name: str):
+    # generate_worksheets.py and benchmark_tasks.py are scripts, not an installed package
+    spec = importlib.util.spec_from_file_location(name, ROOT / f"{name}.py")
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[spec.name] = module
+    spec.loader.exec_module(module)
+    return module
+
+
+gw = sys.modules.get("generate_worksheets") or _load_script("generate_worksheets")
+benchmark = sys.modules.get("benchmark_tasks") or _load_script("benchmark_tasks")
+
+
+def write_config(directory: Path, tasks, name: str = "config.yaml", **root):
+    # JSON is valid YAML, so the config files need no YAML writer
+    out_dir = directory / root.pop("out_dir", "out")
+    output = {"out_dir": str(out_dir), "file_prefix": "blatt", **root.pop("output", {})}
+    data = {"base_seed": 1234, "worksheet_count": 6, "output": output, "worksheet": {"tasks": tasks}, **root}
+    path = directory / name
+    path.write_text(json.dumps(data), encoding="utf-8")
+    return gw.load_config(path)
+
+
+MIXED_TASKS = [
+    {"type": "number_dictation", "box_count": 4, "show_helper_numbers": True},
+    {"type": "compare_numbers", "item_count": 8, "min_value": 0, "max_value": 100},
+    {"type": "pre_succ_table", "row_count": 3, "min_value": 0, "max_value": 100, "given_field": "mixed"},
+    {"type": "arithmetic_list", "item_count": 6, "operations": ["+", "-"], "max_value": 100},
+    {"type": "number_word_table", "row_count": 3, "min_value": 11, "max_value": 99, "given_columns": ["word"]},
+    {"type": "ordering", "set_size": 5, "min_value": 0, "max_value": 20},
+    {"type": "number_line", "start": 0, "end": 100, "major_tick_interval": 10, "value_count": 4},
+]
+
+
+OPERATION_TABLE = {"type": "operation_table", "result_range": {"min": 0, "max": 100}}
+
+
+def output_files(directory: Path):
+    return {path.name: path.read_bytes() for path in sorted(directory.iterdir()) if path.is_file()}
+
+
+def test_unique_batch_issues_no_item_twice(tmp_path):
+    tasks = [
+        {"type": "compare_numbers", "item_count": 10, "min_value": 0, "max_value": 9, "unique": "batch"},
+        {"type": "arithmetic_list", "item_count": 10, "max_value": 30, "max_second_operand": 9, "unique": "batch"},
+        {"type": "ordering", "set_size": 3, "min_value": 0, "max_value": 9, "unique": "batch"},
+    ]
+    cfg = write_config(tmp_path, tasks, worksheet_count=8)
+    unique = gw.UniqueItemIndex()
+    seen = {"compare_numbers": [], "arithmetic_list": [], "ordering": []}
+    for index in range(cfg.worksheet_count):
+        for task_type, data in gw.generate_sheet_tasks(cfg, index, unique):
+            if task_type == "ordering":
+                seen[task_type].append(tuple(sorted(data.numbers)))
+            else:
+                seen[task_type].extend(tuple(item) for item in data.items())
+    for items in seen.values():
+        assert len(items) == len(set(items))
+
+
+def test_unique_compare_without_equal_items(tmp_path):
+    # 10 * 9 unequal pairs exist; 9 sheets of 10 use every one, none may be "="
+    task = {"type": "compare_numbers", "item_count": 10, "min_value": 0, "max_value": 9, "equal_probability": 0}
+    cfg = write_config(tmp_path, [{**task, "unique": "batch"}], worksheet_count=9)
+    unique = gw.UniqueItemIndex()
+    items = []
+    for index in range(cfg.worksheet_count):
+        [(_, data)] = gw.generate_sheet_tasks(cfg, index, unique)
+        items.extend(data.items())
+    assert len(set(items)) == 90
+    assert all(relation != "=" for _, _, relation in items)
+
+
+def test_incremental_rerun_regenerates_nothing(tmp_path):
+    cfg = write_config(tmp_path, MIXED_TASKS)
+    assert gw.build_worksheets(cfg, incremental=True) == cfg.worksheet_count
+    assert gw.build_worksheets(cfg, incremental=True) == 0
+    (cfg.output.out_dir / "blatt_003_loesung.html").unlink()
+    assert gw.build_worksheets(cfg, incremental=True) == 1
+
+
+def test_incremental_build_accepts_yaml_dates(tmp_path):
+    path = tmp_path / "config.yaml"
+    path.write_text(
+        f"base_seed: 7\nworksheet_count: 2\noutput:\n  out_dir: {tmp_path / 'out'}\n"
+        "worksheet:\n  tasks:\n  - type: compare_numbers\n    title: 2024-05-01\n    item_count: 4\n",
+        encoding="utf-8",
+    )
+    cfg = gw.load_config(path)
+    assert cfg.worksheet.plans[0].title == "2024-05-01"
+    assert gw.build_worksheets(cfg, incremental=True) == 2
+    assert gw.build_worksheets(cfg, incremental=True) == 0
+
+
+def test_serve_pages_match_build_and_find_their_stylesheet(tmp_path):
+    cfg = write_config(tmp_path, MIXED_TASKS, worksheet_count=3, output={"stylesheet": "external"})
+    gw.build_worksheets(cfg)
+    server = gw.WorksheetServer(cfg, cache_size=2)
+    for route, name in (("/2", "blatt_002.html"), ("/2/loesung", "blatt_002_loesung.html")):
+        status, _, page = server.resolve(route)
+        assert status == 200
+        assert page == (cfg.output.out_dir / name).read_text(encoding="utf-8")
+        # the browser resolves the relative href against the page's path
+        href = re.search(r"<link rel='stylesheet' href='([^']+)'>", page).group(1)
+        stylesheet = urljoin(f"http://localhost{route}", href)
+        status, content_type, css = server.resolve(urlsplit(stylesheet).path)
+        assert (status, content_type, css) == (200, "text/css; charset=utf-8", gw.STYLESHEET_CSS)
+    assert server.resolve("/4/extra")[0] == 404
+
+
+def test_serve_accepts_configs_with_yaml_dates(tmp_path):
+    path = tmp_path / "config.yaml"
+    path.write_text(
+        "worksheet:\n  tasks:\n  - type: compare_numbers\n    title: 2024-05-01\n    item_count: 4\n", encoding="utf-8"
+    )
+    status, _, page = gw.WorksheetServer(gw.load_config(path)).resolve("/1")
+    assert status == 200 and "2024-05-01" in page
+
+
+def test_renderers_write_both_variants_into_sinks(tmp_path):
+    cfg = write_config(tmp_path, MIXED_TASKS)
+    tasks = gw.generate_sheet_tasks(cfg, 0)
+    worksheet_sink, solution_sink = io.StringIO(), io.StringIO()
+    gw.render_tasks(tasks, gw.VariantWriter(worksheet_sink, solution_sink))
+    buffered = gw.VariantWriter()
+    gw.render_tasks(tasks, buffered)
+    worksheet, solution = buffered.getvalues()
+    assert (worksheet_sink.getvalue(), solution_sink.getvalue()) == (worksheet, solution)
+    # answers only appear in the solution
+    compare = dict(tasks)["compare_numbers"]
+    circles = re.compile(r"<span class='compare-circle'>([^<]*)</span>")
+    assert circles.findall(worksheet) == [""] * len(compare)
+    assert "".join(circles.findall(solution)) == compare.relations
+    arithmetic = dict(tasks)["arithmetic_list"]
+    boxes = re.findall(r"= <span class='number-box'>([^<]*)</span>", solution)
+    assert [int(box) for box in boxes] == [result for *_, result in arithmetic.items()]
+    assert re.findall(r"= <span class='number-box'>([^<]*)</span>", worksheet) == [""] * len(arithmetic)
+
+
+def test_ordering_sets_are_distinct_and_in_range(tmp_path):
+    for low, high, set_size in ((0, 9, 10), (0, 20, 5), (0, 10_000, 50)):
+        task = {"type": "ordering", "set_size": set_size, "min_value": low, "max_value": high}
+        cfg = write_config(tmp_path, [task], worksheet_count=4)
+        for index in range(cfg.worksheet_count):
+            [(_, data)] = gw.generate_sheet_tasks(cfg, index)
+            assert len(set(data.numbers)) == set_size
+            assert all(low <= number <= high for number in data.numbers)
+    task = {"type": "ordering", "set_size": 11, "min_value": 0, "max_value": 9}
+    with pytest.raises(ValueError, match="set_size 11"):
+        write_config(tmp_path, [task])
+
+
+def test_profile_report_counts_fallbacks_and_files(tmp_path):
+    # sums up to 9 never cross a ten, so every item falls back to a non-crossing one
+    task = {"type": "arithmetic_list", "item_count": 5, "operations": ["+"], "max_value": 9, "cross_ten_probability": 1}
+    write_config(tmp_path, [task, MIXED_TASKS[1]], worksheet_count=3)
+    report = tmp_path / "profile.json"
+    command = [sys.executable, str(ROOT / "generate_worksheets.py"), "--config", str(tmp_path / "config.yaml")]
+    subprocess.run([*command, "--profile-report", str(report)], check=True, capture_output=True)
+    profile = json.loads(report.read_text(encoding="utf-8"))
+    assert profile["counters"]["arithmetic_list.crossing_fallbacks"] == 15
+    assert profile["timings"]["generate:arithmetic_list"]["calls"] == 3
+    assert profile["timings"]["render:compare_numbers"]["calls"] == 3
+    assert profile["files"]["bytes"] == {name: len(data) for name, data in output_files(tmp_path / "out").items()}
+
+
+@pytest.mark.parametrize(
+    "task, field",
+    [
+        ({"type": "ordering", "set_size": -1, "min_value": 0, "max_value": 10_000}, "set_size"),
+        ({"type": "number_line", "value_count": -2}, "value_count"),
+        ({"type": "number_line", "start": 0, "end": 100, "values": [5, 105]}, "values"),
+        ({"type": "compare_numbers", "columns": 0}, "columns"),
+        ({"type": "arithmetic_list", "item_count": -3}, "item_count"),
+        ({**OPERATION_TABLE, "tables": [{"row_count": 2, "col_count": 2, "given_cells": "random_99"}]}, "given_cells"),
+    ],
+)
+def test_invalid_settings_fail_when_loading(tmp_path, task, field):
+    with pytest.raises(ValueError, match=f"Task 1 \\({task['type']}\\): {field}"):
+        write_config(tmp_path, [task])
+
+
+def test_unique_sheet_rejects_more_items_than_exist(tmp_path):
+    # 0..3 holds 4 * 3 unequal pairs
+    task = {"type": "compare_numbers", "item_count": 13, "min_value": 0, "max_value": 3, "equal_probability": 0}
+    with pytest.raises(ValueError, match="item_count 13 exceeds the 12 distinct items"):
+        write_config(tmp_path, [{**task, "unique": "sheet"}])
+    with pytest.raises(ValueError, match="row_count 10 exceeds the 9 distinct items"):
+        write_config(tmp_path, [{"type": "number_word_table", "row_count": 10, "max_value": 29, "unique": "sheet"}])
+    write_config(tmp_path, [{**task, "item_count": 12, "unique": "sheet"}])
+
+
+def test_unique_exhaustion_suggests_sheet_scope_only_for_batches(tmp_path):
+    task = {"type": "compare_numbers", "item_count": 8, "min_value": 0, "max_value": 3, "equal_probability": 0}
+    cfg = write_config(tmp_path, [{**task, "unique": "batch"}], worksheet_count=2)
+    with pytest.raises(ValueError, match="use unique: sheet"):
+        gw.build_worksheets(cfg)
+    # two tasks of one sheet share its items
+    cfg = write_config(tmp_path, [{**task, "unique": "sheet"}] * 2, worksheet_count=1)
+    with pytest.raises(ValueError, match="widen the value range$"):
+        gw.build_worksheets(cfg)
+
+
+VECTOR_TASKS = {
+    "compare_numbers": {"type": "compare_numbers", "item_count": 7, "min_value": 20, "max_value": 90},
+    "pre_succ_table": {"type": "pre_succ_table", "row_count": 5, "max_value": 40, "given_field": "mixed"},
+    "arithmetic_list": {"type": "arithmetic_list", "item_count": 6, "max_value": 50, "max_second_operand": 9},
+    "number_line": {"type": "number_line", "start": 0, "end": 200, "major_tick_interval": 50, "value_count": 4},
+}
+
+
+def check_vector_data(plan, data):
+    if plan.task_type == "compare_numbers":
+        assert len(data.relations) == plan.item_count
+        for a, b, relation in data.items():
+            assert plan.min_value <= min(a, b) and max(a, b) <= plan.max_value
+            assert relation == ("<" if a < b else ">" if a > b else "=")
+    elif plan.task_type == "pre_succ_table":
+        assert len(data.middles) == plan.row_count
+        assert all(plan.min_value <= middle - 1 and middle + 1 <= plan.max_value for middle in data.middles)
+    elif plan.task_type == "arithmetic_list":
+        items = list(data.items())
+        assert len(items) == plan.item_count
+        for a, op, b, result in items:
+            assert op in plan.operations and b <= plan.max_second_operand
+            assert plan.min_value <= result <= plan.max_value and result == (a + b if op == "+" else a - b)
+    else:
+        assert len(set(data.values)) == plan.value_count and list(data.values) == sorted(data.values)
+        assert all(value in plan.possible_numbers for value in data.values)
+
+
+@pytest.mark.skipif(gw.np is None, reason="NumPy is not installed")
+@pytest.mark.parametrize("task_type", sorted(gw.VECTOR_GENERATORS))
+def test_vector_generators_are_deterministic_and_in_range(task_type):
+    plan = gw.compile_task(VECTOR_TASKS[task_type])
+    generator = gw.VECTOR_GENERATORS[task_type]
+    block = generator(plan, gw.np.random.default_rng(5), 16)
+    assert block == generator(plan, gw.np.random.default_rng(5), 16)
+    assert len(block) == 16
+    for data in block:
+        check_vector_data(plan, data)
+
+
+@pytest.mark.skipif(gw.np is None, reason="NumPy is not installed")
+def test_numpy_sheets_match_whatever_block_they_come_from(tmp_path):
+    cfg = write_config(tmp_path, list(VECTOR_TASKS.values()), worksheet_count=150, random_backend="numpy")
+    in_order = [gw.generate_sheet_tasks(cfg, index) for index in range(cfg.worksheet_count)]
+    for index in (149, 3, 70, 64, 63):
+        gw._vector_blocks.clear()
+        assert gw.generate_sheet_tasks(cfg, index) == in_order[index]
+
+
+def test_combined_document_streams_every_page_in_order(tmp_path):
+    cfg = write_config(tmp_path, MIXED_TASKS, worksheet_count=3)
+    gw.build_worksheets(cfg)
+    combined = (cfg.output.out_dir / "blatt_gesamt.html").read_text(encoding="utf-8")
+    titles = re.findall(r"<div class='page-title'>([^<]*)</div>", combined)
+    assert titles == [title for index in range(3) for title in gw.worksheet_titles(index)]
+    # a page reaches the stream as soon as it is handed over
+    stream = io.StringIO()
+    writer = gw.CombinedDocumentWriter(stream, "Gesamt")
+    writer.write_page("Blatt 1", "<p>eins</p>")
+    assert stream.getvalue().endswith("<div class='page-title'>Blatt 1</div><p>eins</p></div>")
+    writer.close()
+    assert stream.getvalue().endswith(gw.COMBINED_TEMPLATE.partition("{pages}")[2])
+
+
+@pytest.mark.parametrize(
+    "value, word",
+    [
+        (999, "neunhundertneunundneunzig"),
+        (1000, "eintausend"),
+        (1001, "eintausendeins"),
+        (1021, "eintausendeinundzwanzig"),
+        (99999, "neunundneunzigtausendneunhundertneunundneunzig"),
+        (100000, "einhunderttausend"),
+        (100001, "einhunderttausendeins"),
+        (101000, "einhunderteintausend"),
+    ],
+)
+def test_number_words_around_thousands(value, word):
+    assert gw.number_entry(value).word == word
+
+
+def test_number_word_rows_break_after_thousand(tmp_path):
+    task = {"type": "number_word_table", "row_count": 4, "min_value": 1001, "max_value": 9999, "given_columns": ["word"]}
+    cfg = write_config(tmp_path, [task], worksheet_count=1)
+    [(_, data)] = gw.generate_sheet_tasks(cfg, 0)
+    solution = gw.VariantWriter()
+    gw.render_tasks([("number_word_table", data)], solution)
+    page = solution.getvalues()[1]
+    for number in data.numbers:
+        entry = gw.number_entry(number)
+        assert entry.markup.count("<wbr>") == 1 and entry.markup in page
+
+
+def test_multi_config_run_matches_single_runs(tmp_path):
+    number_line = {"type": "number_line", "start": 0, "end": 100_000, "major_tick_interval": 10_000, "value_count": 3}
+    settings = {
+        "a": {"tasks": MIXED_TASKS, "worksheet_count": 7},
+        "b": {"tasks": [*MIXED_TASKS[:3], number_line], "worksheet_count": 9, "base_seed": 99},
+        "c": {"tasks": MIXED_TASKS, "worksheet_count": 5, "output": {"format": "zip"}},
+    }
+    (tmp_path / "configs").mkdir()
+    for name, root in settings.items():
+        root = dict(root)
+        tasks = root.pop("tasks")
+        write_config(tmp_path, tasks, name=f"configs/{name}.yaml", out_dir=f"multi_{name}", **root)
+        single = write_config(tmp_path, tasks, name=f"{name}.yaml", out_dir=f"single_{name}", **root)
+        gw.build_worksheets(single)
+    command = [sys.executable, str(ROOT / "generate_worksheets.py"), "--config", str(tmp_path / "configs")]
+    subprocess.run([*command, "-j", "3"], check=True, capture_output=True)
+    for name in settings:
+        assert output_files(tmp_path / f"multi_{name}") == output_files(tmp_path / f"single_{name}")
+
+
+def test_parallel_build_matches_serial(tmp_path):
+    serial = write_config(tmp_path, MIXED_TASKS, name="serial.yaml", out_dir="serial")
+    parallel = write_config(tmp_path, MIXED_TASKS, name="parallel.yaml", out_dir="parallel")
+    gw.build_worksheets(serial, jobs=1)
+    gw.build_worksheets(parallel, jobs=3)
+    assert output_files(serial.output.out_dir) == output_files(parallel.output.out_dir)
+
+
+def check_pdf_structure(data: bytes) -> None:
+    assert data.startswith(b"%PDF-")
+    assert data.rstrip().endswith(b"%%EOF")
+    xref_offset = int(re.search(rb"startxref\s+(\d+)\s+%%EOF\s*$", data).group(1))
+    assert data[xref_offset:].startswith(b"xref")
+    # every in-use xref entry points at the object it numbers
+    table = re.match(rb"xref\s+(\d+) (\d+)\s+", data[xref_offset:])
+    first, count = int(table.group(1)), int(table.group(2))
+    entries = re.findall(rb"(\d{10}) \d{5} ([nf])", data[xref_offset + table.end() :])[:count]
+    assert len(entries) == count
+    for number, (offset, kind) in enumerate(entries, start=first):
+        if kind == b"n":
+            assert data[int(offset) :].startswith(b"%d 0 obj" % number)
+    streams = list(re.finditer(rb"/Filter /FlateDecode /Length (\d+) >>\nstream\n", data))
+    assert streams
+    for match in streams:
+        zlib.decompress(data[match.end() : match.end() + int(match.group(1))])
+
+
+def test_pdf_backend_writes_parsable_files(tmp_path):
+    tables = [{"operation": "+", "row_count": 2, "col_count": 3}, {"operation": "-", "given_cells": "diagonal"}]
+    tasks = [*MIXED_TASKS, {**OPERATION_TABLE, "tables": tables}]
+    cfg = write_config(tmp_path, tasks, worksheet_count=2, output={"backend": "pdf"})
+    gw.build_worksheets(cfg)
+    for name in ("blatt_001.pdf", "blatt_002_loesung.pdf", "blatt_gesamt.pdf"):
+        check_pdf_structure((cfg.output.out_dir / name).read_bytes())
+    # the combined document has a worksheet and a solution page per sheet
+    combined = (cfg.output.out_dir / "blatt_gesamt.pdf").read_bytes()
+    assert len(re.findall(rb"/Type /Page\b", combined)) >= 4
+
+
+@pytest.mark.parametrize("min_value, max_value, max_second_operand", [(0, 20, 10), (0, 100, 9), (5, 60, 30)])
+def test_arithmetic_candidates_match_brute_force(min_value, max_value, max_second_operand):
+    candidates = gw.arithmetic_candidates(min_value, max_value, max_second_operand, False)
+    crosses = {"+": gw.is_crossing_ten_add, "-": gw.is_crossing_ten_subtract}
+    for op, crossing in (("+", False), ("+", True), ("-", False), ("-", True)):
+        expected = [
+            (a, b)
+            for a in range(min_value, max_value + 1)
+            for b in range(min_value, max_second_operand + 1)
+            if min_value <= (a + b if op == "+" else a - b) <= max_value and crosses[op](a, b) == crossing
+        ]
+        assert list(candidates.pairs(op, crossing)) == expected
+        assert candidates.count(op, crossing) == len(expected)
+        assert [candidates.nth(op, crossing, n) for n in range(len(expected))] == expected
+
+
+def test_arithmetic_items_cross_ten_when_asked(tmp_path):
+    task = {"type": "arithmetic_list", "item_count": 40, "max_value": 100, "cross_ten_probability": 1.0}
+    cfg = write_config(tmp_path, [task], worksheet_count=3)
+    for index in range(cfg.worksheet_count):
+        [(_, data)] = gw.generate_sheet_tasks(cfg, index)
+        for a, op, b, result in data.items():
+            assert b <= 10 and 0 <= result <= 100
+            assert (gw.is_crossing_ten_add if op == "+" else gw.is_crossing_ten_subtract)(a, b)
+
+
+@pytest.mark.parametrize("operation, row_count, col_count, min_result, max_result", [
+    ("+", 3, 4, 40, 100),
+    ("-", 4, 3, 10, 80),
+    ("+", 12, 2, 30, 60),
+    ("-", 2, 14, 0, 40),
+])
+def test_operation_table_headers_fit_result_range(operation, row_count, col_count, min_result, max_result):
+    task = {
+        "type": "operation_table",
+        "result_range": {"min": min_result, "max": max_result},
+        "tables": [{"operation": operation, "row_count": row_count, "col_count": col_count}],
+    }
+    plan = gw.compile_operation_table(task)
+    rng = gw.random.Random(7)
+    for _ in range(200):
+        [table] = gw.generate_operation_table(plan, rng).tables
+        assert len(table.row_headers) == row_count and len(table.col_headers) == col_count
+        for headers in (table.row_headers, table.col_headers):
+            assert set(headers) <= set(gw.HEADER_VALUES)
+            if len(headers) <= len(gw.HEADER_VALUES):
+                assert len(set(headers)) == len(headers)
+        for row_header in table.row_headers:
+            assert all(min_result <= result <= max_result for result in table.row_results(row_header))
+
+
+def test_operation_table_rejects_infeasible_result_range():
+    task = {
+        "type": "operation_table",
+        "result_range": {"min": 0, "max": 15},
+        "tables": [{"operation": "+", "row_count": 2, "col_count": 2}],
+    }
+    with pytest.raises(ValueError, match="Unable to generate headers"):
+        gw.compile_operation_table(task)
+
+
+def test_svg_sprites_define_symbols_once_and_reference_them(tmp_path):
+    task = {"type": "number_word_table", "row_count": 6, "min_value": 21, "max_value": 99, "given_columns": ["dice"]}
+    plain = write_config(tmp_path, [task], name="plain.yaml")
+    sprites = write_config(tmp_path, [{**task, "svg_sprites": True}], name="sprites.yaml")
+    for index in range(plain.worksheet_count):
+        plain_pages = gw.generate_single_worksheet(plain, index)[:2]
+        sprite_pages = gw.generate_single_worksheet(sprites, index)[:2]
+        for plain_html, sprite_html in zip(plain_pages, sprite_pages):
+            assert "<symbol" not in plain_html and "<use " not in plain_html
+            assert sprite_html.count(gw.SVG_SPRITE_SHEET) == 1
+            symbols = re.findall(r"<symbol id='([^']+)'", sprite_html)
+            assert len(symbols) == len(set(symbols))
+            body = sprite_html.replace(gw.SVG_SPRITE_SHEET, "")
+            assert "<circle" not in body and "<line" not in body
+            used = set(re.findall(r"<use href='#([^']+)'", body))
+            assert used and used <= set(symbols)
+            for marker in ("class='dice-svg", "class='tally-svg'"):
+                assert sprite_html.count(marker) == plain_html.count(marker)
+
+
+def test_external_stylesheet_is_written_once_and_linked(tmp_path):
+    inline = write_config(tmp_path, MIXED_TASKS, name="inline.yaml", worksheet_count=3, out_dir="inline")
+    external = write_config(
+        tmp_path, MIXED_TASKS, name="external.yaml", worksheet_count=3, out_dir="external",
+        output={"stylesheet": "external"},
+    )
+    gw.build_worksheets(inline)
+    gw.build_worksheets(external)
+    inline_files = output_files(inline.output.out_dir)
+    external_files = output_files(external.output.out_dir)
+    assert [name for name in external_files if name.endswith(".css")] == [gw.STYLESHEET_NAME]
+    assert external_files.pop(gw.STYLESHEET_NAME).decode("utf-8") == gw.STYLESHEET_CSS
+    assert external_files.keys() == inline_files.keys()
+    link = f"<link rel='stylesheet' href='{gw.STYLESHEET_NAME}'>"
+    for name, content in external_files.items():
+        page = content.decode("utf-8")
+        assert page.count(link) == 1 and "<style>" not in page
+        assert page.replace(link, gw.STYLE_BLOCK).encode("utf-8") == inline_files[name]
+
+
+def test_worksheet_variant_only_blanks_the_answers_of_the_solution(tmp_path):
+    tables = {"tables": [{"operation": "+", "row_count": 2, "col_count": 3}]}
+    cfg = write_config(tmp_path, MIXED_TASKS + [{**OPERATION_TABLE, **tables}])
+    # the compare signs are written unescaped, so a tag starts with a letter or slash
+    tag = re.compile(r"<[/a-z][^>]*>")
+    for index in range(cfg.worksheet_count):
+        for task_type, data in gw.generate_sheet_tasks(cfg, index):
+            out = gw.VariantWriter()
+            gw.TASK_RENDERERS[task_type](data, out)
+            worksheet, solution = out.getvalues()
+            if task_type in ("number_word_table", "number_line"):
+                # the solution adds whole elements: dice, tick labels
+                assert set(tag.findall(worksheet)) <= set(tag.findall(solution))
+                continue
+            assert tag.findall(worksheet) == tag.findall(solution)
+            texts = zip(tag.split(worksheet), tag.split(solution))
+            changed = [(shown, answer) for shown, answer in texts if shown != answer]
+            assert changed and all(shown == "" for shown, _ in changed)
+            blanked = [answer for _, answer in changed]
+            if task_type == "compare_numbers":
+                assert blanked == ["<" if a < b else ">" if a > b else "=" for a, b in zip(data.left, data.right)]
+            elif task_type == "arithmetic_list":
+                assert blanked == [str(result) for *_, result in data.items()]
+
+
+def test_benchmark_covers_every_task_type_and_flags_regressions(capsys):
+    assert {task["type"] for task in benchmark.SCENARIOS.values()} == set(gw.TASK_GENERATORS)
+    results = benchmark.run_benchmarks(gw, repeat=2, rounds=1)
+    assert results.keys() == benchmark.SCENARIOS.keys()
+    for phases in results.values():
+        assert "error" not in phases and {"generate", "render"} <= phases.keys()
+        assert all(values["seconds_per_op"] > 0 for values in phases.values())
+
+    base = {"results": results}
+    assert benchmark.compare_results(base, base, 0.10, 0.10) == []
+    slower = json.loads(json.dumps(results))
+    slower["ordering/40_numbers"]["render"]["seconds_per_op"] *= 1.5
+    larger = slower["compare_numbers/500_items"]["generate"]
+    larger["peak_bytes"] = 2 * max(larger["peak_bytes"], benchmark.MEMORY_FLOOR_BYTES)
+    slower["number_line/0_1000"] = {"error": "Unable to generate"}
+    assert benchmark.compare_results(base, {"results": slower}, 0.10, 0.10) == [
+        "compare_numbers/500_items generate (memory)",
+        "ordering/40_numbers render",
+        "number_line/0_1000 (failed)",
+    ]
+    # a few hundred bytes on a tiny baseline stay below the memory floor
+    tiny = json.loads(json.dumps(results))
+    tiny["number_dictation/100_boxes"]["render"]["peak_bytes"] = 100
+    grown = json.loads(json.dumps(tiny))
+    grown["number_dictation/100_boxes"]["render"]["peak_bytes"] = 300
+    assert benchmark.compare_results({"results": tiny}, {"results": grown}, 0.10, 0.10) == []
+    assert "REGRESSION" in capsys.readouterr().out
+
+
+def test_zip_archive_holds_the_file_layout_in_order(tmp_path):
+    output = {"stylesheet": "external"}
+    files = write_config(tmp_path, MIXED_TASKS, name="files.yaml", worksheet_count=3, out_dir="files", output=output)
+    archived = write_config(
+        tmp_path, MIXED_TASKS, name="zip.yaml", worksheet_count=3, out_dir="zip", output={**output, "format": "zip"}
+    )
+    gw.build_worksheets(files)
+    gw.build_worksheets(archived, jobs=2)
+    assert [path.name for path in archived.output.out_dir.iterdir()] == [gw.archive_path(archived).name]
+    with zipfile.ZipFile(gw.archive_path(archived)) as archive:
+        names = archive.namelist()
+        pages = [name for i in range(3) for name in (f"blatt_{i + 1:03d}.html", f"blatt_{i + 1:03d}_loesung.html")]
+        assert names == ["index.html", gw.STYLESHEET_NAME, *pages, "blatt_gesamt.html"]
+        expected = output_files(files.output.out_dir)
+        assert {name: archive.read(name) for name in names[1:]} == expected
+        index = archive.read("index.html").decode("utf-8")
+        assert all(f"href='{name}'" in index for name in pages)
+
+    first = gw.archive_path(archived).read_bytes()
+    gw.build_worksheets(archived)
+    assert gw.archive_path(archived).read_bytes() == first
+    with pytest.raises(ValueError, match="--incremental"):
+        gw.build_worksheets(archived, incremental=True)
+
+
+@pytest.mark.parametrize("start, end, major, minor_step", [(0, 100, 10, 1), (0, 1000, 100, 5), (200, 2200, 500, 10)])
+def test_number_line_ticks_are_thinned_cached_paths(start, end, major, minor_step):
+    skeleton = gw.number_line_skeleton(start, end, major)
+    assert gw.number_line_skeleton(start, end, major) is skeleton
+    paths = {css_class: d for d, css_class in re.findall(r"<path d='([^']+)' class='([^']+)' />", skeleton.ticks)}
+    assert skeleton.ticks.count("<path") == len(paths)
+    ticks = {"major": [], "mid": [], "minor": []}
+    for value, *_, kind in gw._number_line_ticks(start, end, major):
+        ticks[kind].append(value)
+    assert ticks["major"] == list(range(start, end + 1, major))
+    assert len(ticks["minor"]) <= gw.NUMBER_LINE_MAX_MINOR_TICKS
+    assert all((value - start) % minor_step == 0 for value in ticks["minor"] + ticks["mid"])
+    assert len(ticks["major"]) + len(ticks["mid"]) + len(ticks["minor"]) == (end - start) // minor_step + 1
+    for kind, css_class in (("major", "tick-line major"), ("mid", "tick-line mid"), ("minor", "tick-line")):
+        assert paths.get(css_class, "").count("M") == len(ticks[kind])
+    labels = re.findall(r"class='tick-label'>(\d+)</text>", skeleton.labels)
+    assert labels == [str(value) for value in ticks["major"]]
+
+
+def test_write_queue_raises_the_first_failed_write():
+    written = []
+
+    def fail(name):
+        raise OSError(f"cannot write {name}")
+
+    writes = gw.WriteQueue(threads=1)
+    first = writes.submit(written.append, "a")
+    failed = writes.submit(fail, "b")
+    dropped = writes.submit(written.append, "c")
+    assert first.result() is None
+    with pytest.raises(OSError, match="cannot write b"):
+        failed.result()
+    with pytest.raises(OSError, match="cannot write b"):
+        writes.close()
+    assert dropped.cancelled() and written == ["a"]
+
+
+@pytest.mark.parametrize("write_threads", [0, 2])
+def test_failed_page_write_stops_the_build(tmp_path, write_threads):
+    cfg = write_config(tmp_path, MIXED_TASKS, worksheet_count=4)
+    blocked = cfg.output.out_dir / "blatt_002_loesung.html"
+    blocked.mkdir(parents=True)
+    with pytest.raises(IsADirectoryError):
+        gw.build_worksheets(cfg, incremental=True, write_threads=write_threads)
+    assert not gw.manifest_path(cfg).exists()
+    blocked.rmdir()
+    assert gw.build_worksheets(cfg, incremental=True, write_threads=write_threads) == 4
+
+
+NUMPY_BACKEND = pytest.param("numpy", marks=pytest.mark.skipif(gw.np is None, reason="NumPy is not installed"))
+
+
+@pytest.mark.parametrize("backend", ["random", NUMPY_BACKEND])
+def test_task_streams_keep_other_tasks_when_one_changes(tmp_path, backend):
+    def sheets(name, tasks, streams="task"):
+        cfg = write_config(tmp_path, tasks, name=name, random_streams=streams, random_backend=backend)
+        return [[data for _, data in gw.generate_sheet_tasks(cfg, index)] for index in range(cfg.worksheet_count)]
+
+    edited = [dict(task) for task in MIXED_TASKS]
+    edited[1]["item_count"] = 12
+    for before, after in zip(sheets("base.yaml", MIXED_TASKS), sheets("edited.yaml", edited)):
+        assert before[:1] + before[2:] == after[:1] + after[2:] and before[1] != after[1]
+
+    # tasks with an id keep their stream when tasks are inserted before them
+    named = [{**task, "id": task["type"]} for task in MIXED_TASKS]
+    inserted = [{"type": "number_dictation", "box_count": 3}] + named
+    for before, after in zip(sheets("named.yaml", named), sheets("inserted.yaml", inserted)):
+        assert after[1:] == before
+
+    with pytest.raises(ValueError, match=r"Task 2 \(compare_numbers\): id 'x' is used by another task"):
+        write_config(tmp_path, [{**MIXED_TASKS[0], "id": "x"}, {**MIXED_TASKS[1], "id": "x"}], random_streams="task")
+
+    if backend == "numpy":
+        # the vectorized task types draw from their own block stream in either mode
+        return
+    # the shared sheet stream shifts every later task instead
+    shared = zip(sheets("shared.yaml", MIXED_TASKS, "sheet"), sheets("shared_edited.yaml", edited, "sheet"))
+    assert any(before[2:] != after[2:] for before, after in shared)
+
+
+def test_task_data_are_frozen_slotted_records(tmp_path):
+    tables = {"tables": [{"operation": "-", "row_count": 2, "col_count": 2}]}
+    cfg = write_config(tmp_path, MIXED_TASKS + [{**OPERATION_TABLE, **tables}], worksheet_count=2)
+    records = [data for index in range(cfg.worksheet_count) for _, data in gw.generate_sheet_tasks(cfg, index)]
+    for data in records:
+        assert dataclasses.is_dataclass(data) and not hasattr(data, "__dict__")
+        with pytest.raises(dataclasses.FrozenInstanceError):
+            data.title = "changed"
+        # the -j workers ship the records back to the main process
+        assert pickle.loads(pickle.dumps(data)) == data
+        for field in dataclasses.fields(data):
+            value = getattr(data, field.name)
+            if isinstance(value, gw.array):
+                assert value.typecode == "q"
+    for data in records:
+        if isinstance(data, gw.CompareNumbersData):
+            signs = ["<" if a < b else ">" if a > b else "=" for a, b in zip(data.left, data.right)]
+            assert list(data.relations) == signs
+        elif isinstance(data, gw.PreSuccTableData):
+            assert [values for _, values in data.rows()] == [(n - 1, n, n + 1) for n in data.middles]
+            assert all(given < 3 for given in data.given)
+
+
+def test_close_partners_differ_in_exactly_one_digit():
+    def one_digit_apart(a, b):
+        return len(str(a)) == len(str(b)) and sum(x != y for x, y in zip(str(a), str(b))) == 1
+
+    for min_value, max_value in ((0, 120), (95, 1210), (4990, 5020)):
+        for value in range(min_value, max_value + 1):
+            expected = {b for b in range(min_value, max_value + 1) if one_digit_apart(value, b)}
+            partners = gw.close_partners(value, min_value, max_value)
+            assert len(partners) == len(expected) and set(partners) == expected
+
+
+@pytest.mark.parametrize("backend", ["random", NUMPY_BACKEND])
+def test_wide_compare_and_pre_succ_ranges(tmp_path, backend):
+    tasks = [
+        {"type": "compare_numbers", "item_count": 30, "min_value": 1000, "max_value": 2_000_000,
+         "equal_probability": 0.1, "close_numbers": True},
+        {"type": "pre_succ_table", "row_count": 30, "min_value": 0, "max_value": 5_000_000, "given_field": "mixed"},
+        {"type": "pre_succ_table", "row_count": 30, "min_value": 0, "max_value": 4},
+    ]
+    cfg = write_config(tmp_path, tasks, random_backend=backend)
+    largest = 0
+    for index in range(cfg.worksheet_count):
+        compare, wide, narrow = (data for _, data in gw.generate_sheet_tasks(cfg, index))
+        for a, b, relation in zip(compare.left, compare.right, compare.relations):
+            assert 1000 <= a <= 2_000_000 and 1000 <= b <= 2_000_000
+            if relation != "=":
+                assert b in gw.close_partners(a, 1000, 2_000_000)
+            largest = max(largest, a, b)
+        assert all(0 <= low and high <= 5_000_000 for _, (low, _, high) in wide.rows())
+        assert set(narrow.middles) <= {1, 2, 3}
+    # no longer clamped to 100
+    assert largest > 1_000_000
+
+    with pytest.raises(ValueError, match="two distinct values between 7 and 7"):
+        write_config(tmp_path, [{"type": "compare_numbers", "min_value": 7, "max_value": 7}])
+    write_config(tmp_path, [{"type": "compare_numbers", "min_value": 7, "max_value": 7, "equal_probability": 1}])